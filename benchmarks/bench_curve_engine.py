@@ -0,0 +1,137 @@
+# benchmarks/bench_curve_engine.py
+"""
+Compara el loop original (iterrows) contra el motor vectorizado de curvas.
+
+    python benchmarks/bench_curve_engine.py --unidades 1000000
+    python benchmarks/bench_curve_engine.py --unidades 1000000 --memoria --sin-loop
+
+Con --memoria cada variante corre en su propio subproceso sobre el mismo
+parquet limpio y se reporta el pico de RSS por encima de la entrada ya
+cargada, además del tamaño del resultado.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from curve_engine import GROUP_COLS, MODELOS_CURVA, agregar_recomendacion, evaluar_unidades  # noqa: E402
+from etl_unidades import guardar_unidades, leer_unidades                      # noqa: E402
+from pricing_model import evaluar_unidades_loop                               # noqa: E402
+from sintetico import generar_unidades_limpias                                # noqa: E402
+
+# loop: lista de dicts con el texto por unidad + sort final (implementación original)
+# compacto: categóricas, sin texto, ya ordenado; +texto: la recomendación al exportar
+# (todas con la recta, comparables con el loop); multicurva: selección entre MODELOS_CURVA
+VARIANTES = {
+    "loop": evaluar_unidades_loop,
+    "compacto": lambda df: evaluar_unidades(df, modelos=("lineal",)),
+    "compacto+texto": lambda df: agregar_recomendacion(evaluar_unidades(df, modelos=("lineal",))),
+    "multicurva": lambda df: evaluar_unidades(df, modelos=MODELOS_CURVA),
+}
+
+
+def cronometrar(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def comparar(loop: pd.DataFrame, vect: pd.DataFrame) -> None:
+    # Unidades exactamente sobre la recta tienen delta ~1e-10 con signo distinto
+    # según el algoritmo, así que se compara alineando por unidad y no por posición.
+    keys = GROUP_COLS + ["unidad", "PISO", "precio_real"]
+    vect = agregar_recomendacion(vect).drop(columns="modelo_curva")
+    vect = vect.astype({c: object for c in GROUP_COLS + ["estado"]})
+    a = loop.sort_values(keys, kind="stable").reset_index(drop=True)
+    b = vect.sort_values(keys, kind="stable").reset_index(drop=True)
+    pd.testing.assert_frame_equal(a, b, check_dtype=False, rtol=1e-7, atol=1e-6)
+
+
+def _status_mb(campo: str) -> float:
+    # VmRSS (vigente) o VmHWM (pico) del proceso, desde /proc: solo Linux.
+    # ru_maxrss no sirve aquí: el hijo hereda el pico del padre a través del exec.
+    with open("/proc/self/status") as f:
+        for linea in f:
+            if linea.startswith(campo + ":"):
+                return int(linea.split()[1]) / 1024
+    raise RuntimeError(f"{campo} no disponible en /proc/self/status")
+
+
+def medir_variante(parquet: Path, variante: str) -> dict:
+    df = leer_unidades(parquet)
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")  # reinicia VmHWM al RSS actual: el pico medido es solo el de la variante
+    base = _status_mb("VmRSS")
+    out, segundos = cronometrar(VARIANTES[variante], df)
+    return {
+        "variante": variante,
+        "segundos": segundos,
+        "entrada_mb": df.memory_usage(deep=True).sum() / 1e6,
+        "resultado_mb": out.memory_usage(deep=True).sum() / 1e6,
+        "delta_pico_mb": max(_status_mb("VmHWM") - base, 0.0),
+    }
+
+
+def comparar_memoria(df: pd.DataFrame, variantes: list[str]) -> None:
+    with tempfile.TemporaryDirectory(prefix="bench_curva_") as tmp:
+        parquet = guardar_unidades(df, Path(tmp) / "unidades_clean.parquet")
+        for v in variantes:
+            proc = subprocess.run([sys.executable, __file__, "--_variante", v, "--_parquet", str(parquet)],
+                                  capture_output=True, text=True, check=True)
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f">>> [BENCH CURVA] {v:15s} {r['segundos']:8.2f} s  "
+                  f"pico RSS +{r['delta_pico_mb']:7.1f} MB sobre la entrada ({r['entrada_mb']:.1f} MB)  "
+                  f"resultado {r['resultado_mb']:7.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--unidades", type=int, default=1_000_000)
+    parser.add_argument("--proyectos", type=int, default=50)
+    parser.add_argument("--sin-loop", action="store_true",
+                        help="solo mide el motor vectorizado")
+    parser.add_argument("--memoria", action="store_true",
+                        help="pico de RSS y tamaño del resultado por variante, en subprocesos")
+    parser.add_argument("--_variante", help=argparse.SUPPRESS)
+    parser.add_argument("--_parquet", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._variante:
+        print(json.dumps(medir_variante(args._parquet, args._variante)))
+        return
+
+    print(f">>> [BENCH CURVA] Generando {args.unidades:,} unidades sintéticas...")
+    df = generar_unidades_limpias(args.unidades, n_proyectos=args.proyectos)
+
+    if args.memoria:
+        comparar_memoria(df, [v for v in VARIANTES if not (args.sin_loop and v == "loop")])
+        return
+
+    vect, t_vect = cronometrar(VARIANTES["compacto"], df)
+    print(f">>> [BENCH CURVA] Vectorizado: {t_vect:8.2f} s")
+    multi, t_multi = cronometrar(VARIANTES["multicurva"], df)
+    n_grupos = multi.drop_duplicates(GROUP_COLS)["modelo_curva"].value_counts()
+    print(f">>> [BENCH CURVA] Multicurva:  {t_multi:8.2f} s  ({t_multi / t_vect:.1f}x la recta) "
+          f"grupos por modelo: {n_grupos.to_dict()}")
+
+    if args.sin_loop:
+        return
+
+    loop, t_loop = cronometrar(evaluar_unidades_loop, df)
+    print(f">>> [BENCH CURVA] Loop:        {t_loop:8.2f} s")
+    print(f">>> [BENCH CURVA] Speedup:     {t_loop / t_vect:8.1f}x")
+
+    comparar(loop, vect)
+    print(">>> [BENCH CURVA] Resultados equivalentes.")
+
+
+if __name__ == "__main__":
+    main()
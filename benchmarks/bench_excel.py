@@ -0,0 +1,97 @@
+# benchmarks/bench_excel.py
+"""
+Compara DataFrame.to_excel (ExcelWriter, árbol de celdas en memoria) contra
+la exportación en streaming de exportar_excel, en varios tamaños de
+inventario, sobre el mismo reporte de pricing (unidades + curvas).
+
+    python benchmarks/bench_excel.py --unidades 20000,50000,100000
+
+Cada variante y tamaño corre en su propio subproceso; se reporta el tiempo
+de exportación, el pico de RSS por encima del resultado ya cargado y el
+tiempo por cada 1000 filas (plano si la exportación escala lineal).
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from bench_curve_engine import _status_mb                                    # noqa: E402
+from curve_engine import agregar_recomendacion, evaluar_unidades             # noqa: E402
+from etl_unidades import guardar_unidades, leer_unidades                     # noqa: E402
+from exportar_excel import MAX_FILAS_HOJA, exportar_xlsx                     # noqa: E402
+from pricing_model import resumen_curvas                                     # noqa: E402
+from sintetico import generar_unidades_limpias                               # noqa: E402
+
+
+def _to_excel(path: Path, hojas: dict[str, pd.DataFrame]) -> None:
+    # Exportación anterior: una hoja por tabla, sin formato
+    with pd.ExcelWriter(path) as writer:
+        for nombre, df in hojas.items():
+            df.to_excel(writer, sheet_name=nombre, index=False)
+
+
+VARIANTES = {
+    "to_excel": _to_excel,
+    "streaming": exportar_xlsx,
+}
+
+
+def medir_variante(parquet: Path, variante: str, salida: Path) -> dict:
+    result = evaluar_unidades(leer_unidades(parquet))
+    hojas = {"unidades": agregar_recomendacion(result), "curvas": resumen_curvas(result)}
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")  # reinicia VmHWM: el pico medido es solo el de la exportación
+    base = _status_mb("VmRSS")
+    t0 = time.perf_counter()
+    VARIANTES[variante](salida, hojas)
+    segundos = time.perf_counter() - t0
+    return {
+        "variante": variante,
+        "filas": len(result),
+        "segundos": segundos,
+        "delta_pico_mb": max(_status_mb("VmHWM") - base, 0.0),
+        "archivo_mb": salida.stat().st_size / 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--unidades", default="20000,50000,100000",
+                        help="tamaños de inventario separados por coma")
+    parser.add_argument("--proyectos", type=int, default=20)
+    parser.add_argument("--variantes", default=",".join(VARIANTES))
+    parser.add_argument("--_variante", help=argparse.SUPPRESS)
+    parser.add_argument("--_parquet", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--_salida", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._variante:
+        print(json.dumps(medir_variante(args._parquet, args._variante, args._salida)))
+        return
+
+    tamanos = [int(n) for n in args.unidades.split(",")]
+    print(f">>> [BENCH EXCEL] Hojas de más de {MAX_FILAS_HOJA:,} filas se parten por proyecto")
+    with tempfile.TemporaryDirectory(prefix="bench_excel_") as tmp:
+        for n in tamanos:
+            parquet = guardar_unidades(generar_unidades_limpias(n, n_proyectos=args.proyectos),
+                                       Path(tmp) / f"unidades_{n}.parquet")
+            for v in args.variantes.split(","):
+                proc = subprocess.run([sys.executable, __file__, "--_variante", v, "--_parquet", str(parquet),
+                                       "--_salida", str(Path(tmp) / f"{v}_{n}.xlsx")],
+                                      capture_output=True, text=True, check=True)
+                r = json.loads(proc.stdout.strip().splitlines()[-1])
+                print(f">>> [BENCH EXCEL] {v:10s} {r['filas']:>9,} filas {r['segundos']:8.2f} s  "
+                      f"({r['segundos'] / r['filas'] * 1000:5.2f} s/1000 filas)  "
+                      f"pico RSS +{r['delta_pico_mb']:7.1f} MB  archivo {r['archivo_mb']:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_forecasters.py
+"""
+Precisión y tiempo del baseline NumPy contra Prophet sobre la misma historia:
+se reservan los últimos meses de cada serie y se mide el error del forecast.
+
+    python benchmarks/bench_forecasters.py --series 200
+    python benchmarks/bench_forecasters.py --csv data/separaciones_mensual.csv
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from forecast_engines import ENGINES  # noqa: E402
+from sintetico import generar_separaciones  # noqa: E402
+
+
+def partir(df_sep: pd.DataFrame, holdout: int) -> tuple[dict, pd.DataFrame]:
+    """
+    Series de entrenamiento {(proyecto, tipo): (ds, y)} y el holdout en formato largo.
+    """
+    df = df_sep.rename(columns={"fecha": "ds", "separaciones": "y"}).sort_values("ds")
+    rank = df.groupby(["nombre_proyecto", "nombre_tipologia"]).cumcount(ascending=False)
+    train, test = df[rank >= holdout], df[rank < holdout]
+    series = {
+        key: g[["ds", "y"]].reset_index(drop=True)
+        for key, g in train.groupby(["nombre_proyecto", "nombre_tipologia"])
+    }
+    return series, test
+
+
+def evaluar(forecasts: dict, test: pd.DataFrame) -> dict:
+    partes = [
+        fc[["ds", "yhat"]].assign(nombre_proyecto=k[0], nombre_tipologia=k[1])
+        for k, fc in forecasts.items()
+    ]
+    pred = pd.concat(partes, ignore_index=True)
+    m = test.merge(pred, on=["nombre_proyecto", "nombre_tipologia", "ds"], how="left")
+    err = (m["y"] - m["yhat"]).to_numpy()
+    cubiertos = ~np.isnan(err)
+    return {
+        "mae": float(np.nanmean(np.abs(err))),
+        "rmse": float(np.sqrt(np.nanmean(err ** 2))),
+        "cobertura": float(cubiertos.mean()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--csv", type=Path, help="separaciones reales en vez de sintéticas")
+    parser.add_argument("--series", type=int, default=100)
+    parser.add_argument("--meses", type=int, default=36)
+    parser.add_argument("--holdout", type=int, default=3)
+    parser.add_argument("--motores", nargs="+", default=list(ENGINES))
+    args = parser.parse_args()
+
+    if "prophet" in args.motores:
+        import prophet  # noqa: F401  (registra sus loggers al importarse)
+        logging.getLogger("cmdstanpy").disabled = True
+        logging.getLogger("prophet").setLevel(logging.WARNING)
+
+    if args.csv:
+        df_sep = pd.read_csv(args.csv)
+        df_sep["fecha"] = pd.to_datetime(df_sep["fecha"])
+    else:
+        df_sep = generar_separaciones(args.series, n_meses=args.meses)
+    series, test = partir(df_sep, args.holdout)
+    print(f">>> [BENCH FORECAST] {len(series)} series, holdout de {args.holdout} períodos")
+
+    for motor in args.motores:
+        kwargs = {"use_cache": False} if motor == "prophet" else {}
+        t0 = time.perf_counter()
+        forecasts = ENGINES[motor](series, **kwargs)
+        seg = time.perf_counter() - t0
+        m = evaluar(forecasts, test)
+        print(f">>> [BENCH FORECAST] {motor:9s} {seg:8.2f} s  "
+              f"MAE {m['mae']:6.3f}  RMSE {m['rmse']:6.3f}  cobertura {m['cobertura']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
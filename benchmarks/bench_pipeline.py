@@ -0,0 +1,312 @@
+# benchmarks/bench_pipeline.py
+"""
+Tiempo y memoria de cada etapa (ETL, pricing, escalera óptima, arranque de la
+CLI, elasticidad, cubo de ventas, forecast, gráficos) sobre datos sintéticos, con resultados en JSON comparables
+entre commits.
+
+    python benchmarks/bench_pipeline.py --unidades 10000 100000 1000000
+    python benchmarks/bench_pipeline.py --comparar benchmarks/resultados/bench_abc123.json
+
+Cada etapa corre en un subproceso sobre una copia de src/ en un directorio
+temporal: las rutas del repo (ROOT/data, ROOT/output) apuntan ahí, así que el
+benchmark no toca los datos reales, y el pico de RSS es el de la etapa sola.
+"""
+import argparse
+import json
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTADOS_DIR = ROOT / "benchmarks" / "resultados"
+
+# Orden de ejecución; cada etapa usa lo que dejó la anterior
+ETAPAS_UNIDADES = ["etl", "pricing", "escalera", "cli"]
+ETAPAS_COMBOS = ["elasticidad", "cubo", "forecast", "plots"]
+ETAPAS = ETAPAS_UNIDADES + ETAPAS_COMBOS
+
+
+# ---------------- ETAPAS (corren en el subproceso) ---------------- #
+
+def _etapa(nombre: str, opciones: dict):
+    """
+    Devuelve (preparar, medir): preparar carga entradas fuera del cronómetro,
+    medir es la llamada que se cronometra.
+    """
+    import pandas as pd
+
+    if nombre == "etl":
+        import etl_unidades
+        return None, lambda _: etl_unidades.run_etl_unidades(chunksize=opciones.get("chunksize"))
+
+    if nombre == "pricing":
+        import etl_unidades
+        import pricing_model
+        return None, lambda _: pricing_model.run_pricing_model(etl_unidades.CLEAN_PATH)
+
+    if nombre == "escalera":
+        # Sin forecast ni elasticidades: todos los grupos con los supuestos por defecto
+        import etl_unidades
+        import optimizador_precios
+        return etl_unidades.leer_unidades, optimizador_precios.optimizar_escaleras
+
+    if nombre == "cli":
+        # Proceso nuevo de ./pricing: arranque del intérprete + imports + re-puntuar un proyecto
+        cmd = [sys.executable, str(Path.cwd() / "pricing"), "curve", "--proyecto", "Proyecto 0", "--top", "0"]
+        return None, lambda _: subprocess.run(cmd, check=True, capture_output=True)
+
+    if nombre == "elasticidad":
+        import pipeline_elasticidad
+        from elasticidad_model import run_elasticidad
+        from intermediate_store import guardar_tabla
+
+        def preparar():
+            precios = pd.read_parquet(pipeline_elasticidad.ROOT / "data" / "precios_mensuales.parquet")
+            return precios, pipeline_elasticidad.cargar_separaciones()
+
+        def medir(datos):
+            panel, estimaciones = run_elasticidad(*datos)
+            guardar_tabla("elasticidad_panel", panel)  # entrada de "plots"
+            return panel
+        return preparar, medir
+
+    if nombre == "cubo":
+        # Armar el cubo desde las tablas mensuales, responder los cortes de reporte y guardarlo
+        import pipeline_elasticidad
+        from cubo_ventas import CuboVentas, cargar_cubo
+
+        def preparar():
+            precios = pd.read_parquet(pipeline_elasticidad.ROOT / "data" / "precios_mensuales.parquet")
+            return precios, pipeline_elasticidad.cargar_separaciones()
+
+        def guardar_y_releer(cubo):
+            # La caché guardada tiene que volver igual, también sin ningún corte de tiempo
+            cubo.guardar()
+            releido = cargar_cubo()
+            assert set(releido._cortes) == set(cubo._cortes), "cubo_cortes no devolvió los mismos cortes"
+            for niveles, corte in cubo._cortes.items():
+                pd.testing.assert_frame_equal(releido._cortes[niveles], corte, check_dtype=False)
+
+        def medir(datos):
+            cubo = CuboVentas.desde_tablas(*datos)
+            for niveles in (["nombre_proyecto"], ["nombre_tipologia"], ["nombre_subdivision"]):
+                cubo.consultar(niveles)
+            guardar_y_releer(cubo)
+            for niveles in (["nombre_proyecto", "nombre_tipologia", "mes"], ["nombre_proyecto", "trimestre"],
+                            ["anio"]):
+                cubo.consultar(niveles)
+            guardar_y_releer(cubo)
+            return cubo
+        return preparar, medir
+
+    if nombre == "forecast":
+        import pipeline_elasticidad
+        import pipeline_forecast
+        return pipeline_elasticidad.cargar_separaciones, lambda df_sep: pipeline_forecast.run_forecasts(
+            df_sep, workers=opciones["workers"], engine=opciones["engine"])
+
+    if nombre == "plots":
+        import pipeline_reporting
+        from intermediate_store import leer_tabla
+        return lambda: leer_tabla("elasticidad_panel"), lambda panel: pipeline_reporting.build_econometric_plots_jpg(
+            panel, workers=opciones["workers"], rapido=opciones["rapido"], dpi=opciones["dpi"])
+
+    raise ValueError(f"Etapa desconocida: {nombre!r}")
+
+
+def _medir_en_este_proceso(raiz: Path, nombre: str, opciones: dict) -> dict:
+    sys.path.insert(0, str(raiz / "src"))
+    preparar, medir = _etapa(nombre, opciones)
+    datos = preparar() if preparar is not None else None
+    # La etapa cli corre en un proceso hijo: su memoria es la del hijo
+    quien = resource.RUSAGE_CHILDREN if nombre == "cli" else resource.RUSAGE_SELF
+    rss_base = resource.getrusage(quien).ru_maxrss / 1024
+
+    t0 = time.perf_counter()
+    medir(datos)
+    segundos = time.perf_counter() - t0
+
+    pico = resource.getrusage(quien).ru_maxrss / 1024  # KB en Linux
+    return {"segundos": segundos, "pico_rss_mb": pico, "delta_rss_mb": max(pico - rss_base, 0.0)}
+
+
+# ---------------- ORQUESTACIÓN ---------------- #
+
+def _preparar_raiz(raiz: Path) -> None:
+    shutil.copytree(ROOT / "src", raiz / "src", ignore=shutil.ignore_patterns("__pycache__"))
+    shutil.copy2(ROOT / "pricing", raiz / "pricing")
+    (raiz / "data").mkdir(parents=True, exist_ok=True)
+
+
+def _generar_unidades(raiz: Path, n: int, proyectos: int) -> None:
+    from sintetico import generar_unidades
+    generar_unidades(n, n_proyectos=proyectos).to_csv(raiz / "data" / "Unidades.csv", index=False)
+
+
+def _generar_combos(raiz: Path, combos: int, meses: int) -> None:
+    from sintetico import generar_precios_mensuales, generar_separaciones
+    df_sep = generar_separaciones(combos, n_meses=meses)
+    df_sep.to_csv(raiz / "data" / "separaciones_mensual.csv", index=False)
+    generar_precios_mensuales(df_sep).to_parquet(raiz / "data" / "precios_mensuales.parquet", index=False)
+
+
+def _limpiar_caches(raiz: Path, etapa: str) -> None:
+    # Cada repetición mide en frío: sin caché de Prophet ni imágenes ya renderizadas
+    if etapa == "forecast":
+        shutil.rmtree(raiz / "data" / "intermediate" / "forecast_cache", ignore_errors=True)
+    if etapa == "plots":
+        shutil.rmtree(raiz / "output" / "plots_econometricos", ignore_errors=True)
+    if etapa == "pricing":
+        shutil.rmtree(raiz / "data" / "intermediate" / "curvas", ignore_errors=True)
+
+
+def correr_etapa(raiz: Path, etapa: str, opciones: dict, repeticiones: int) -> dict:
+    """
+    Corre la etapa `repeticiones` veces en subprocesos; se queda con el mejor
+    tiempo y el mayor pico de memoria.
+    """
+    corridas = []
+    for _ in range(repeticiones):
+        _limpiar_caches(raiz, etapa)
+        proc = subprocess.run(
+            [sys.executable, __file__, "--_etapa", etapa, "--_raiz", str(raiz),
+             "--_opciones", json.dumps(opciones)],
+            capture_output=True, text=True, cwd=raiz,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"La etapa {etapa} falló:\n{proc.stderr[-2000:]}")
+        corridas.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return {
+        "segundos": min(c["segundos"] for c in corridas),
+        "segundos_todas": [round(c["segundos"], 4) for c in corridas],
+        "pico_rss_mb": max(c["pico_rss_mb"] for c in corridas),
+        "delta_rss_mb": max(c["delta_rss_mb"] for c in corridas),
+    }
+
+
+def _commit() -> str:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        sucio = subprocess.run(["git", "status", "--porcelain", "--", "src"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return sha + ("-dirty" if sucio else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def comparar(actual: dict, base: dict, tolerancia: float) -> bool:
+    """
+    Imprime la razón actual/base por etapa y tamaño. True si alguna etapa se
+    hizo más lenta que base * (1 + tolerancia).
+    """
+    def clave(r):
+        return (r["etapa"], json.dumps(r["tamano"], sort_keys=True))
+
+    previas = {clave(r): r for r in base["resultados"]}
+    regresion = False
+    print(f">>> [BENCH] {base['commit']} -> {actual['commit']}")
+    for r in actual["resultados"]:
+        b = previas.get(clave(r))
+        if b is None:
+            continue
+        razon_t = r["segundos"] / b["segundos"] if b["segundos"] > 0 else float("inf")
+        razon_m = r["pico_rss_mb"] / b["pico_rss_mb"] if b["pico_rss_mb"] > 0 else float("inf")
+        marca = "  <-- REGRESIÓN" if razon_t > 1 + tolerancia else ""
+        regresion |= bool(marca)
+        print(f"    {r['etapa']:12s} {json.dumps(r['tamano']):28s} "
+              f"{b['segundos']:8.2f}s -> {r['segundos']:8.2f}s ({razon_t:5.2f}x)  "
+              f"RSS {razon_m:5.2f}x{marca}")
+    return regresion
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--unidades", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--proyectos", type=int, default=50)
+    parser.add_argument("--combos", type=int, default=100, help="series proyecto/tipología")
+    parser.add_argument("--meses", type=int, default=36)
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=ETAPAS)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--engine", default="baseline", help="motor de forecast")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunksize", type=int, default=None, help="ETL por bloques")
+    parser.add_argument("--rapido", action="store_true", help="gráficos sin bootstrap de seaborn")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--salida", type=Path, default=None,
+                        help="JSON de resultados (por defecto benchmarks/resultados/bench_<commit>.json)")
+    parser.add_argument("--comparar", type=Path, default=None, help="JSON de una corrida anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="razón de tiempo sobre la base que cuenta como regresión")
+    parser.add_argument("--_etapa", help=argparse.SUPPRESS)
+    parser.add_argument("--_raiz", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--_opciones", default="{}", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._etapa:
+        # Subproceso: mide una etapa y devuelve el resultado por stdout
+        print(json.dumps(_medir_en_este_proceso(args._raiz, args._etapa, json.loads(args._opciones))))
+        return
+
+    sys.path.insert(0, str(ROOT / "benchmarks"))
+    opciones = {"chunksize": args.chunksize, "engine": args.engine, "workers": args.workers,
+                "rapido": args.rapido, "dpi": args.dpi}
+    resultados = []
+
+    with tempfile.TemporaryDirectory(prefix="bench_pricing_") as tmp:
+        raiz = Path(tmp)
+        _preparar_raiz(raiz)
+
+        for n in args.unidades:
+            etapas = [e for e in ETAPAS_UNIDADES if e in args.etapas]
+            if not etapas:
+                break
+            print(f">>> [BENCH] Generando {n:,} unidades sintéticas...")
+            _generar_unidades(raiz, n, args.proyectos)
+            if {"pricing", "escalera", "cli"} & set(etapas) and "etl" not in etapas:
+                correr_etapa(raiz, "etl", opciones, 1)  # el resto necesita el parquet limpio
+            for etapa in etapas:
+                r = correr_etapa(raiz, etapa, opciones, args.repeticiones)
+                r.update(etapa=etapa, tamano={"unidades": n, "proyectos": args.proyectos})
+                resultados.append(r)
+                print(f">>> [BENCH] {etapa:12s} {n:>10,} unidades  {r['segundos']:8.2f} s  "
+                      f"pico RSS {r['pico_rss_mb']:7.0f} MB (+{r['delta_rss_mb']:.0f})")
+
+        etapas = [e for e in ETAPAS_COMBOS if e in args.etapas]
+        if etapas:
+            print(f">>> [BENCH] Generando {args.combos} series de {args.meses} meses...")
+            _generar_combos(raiz, args.combos, args.meses)
+            if "plots" in etapas and "elasticidad" not in etapas:
+                correr_etapa(raiz, "elasticidad", opciones, 1)  # plots usa el panel
+        for etapa in etapas:
+            r = correr_etapa(raiz, etapa, opciones, args.repeticiones)
+            r.update(etapa=etapa, tamano={"combos": args.combos, "meses": args.meses})
+            resultados.append(r)
+            print(f">>> [BENCH] {etapa:12s} {args.combos:>10,} combos    {r['segundos']:8.2f} s  "
+                  f"pico RSS {r['pico_rss_mb']:7.0f} MB (+{r['delta_rss_mb']:.0f})")
+
+    commit = _commit()
+    salida = {
+        "commit": commit,
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "maquina": platform.machine(),
+        "opciones": {**opciones, "repeticiones": args.repeticiones},
+        "resultados": resultados,
+    }
+    out_path = args.salida or RESULTADOS_DIR / f"bench_{commit}.json"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(salida, indent=2))
+    print(f">>> [BENCH] Resultados en {out_path}")
+
+    if args.comparar and comparar(salida, json.loads(args.comparar.read_text()), args.tolerancia):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
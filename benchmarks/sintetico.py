@@ -0,0 +1,129 @@
+# benchmarks/sintetico.py
+import numpy as np
+import pandas as pd
+
+RAW_COLS = [
+    "codigo_proyecto", "nombre_proyecto", "codigo_subdivision", "nombre_subdivision",
+    "nombre_tipologia", "nombre", "total_habitaciones", "precio_lista",
+    "precio lista miles", "precio_venta", "estado_comercial", "Estado comercial",
+    "PISO", "P_m2 dolares con dscto y area libre", "area_techada", "area_libre",
+    "area_total",
+]
+
+ESTADOS = np.array(["disponible", "vendido", "no disponible", "separado"])
+ESTADOS_DISPLAY = np.array(["Disponible", "Separado/Vendido", "No Disponible", "Separado/Vendido"])
+
+
+def generar_unidades(n_unidades: int, n_proyectos: int = 50, n_torres: int = 3,
+                     n_tipologias: int = 8, max_piso: int = 25, seed: int = 0) -> pd.DataFrame:
+    """
+    Inventario sintético con el mismo esquema que data/Unidades.csv.
+    Cada (proyecto, torre, tipología) tiene una recta precio~piso con ruido,
+    para que los estados caro/barato/en línea salgan en proporciones realistas.
+    """
+    rng = np.random.default_rng(seed)
+
+    proy = rng.integers(0, n_proyectos, n_unidades)
+    torre = rng.integers(0, n_torres, n_unidades)
+    tipo = rng.integers(0, n_tipologias, n_unidades)
+    piso = rng.integers(1, max_piso + 1, n_unidades)
+
+    grupo = (proy * n_torres + torre) * n_tipologias + tipo
+    n_grupos = n_proyectos * n_torres * n_tipologias
+    base = rng.uniform(200_000, 900_000, n_grupos)
+    pendiente = rng.uniform(1_000, 8_000, n_grupos)
+    precio = base[grupo] + pendiente[grupo] * piso
+    precio *= 1 + rng.normal(0, 0.03, n_unidades)
+    precio = np.round(precio, 2)
+
+    area_techada = np.round(rng.uniform(35, 140, n_unidades), 2)
+    area_libre = np.round(rng.uniform(0, 30, n_unidades), 2)
+    area_total = area_techada + area_libre
+    estado = rng.integers(0, len(ESTADOS), n_unidades)
+
+    cod_proy = np.char.add("P", proy.astype(str))
+    cod_torre = np.char.add(np.char.add(cod_proy, "-"), np.array(list("ABCDEFGHIJ"))[torre % 10])
+
+    df = pd.DataFrame({
+        "codigo_proyecto": cod_proy,
+        "nombre_proyecto": np.char.add("Proyecto ", proy.astype(str)),
+        "codigo_subdivision": cod_torre,
+        "nombre_subdivision": np.char.add("Torre ", torre.astype(str)),
+        "nombre_tipologia": np.char.add("Tipo ", tipo.astype(str)),
+        "nombre": np.char.add(np.char.add(piso.astype(str), "-"), np.arange(n_unidades).astype(str)),
+        "total_habitaciones": (tipo % 3 + 1).astype(float),
+        "precio_lista": precio,
+        "precio lista miles": [f"S/ {p / 1000:,.2f}" for p in precio],
+        "precio_venta": np.round(precio * rng.uniform(0.9, 1.0, n_unidades), 2),
+        "estado_comercial": ESTADOS[estado],
+        "Estado comercial": ESTADOS_DISPLAY[estado],
+        "PISO": piso,
+        "P_m2 dolares con dscto y area libre": [f"${v:,.0f}" for v in precio / area_total / 3.7],
+        "area_techada": area_techada,
+        "area_libre": area_libre,
+        "area_total": area_total,
+    })
+    return df[RAW_COLS]
+
+
+def generar_unidades_limpias(n_unidades: int, **kwargs) -> pd.DataFrame:
+    """
+    Igual que generar_unidades pero con los nombres de columna de unidades_clean.parquet.
+    """
+    df = generar_unidades(n_unidades, **kwargs).rename(columns={"nombre": "nombre_unidad"})
+    df["precio_m2"] = df["precio_lista"] / df["area_total"]
+    return df
+
+
+def generar_separaciones(n_combos: int, n_meses: int = 36, n_proyectos: int = 10,
+                         desde: str = "2022-01-01", seed: int = 0) -> pd.DataFrame:
+    """
+    Separaciones mensuales sintéticas (nombre_proyecto, nombre_tipologia,
+    fecha, mes, separaciones) con tendencia, estacionalidad anual y ruido
+    Poisson. Algunas series empiezan tarde para simular tipologías nuevas.
+    """
+    rng = np.random.default_rng(seed)
+    fechas = pd.date_range(desde, periods=n_meses, freq="MS")
+    t = np.arange(n_meses)
+
+    base = rng.uniform(1, 15, n_combos)[:, None]
+    pendiente = rng.normal(0, 0.05, n_combos)[:, None]
+    amplitud = rng.uniform(0, 0.4, n_combos)[:, None]
+    fase = rng.uniform(0, 2 * np.pi, n_combos)[:, None]
+    lam = base * (1 + pendiente * t) * (1 + amplitud * np.sin(2 * np.pi * t / 12 + fase))
+    y = rng.poisson(np.clip(lam, 0.1, None)).astype(float)
+
+    inicio = np.where(rng.random(n_combos) < 0.3, rng.integers(0, n_meses - 4, n_combos), 0)
+    y[t[None, :] < inicio[:, None]] = np.nan
+
+    combo = np.repeat(np.arange(n_combos), n_meses)
+    df = pd.DataFrame({
+        "nombre_proyecto": np.char.add("Proyecto ", (combo % n_proyectos).astype(str)),
+        "nombre_tipologia": np.char.add("Tipo ", combo.astype(str)),
+        "fecha": np.tile(fechas, n_combos),
+        "separaciones": y.ravel(),
+    }).dropna(subset=["separaciones"])
+    df["mes"] = df["fecha"].dt.strftime("%Y-%m")
+    return df.reset_index(drop=True)
+
+
+def generar_precios_mensuales(df_sep: pd.DataFrame, elasticidad: float = -1.0,
+                              seed: int = 0) -> pd.DataFrame:
+    """
+    Panel mensual de precio promedio (nombre_proyecto, nombre_tipologia, mes,
+    precio_lista) para los mismos combos y meses que df_sep, con un paseo
+    aleatorio de precio que responde a las separaciones con la elasticidad dada.
+    """
+    rng = np.random.default_rng(seed)
+    df = df_sep[["nombre_proyecto", "nombre_tipologia", "fecha", "separaciones"]].copy()
+    combo = df.groupby(["nombre_proyecto", "nombre_tipologia"], sort=False).ngroup().to_numpy()
+    base = rng.uniform(200_000, 900_000, combo.max() + 1)[combo]
+    paseo = pd.Series(rng.normal(0, 0.02, len(df))).groupby(combo).cumsum().to_numpy()
+    # log q = e log p + ruido  ->  log p = log q / e, atenuado por el paseo
+    ajuste = np.log1p(df["separaciones"].to_numpy()) / elasticidad * 0.05
+    df["precio_lista"] = np.round(base * np.exp(paseo + ajuste), 2)
+    return (
+        df.rename(columns={"fecha": "mes"})
+        [["nombre_proyecto", "nombre_tipologia", "mes", "precio_lista"]]
+        .reset_index(drop=True)
+    )
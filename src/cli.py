@@ -0,0 +1,277 @@
+# src/cli.py
+"""
+CLI única de pricing:
+
+    ./pricing etl [--chunksize 200000]
+    ./pricing curve [--proyecto Alicanto ...] [--col precio_lista,precio_m2] [--modelos lineal,isotonica]
+                    [--umbrales 0.01,0.02,0.05] [--incremental] [--sin-email]
+    ./pricing detect [--col precio_m2 | --col precio_lista,precio_m2] [--por-piso max]
+    ./pricing elasticity [--metodo shrinkage]
+    ./pricing cube [--niveles nombre_proyecto,trimestre] [--proyecto Alicanto] [--desde 2025-01]
+    ./pricing forecast [--engine baseline] [--workers 4]
+    ./pricing optimize [--col precio_lista]
+    ./pricing report [--rapido] [--sin-zip]
+    ./pricing simulate [--puerto 8765]
+
+Este módulo solo usa la biblioteca estándar: cada subcomando importa sus
+dependencias al ejecutarse, así `--help` no carga pandas, `curve` y `detect`
+no cargan matplotlib ni prophet, y solo `report` carga matplotlib.
+Con --tiempos imprime arranque, importaciones y ejecución del subcomando.
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+T0 = time.perf_counter()
+
+# Módulos que --tiempos reporta si quedaron cargados
+PESADOS = ("numpy", "pandas", "pyarrow", "scipy", "openpyxl", "matplotlib", "seaborn", "prophet")
+
+_marcas: list[tuple[str, float]] = []
+
+
+def _marcar(nombre: str) -> None:
+    _marcas.append((nombre, time.perf_counter()))
+
+
+# ---------------- SUBCOMANDOS ---------------- #
+
+def _etl(args) -> None:
+    from etl_unidades import run_etl_unidades
+    _marcar("importaciones")
+    run_etl_unidades(chunksize=args.chunksize, comparar=args.comparar)
+
+
+def _umbrales(texto: str | None) -> list[float] | None:
+    return [float(u) for u in texto.split(",")] if texto else None
+
+
+def _curve(args) -> None:
+    metricas = args.col.split(",") if args.col else []
+    if not args.proyecto:
+        # Inventario completo: la misma corrida que pipeline_pricing.py; con
+        # varias métricas agrega la hoja combinada al reporte
+        import pipeline_pricing
+        _marcar("importaciones")
+        pipeline_pricing.main(incremental=args.incremental, email=not args.sin_email,
+                              umbrales=_umbrales(args.umbrales),
+                              metricas=metricas if len(metricas) > 1 else None,
+                              **({"modelos": args.modelos.split(",")} if args.modelos else {}))
+        return
+
+    # Re-puntuar un proyecto: solo sus filas del parquet limpio, sin Excel ni correo.
+    # Cada curva es por proyecto/torre/tipología, así que el resultado coincide
+    # con el del inventario completo.
+    from curve_engine import (MODELOS_CURVA, PRICE_COL, UMBRAL_PCT, evaluar_metricas, evaluar_unidades,
+                              resumen_sensibilidad, sensibilidad_umbral)
+    from etl_unidades import CLEAN_PATH, leer_unidades
+    from exportar_excel import exportar_tabla
+    _marcar("importaciones")
+
+    df = leer_unidades(CLEAN_PATH, proyectos=args.proyecto)
+    if df.empty:
+        raise SystemExit(f"Sin unidades de {', '.join(args.proyecto)} en {CLEAN_PATH}")
+    umbral = UMBRAL_PCT if args.umbral is None else args.umbral
+    modelos = args.modelos.split(",") if args.modelos else MODELOS_CURVA
+    combinado = None
+    if len(metricas) > 1:
+        # Todas las métricas con un solo ajuste; el detalle de abajo es de la primera
+        combinado, por_metrica = evaluar_metricas(df, metricas, umbral, modelos)
+        result = por_metrica[metricas[0]]
+    else:
+        result = evaluar_unidades(df, metricas[0] if metricas else PRICE_COL, umbral, modelos)
+
+    print(f">>> [PRICING CLI] {len(result)} unidades de {', '.join(args.proyecto)}")
+    print(result["estado"].value_counts().to_string())
+    print(result.drop_duplicates(["nombre_subdivision", "nombre_tipologia"])["modelo_curva"]
+          .value_counts().to_string())
+    peores = result.reindex(result["delta_pct"].abs().sort_values(ascending=False).index)
+    cols = ["nombre_subdivision", "nombre_tipologia", "unidad", "PISO",
+            "precio_real", "precio_esperado", "delta_pct", "estado", "modelo_curva"]
+    print(peores[cols].head(args.top).to_string(index=False))
+    if combinado is not None:
+        print(f">>> [PRICING CLI] Fuera de curva en alguna métrica: {int(combinado['fuera_de_curva'].sum())}")
+        print(combinado["metricas_fuera"].value_counts().to_string())
+    if args.umbrales:
+        print(">>> [PRICING CLI] Sensibilidad al umbral:")
+        print(resumen_sensibilidad(sensibilidad_umbral(result, _umbrales(args.umbrales))).to_string(index=False))
+
+    if args.salida is not None:
+        tabla = result if combinado is None else combinado
+        exportar_tabla(args.salida, tabla, hoja="unidades")
+        print(f">>> [PRICING CLI] Exportado: {args.salida}")
+
+
+def _detect(args) -> None:
+    import monotonicidad
+    _marcar("importaciones")
+    monotonicidad.main(args.col, monotonicidad.TOLERANCIA_PCT if args.tolerancia is None else args.tolerancia,
+                       args.por_piso, None if args.sin_exportar else (args.salida or monotonicidad.OUT_PATH))
+
+
+def _elasticity(args) -> None:
+    import pipeline_elasticidad
+    _marcar("importaciones")
+    pipeline_elasticidad.main(metodo=args.metodo)
+
+
+def _cube(args) -> None:
+    import cubo_ventas
+    _marcar("importaciones")
+    filtro = {c: v for c, v in (("nombre_proyecto", args.proyecto), ("nombre_tipologia", args.tipologia)) if v}
+    cubo_ventas.main(args.niveles.split(",") if args.niveles else [], filtro, args.desde, args.hasta, args.salida)
+
+
+def _forecast(args) -> None:
+    import pipeline_forecast
+    _marcar("importaciones")
+    timeout = pipeline_forecast.DEFAULT_TIMEOUT if args.timeout is None else args.timeout or None
+    pipeline_forecast.main(workers=args.workers, timeout=timeout, engine=args.engine,
+                           excel=not args.sin_excel)
+
+
+def _optimize(args) -> None:
+    import optimizador_precios
+    _marcar("importaciones")
+    optimizador_precios.main(args.col, None if args.sin_exportar else (args.salida or optimizador_precios.OUT_PATH))
+
+
+def _report(args) -> None:
+    import pipeline_reporting
+    _marcar("importaciones")
+    max_bytes = pipeline_reporting.MAX_EMAIL_BYTES if args.max_mb is None else int(args.max_mb * 1024 * 1024)
+    pipeline_reporting.main(workers=args.workers, rapido=args.rapido, dpi=args.dpi,
+                            comprimir=not args.sin_zip, max_bytes=max_bytes)
+
+
+def _simulate(args) -> None:
+    import simulador
+    _marcar("importaciones")
+    simulador.main(args.host, args.puerto, args.col or simulador.PRICE_COL,
+                   simulador.UMBRAL_PCT if args.umbral is None else args.umbral, args.medir)
+
+
+# ---------------- ARGUMENTOS ---------------- #
+
+def _parser() -> argparse.ArgumentParser:
+    # Los defaults que viven en los módulos (umbral, timeout, tope del correo)
+    # quedan en None y los resuelve el subcomando, para no importarlos aquí
+    parser = argparse.ArgumentParser(prog="pricing", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tiempos", action="store_true",
+                        help="imprime el tiempo de arranque, importaciones y ejecución")
+    parser.add_argument("--perfil", default=None,
+                        help='etapas a perfilar, p. ej. "pricing.*" (ver instrumentacion.py)')
+    parser.add_argument("--prometheus", type=Path, default=None, help="ruta del textfile .prom")
+    sub = parser.add_subparsers(dest="comando", required=True, metavar="comando")
+
+    p = sub.add_parser("etl", help="Unidades.csv -> parquet limpio")
+    p.add_argument("--chunksize", type=int, default=None,
+                   help="filas por bloque; escribe un row group por bloque")
+    p.add_argument("--comparar", action="store_true", help="mide también la lectura con tipos inferidos")
+    p.set_defaults(func=_etl)
+
+    p = sub.add_parser("curve", help="curva por piso y recomendaciones")
+    p.add_argument("--proyecto", action="append", default=None,
+                   help="re-puntúa solo este proyecto (repetible); sin Excel ni correo")
+    p.add_argument("--col", default=None,
+                   help="precio_lista (por defecto), precio_m2 o varias separadas por coma (reporte combinado)")
+    p.add_argument("--umbral", type=float, default=None, help="tolerancia sobre la curva (0.03 = 3%%)")
+    p.add_argument("--modelos", default=None,
+                   help="modelos de curva candidatos, separados por coma (lineal, cuadratica, tramos, isotonica)")
+    p.add_argument("--umbrales", default=None,
+                   help="barre estos umbrales sobre el mismo delta, p. ej. 0.01,0.02,0.05")
+    p.add_argument("--top", type=int, default=15, help="unidades más desviadas a imprimir")
+    p.add_argument("--salida", type=Path, default=None, help="con --proyecto: .csv, .parquet o .xlsx")
+    p.add_argument("--incremental", action="store_true",
+                   help="inventario completo: reajusta solo los grupos cuyas unidades cambiaron")
+    p.add_argument("--sin-email", action="store_true", help="inventario completo: no envía el correo")
+    p.set_defaults(func=_curve)
+
+    p = sub.add_parser("detect", help="unidades que suben de precio al subir de piso")
+    p.add_argument("--col", default="precio_lista", help="precio_lista, precio_m2 o ambas separadas por coma")
+    p.add_argument("--tolerancia", type=float, default=None)
+    p.add_argument("--por-piso", default=None, help="max, median, min o mean del piso anterior")
+    p.add_argument("--salida", type=Path, default=None, help=".xlsx o .csv")
+    p.add_argument("--sin-exportar", action="store_true")
+    p.set_defaults(func=_detect)
+
+    p = sub.add_parser("elasticity", help="historial de precios y elasticidad por proyecto/tipología")
+    p.add_argument("--metodo", default="shrinkage", help="grupo, pooled o shrinkage")
+    p.set_defaults(func=_elasticity)
+
+    p = sub.add_parser("cube", help="precio promedio y separaciones por cualquier corte del cubo de ventas")
+    p.add_argument("--niveles", default="nombre_proyecto",
+                   help="nombre_proyecto, nombre_subdivision, nombre_tipologia, mes, trimestre o anio, "
+                        "separados por coma (vacío = total)")
+    p.add_argument("--proyecto", action="append", default=None, help="filtra por proyecto (repetible)")
+    p.add_argument("--tipologia", action="append", default=None, help="filtra por tipología (repetible)")
+    p.add_argument("--desde", default=None, help="primer mes, p. ej. 2025-01")
+    p.add_argument("--hasta", default=None, help="último mes")
+    p.add_argument("--salida", type=Path, default=None, help=".csv, .parquet o .xlsx")
+    p.set_defaults(func=_cube)
+
+    p = sub.add_parser("forecast", help="forecast de separaciones por proyecto/tipología")
+    p.add_argument("--workers", type=int, default=1, help="procesos en paralelo (1 = en serie)")
+    p.add_argument("--timeout", type=int, default=None, help="segundos máximos por combo (0 = sin límite)")
+    p.add_argument("--engine", default="auto", help="auto, prophet o baseline")
+    p.add_argument("--sin-excel", action="store_true", help="solo el dataset parquet")
+    p.set_defaults(func=_forecast)
+
+    p = sub.add_parser("optimize", help="escalera de precios por piso que maximiza el ingreso esperado")
+    p.add_argument("--col", default="precio_lista", help="precio_lista o precio_m2")
+    p.add_argument("--salida", type=Path, default=None, help=".xlsx")
+    p.add_argument("--sin-exportar", action="store_true")
+    p.set_defaults(func=_optimize)
+
+    p = sub.add_parser("report", help="gráficos econométricos y correo con los reportes")
+    p.add_argument("--workers", type=int, default=1, help="procesos para renderizar las curvas")
+    p.add_argument("--rapido", action="store_true", help="matplotlib puro, sin el bootstrap de seaborn")
+    p.add_argument("--dpi", type=int, default=200)
+    p.add_argument("--sin-zip", action="store_true", help="adjunta los archivos sueltos")
+    p.add_argument("--max-mb", type=float, default=None, help="tope por correo en MB")
+    p.set_defaults(func=_report)
+
+    p = sub.add_parser("simulate", help="servidor what-if: curva del grupo con el precio de una unidad cambiado")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--puerto", type=int, default=8765)
+    p.add_argument("--col", default=None, help="precio_lista (por defecto) o precio_m2")
+    p.add_argument("--umbral", type=float, default=None)
+    p.add_argument("--medir", type=int, default=0,
+                   help="mide la latencia de N simulaciones al azar y sale, sin servidor")
+    p.set_defaults(func=_simulate)
+    return parser
+
+
+def _imprimir_tiempos(comando: str, t0: float) -> None:
+    previo, partes = t0, []
+    for nombre, t in _marcas:
+        partes.append(f"{nombre} {t - previo:.3f} s")
+        previo = t
+    cargados = [m for m in PESADOS if m in sys.modules]
+    print(f">>> [PRICING CLI] {comando}: {', '.join(partes)} (total {previo - t0:.3f} s)")
+    print(f">>> [PRICING CLI] Cargados: {', '.join(cargados) or 'ninguno'}")
+
+
+def main(argv: list[str] | None = None, t0: float = T0) -> int:
+    """
+    t0: inicio del proceso según quien llama (el script ./pricing lo toma
+    antes de cualquier import); por defecto, la carga de este módulo.
+    """
+    args = _parser().parse_args(argv)
+    if args.perfil is not None or args.prometheus is not None:
+        import instrumentacion
+        instrumentacion.configurar(perfil=args.perfil, prometheus=args.prometheus)
+    _marcar("arranque")
+    try:
+        args.func(args)
+    finally:
+        _marcar("ejecución")
+        if args.tiempos:
+            _imprimir_tiempos(args.comando, t0)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+# src/cubo_ventas.py
+"""
+Cubo de precios y separaciones al grano (proyecto, subdivisión, tipología,
+mes), materializado en la capa intermedia (tabla "cubo_ventas"):
+
+    precio_suma, precio_n   suma y conteo de precio_lista de las unidades vigentes
+    separaciones            suma de separaciones del mes (NaN: sin dato)
+    mes_precio              mes del snapshot del que vienen los precios
+
+Como en historial_precios, un mes sin snapshot hereda los precios del último
+snapshot anterior (el inventario no cambió entre snapshots). Las
+separaciones que no traen subdivisión quedan con subdivisión nula y suman
+igual en cualquier corte por proyecto/tipología.
+
+Las consultas agregan sobre el cubo y no sobre las tablas crudas; cada corte
+pedido queda en caché y los siguientes se derivan del corte en caché más
+chico que los contenga (trimestre y año se derivan del mes). La caché se
+guarda junto al grano (tabla "cubo_cortes"), así que otra corrida o el CLI
+la retoman sin reagregar. Al llegar meses nuevos solo se reagregan el grano
+y los cortes desde el primer mes que cambió.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from historial_precios import KEY_COLS, leer_historial
+from intermediate_store import STORE_DIR, guardar_tabla, leer_tabla, ruta_tabla
+
+LLAVES = ["nombre_proyecto", "nombre_subdivision", "nombre_tipologia"]
+GRANO = LLAVES + ["mes"]
+MEDIDAS = ["precio_suma", "precio_n", "separaciones"]
+CUBO_COLS = GRANO + MEDIDAS + ["mes_precio"]
+
+# Dimensiones de tiempo derivadas del mes, de la más fina a la más gruesa
+TIEMPO = {
+    "mes": lambda mes: mes,
+    "trimestre": lambda mes: mes.dt.to_period("Q").dt.start_time,
+    "anio": lambda mes: mes.dt.year,
+}
+DIMENSIONES = LLAVES + list(TIEMPO)
+
+
+def _mes(s: pd.Series) -> pd.Series:
+    # '2025-10', fechas o timestamps -> primer día del mes
+    return pd.to_datetime(s).dt.to_period("M").dt.to_timestamp()
+
+
+def _vacio() -> pd.DataFrame:
+    return pd.DataFrame({
+        **{c: pd.Series(dtype=object) for c in LLAVES},
+        "mes": pd.Series(dtype="datetime64[ns]"),
+        "precio_suma": pd.Series(dtype=float),
+        "precio_n": pd.Series(dtype="int64"),
+        "separaciones": pd.Series(dtype=float),
+        "mes_precio": pd.Series(dtype="datetime64[ns]"),
+    })
+
+
+def _llaves(df: pd.DataFrame) -> pd.DataFrame:
+    # Llaves como objetos: los merges y concat entre cortes no dependen de las categorías
+    out = df.copy()
+    for c in LLAVES:
+        out[c] = out[c].astype(object) if c in out.columns else None
+    return out
+
+
+def _agregar_precios(df: pd.DataFrame, por: list[str]) -> pd.DataFrame:
+    # Suma y conteo de precio_lista; con columna "unidades" cada fila pesa sus unidades
+    df = _llaves(df)
+    if "unidades" in df.columns:
+        df = df.assign(precio_suma=df["precio_lista"] * df["unidades"], precio_n=df["unidades"])
+    else:
+        df = df.assign(precio_suma=df["precio_lista"], precio_n=df["precio_lista"].notna().astype("int64"))
+    return (
+        df.groupby(por, dropna=False, sort=False)[["precio_suma", "precio_n"]].sum()
+        .reset_index()
+        .astype({"precio_n": "int64"})
+    )
+
+
+def _agregar_separaciones(df_sep: pd.DataFrame) -> pd.DataFrame:
+    df = _llaves(df_sep).assign(mes=_mes(df_sep["mes"] if "mes" in df_sep.columns else df_sep["fecha"]))
+    return (
+        df.groupby(GRANO, dropna=False, sort=False)["separaciones"].sum(min_count=1)
+        .reset_index()
+    )
+
+
+def _combinar(precios: pd.DataFrame, separaciones: pd.DataFrame) -> pd.DataFrame:
+    # Una llave toda nula sale del groupby como float: se vuelve a objeto para el merge
+    objetos = {c: object for c in LLAVES}
+    out = precios.astype(objetos).merge(separaciones.astype(objetos), on=GRANO, how="outer")
+    out["precio_suma"] = out["precio_suma"].fillna(0.0)
+    out["precio_n"] = out["precio_n"].fillna(0).astype("int64")
+    return out[CUBO_COLS]
+
+
+def _rollup(base: pd.DataFrame, niveles: list[str]) -> pd.DataFrame:
+    """
+    Agrega un corte (del grano o de otro rollup más fino) a `niveles`. Las
+    separaciones suman con min_count=1: un corte sin ningún dato queda NaN.
+    """
+    df = base
+    for t in TIEMPO:
+        if t in niveles and t not in df.columns:
+            # Desde el nivel de tiempo más fino que tenga el origen
+            fino = next(f for f in TIEMPO if f in df.columns)
+            df = df.assign(**{t: TIEMPO[t](df[fino])})
+    if not niveles:
+        df = df.assign(_total=0)
+    grupos = df.groupby(niveles or ["_total"], dropna=False, sort=True)
+    out = pd.concat([
+        grupos[["precio_suma", "precio_n"]].sum(),
+        grupos["separaciones"].sum(min_count=1),
+    ], axis=1).reset_index()
+    if not niveles:
+        out = out.drop(columns="_total")
+    return out[niveles + MEDIDAS]
+
+
+def _deriva(origen: tuple[str, ...], niveles: tuple[str, ...]) -> bool:
+    # Un corte sirve de origen si tiene cada nivel pedido o uno de tiempo más fino
+    finos = list(TIEMPO)
+    return all(n in origen or (n in TIEMPO and any(t in origen for t in finos[:finos.index(n)]))
+               for n in niveles)
+
+
+class CuboVentas:
+    """
+    Grano materializado + caché de cortes más gruesos. Las actualizaciones
+    reemplazan el grano desde un mes en adelante y refrescan los cortes en
+    caché solo en esos períodos.
+    """
+
+    def __init__(self, base: pd.DataFrame | None = None,
+                 cortes: dict[tuple[str, ...], pd.DataFrame] | None = None):
+        self.base = _vacio() if base is None else _llaves(base)[CUBO_COLS]
+        self._ordenar()
+        self._cortes: dict[tuple[str, ...], pd.DataFrame] = dict(cortes or {})
+        self.cortes_nuevos = False   # hay cortes en caché que no están guardados
+
+    # ---------- Construcción y persistencia ---------- #
+
+    @classmethod
+    def desde_tablas(cls, precios: pd.DataFrame, df_sep: pd.DataFrame) -> "CuboVentas":
+        """
+        Cubo desde tablas ya mensuales: precios por unidad o promedios por
+        grupo y mes (columna "unidades" opcional como peso) y separaciones.
+        Cada mes usa sus propios precios, sin heredar.
+        """
+        precios = precios.assign(mes=_mes(precios["mes"]))
+        p = _agregar_precios(precios, GRANO)
+        p["mes_precio"] = p["mes"]
+        return cls(_combinar(p, _agregar_separaciones(df_sep)))
+
+    @classmethod
+    def desde_historial(cls, df_sep: pd.DataFrame | None = None, **kwargs) -> "CuboVentas":
+        """
+        Reconstruye el cubo desde el historial de precios: el inventario
+        vigente al último snapshot de cada mes, y luego las separaciones.
+        """
+        cubo = cls()
+        hist = leer_historial(**kwargs)
+        if len(hist):
+            fechas = hist["fecha"].drop_duplicates().sort_values()
+            cortes = fechas.groupby(_mes(fechas)).max()
+            for mes, corte in cortes.items():
+                # historial ordenado por llave y fecha: el último registro es el vigente al corte
+                estado = hist[hist["fecha"] <= corte].drop_duplicates(KEY_COLS, keep="last")
+                cubo.actualizar_precios(estado[estado["vigente"]], mes)
+        if df_sep is not None:
+            cubo.actualizar_separaciones(df_sep)
+        return cubo
+
+    def guardar(self, store_dir: Path = STORE_DIR) -> Path:
+        path = guardar_tabla("cubo_ventas", self.base, store_dir)
+        self.guardar_cortes(store_dir)
+        return path
+
+    def guardar_cortes(self, store_dir: Path = STORE_DIR) -> Path:
+        # Todos los cortes en una tabla; se escribe después del grano (cargar_cubo compara fechas)
+        apilados = [_llaves(c).assign(corte=",".join(niveles)) for niveles, c in self._cortes.items()]
+        columnas = ["corte"] + DIMENSIONES + MEDIDAS
+        df = pd.concat(apilados, ignore_index=True).reindex(columns=columnas) if apilados \
+            else pd.DataFrame(columns=columnas)
+        # Una dimensión que ningún corte tiene queda toda NaN (float): se lleva al tipo del esquema
+        df = df.astype({**{c: object for c in LLAVES}, "anio": "Int32"})
+        for t in ("mes", "trimestre"):
+            df[t] = pd.to_datetime(df[t])
+        self.cortes_nuevos = False
+        return guardar_tabla("cubo_cortes", df, store_dir)
+
+    # ---------- Actualización incremental ---------- #
+
+    def _ordenar(self) -> None:
+        self.base = self.base.sort_values(GRANO, kind="stable").reset_index(drop=True)
+
+    def _reemplazar(self, desde: pd.Timestamp, nuevo: pd.DataFrame) -> None:
+        self.base = pd.concat([self.base[self.base["mes"] < desde], nuevo], ignore_index=True)
+        self._ordenar()
+        # Cortes con tiempo: se reagregan solo los períodos que tocan meses >= desde;
+        # los que no tienen tiempo se recalculan al pedirlos
+        for niveles in list(self._cortes):
+            tiempo = next((t for t in TIEMPO if t in niveles), None)
+            if tiempo is None:
+                del self._cortes[niveles]
+                continue
+            inicio = TIEMPO[tiempo](pd.Series([desde]))[0]
+            corte = self._cortes[niveles]
+            tramo = self.base[TIEMPO[tiempo](self.base["mes"]) >= inicio]
+            self._cortes[niveles] = (
+                pd.concat([corte[corte[tiempo] < inicio], _rollup(tramo, list(niveles))], ignore_index=True)
+                .sort_values(list(niveles), kind="stable")
+                .reset_index(drop=True)
+            )
+
+    def actualizar_precios(self, vigentes: pd.DataFrame, mes) -> None:
+        """
+        Registra el inventario vigente de un snapshot del mes `mes`: sus
+        precios pasan a ese mes y a los siguientes que ya estén en el cubo.
+        """
+        mes = pd.Timestamp(mes).to_period("M").to_timestamp()
+        tramo = self.base[self.base["mes"] >= mes]
+        meses = pd.DataFrame({"mes": np.union1d(tramo["mes"].unique(), [np.datetime64(mes, "ns")])})
+        precios = _agregar_precios(vigentes, LLAVES).merge(meses, how="cross").assign(mes_precio=mes)
+        seps = tramo.loc[tramo["separaciones"].notna(), GRANO + ["separaciones"]]
+        self._reemplazar(mes, _combinar(precios, seps))
+
+    def actualizar_separaciones(self, df_sep: pd.DataFrame) -> int:
+        """
+        Carga las separaciones desde el último mes ya cargado (que pudo estar
+        incompleto) en adelante; los meses anteriores no se releen. Los meses
+        nuevos heredan los precios del mes anterior del cubo. Devuelve los
+        meses cargados.
+        """
+        sep = _agregar_separaciones(df_sep)
+        cargado = self.base.loc[self.base["separaciones"].notna(), "mes"].max()
+        if pd.notna(cargado):
+            sep = sep[sep["mes"] >= cargado]
+        if sep.empty:
+            return 0
+        desde = sep["mes"].min()
+
+        tramo = self.base[self.base["mes"] >= desde]
+        precios = [tramo.loc[tramo["mes_precio"].notna(), GRANO + ["precio_suma", "precio_n", "mes_precio"]]]
+        existentes = np.sort(self.base["mes"].unique())
+        for mes in np.setdiff1d(sep["mes"].unique(), existentes):
+            previos = existentes[existentes < mes]
+            if len(previos):
+                fila = self.base[(self.base["mes"] == previos[-1]) & self.base["mes_precio"].notna()]
+                precios.append(fila[GRANO + ["precio_suma", "precio_n", "mes_precio"]].assign(mes=mes))
+        self._reemplazar(desde, _combinar(pd.concat(precios, ignore_index=True), sep))
+        return int(sep["mes"].nunique())
+
+    # ---------- Consultas ---------- #
+
+    def rollup(self, niveles: list[str]) -> pd.DataFrame:
+        """
+        Corte por `niveles` (subconjunto de DIMENSIONES) desde la caché: si
+        no está, se deriva del corte en caché más chico que lo contenga, o
+        del grano.
+        """
+        desconocidos = [n for n in niveles if n not in DIMENSIONES]
+        if desconocidos:
+            raise ValueError(f"Niveles desconocidos: {desconocidos} (opciones: {', '.join(DIMENSIONES)})")
+        # La caché va en el orden de DIMENSIONES: el mismo corte pedido en otro orden se reutiliza
+        clave = tuple(sorted(set(niveles), key=DIMENSIONES.index))
+        if clave not in self._cortes:
+            origenes = [c for c in self._cortes if _deriva(c, clave)]
+            origen = min((self._cortes[c] for c in origenes), key=len, default=self.base)
+            self._cortes[clave] = _rollup(origen, list(clave))
+            self.cortes_nuevos = True
+        corte = self._cortes[clave]
+        return corte if list(clave) == list(niveles) else corte[list(niveles) + MEDIDAS]
+
+    def consultar(self, niveles: list[str], filtro: dict | None = None,
+                  desde=None, hasta=None) -> pd.DataFrame:
+        """
+        Precio promedio (precio_suma / precio_n) y separaciones por
+        `niveles`, opcionalmente filtrado por igualdad de dimensiones
+        (p. ej. {"nombre_proyecto": ["Alicanto", "Bosque"]}) y rango de
+        meses. Los filtros sobre dimensiones fuera de `niveles` se resuelven
+        sobre un corte que las incluye y luego se vuelve a agregar.
+        """
+        niveles = list(niveles)
+        filtro = dict(filtro or {})
+        extra = [c for c in filtro if c not in niveles]
+        if (desde is not None or hasta is not None) and "mes" not in niveles:
+            extra.append("mes")
+        out = self.rollup(niveles + extra)
+
+        mascara = np.ones(len(out), dtype=bool)
+        for col, val in filtro.items():
+            mascara &= out[col].isin(val if isinstance(val, (list, tuple, set)) else [val]).to_numpy()
+        if desde is not None:
+            mascara &= (out["mes"] >= pd.Timestamp(desde)).to_numpy()
+        if hasta is not None:
+            mascara &= (out["mes"] <= pd.Timestamp(hasta)).to_numpy()
+        out = out[mascara]
+        if extra:
+            out = _rollup(out, niveles)
+
+        out = out.reset_index(drop=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out["precio_lista"] = out["precio_suma"] / out["precio_n"].where(out["precio_n"] > 0)
+        return out
+
+
+def _leer_cortes(store_dir: Path) -> dict[tuple[str, ...], pd.DataFrame]:
+    # Solo si se guardaron después del grano: si no, pueden no corresponder a él
+    ruta, grano = ruta_tabla("cubo_cortes", store_dir), ruta_tabla("cubo_ventas", store_dir)
+    if not ruta.exists() or ruta.stat().st_mtime < grano.stat().st_mtime:
+        return {}
+    df = _llaves(leer_tabla("cubo_cortes", store_dir))
+    cortes = {}
+    for corte, sub in df.groupby("corte", sort=False, observed=True):
+        niveles = tuple(corte.split(",")) if corte else ()
+        out = sub[list(niveles) + MEDIDAS].reset_index(drop=True)
+        if "anio" in niveles:
+            out["anio"] = out["anio"].astype("int32")
+        cortes[niveles] = out
+    return cortes
+
+
+def cargar_cubo(store_dir: Path = STORE_DIR) -> CuboVentas:
+    """
+    Cubo persistido con su caché de cortes; si todavía no existe, se
+    reconstruye desde el historial de precios (sin separaciones: las carga
+    la etapa de elasticidad).
+    """
+    if ruta_tabla("cubo_ventas", store_dir).exists():
+        return CuboVentas(leer_tabla("cubo_ventas", store_dir), _leer_cortes(store_dir))
+    return CuboVentas.desde_historial()
+
+
+def main(niveles: list[str], filtro: dict | None = None, desde=None, hasta=None,
+         salida: Path | None = None) -> pd.DataFrame:
+    cubo = cargar_cubo()
+    out = cubo.consultar(niveles, filtro, desde, hasta)
+    if cubo.cortes_nuevos and ruta_tabla("cubo_ventas").exists():
+        cubo.guardar_cortes()
+    print(f">>> [CUBO] {len(cubo.base):,} filas en el grano; corte por {', '.join(niveles) or 'total'}:")
+    print(out.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+    if salida is not None:
+        from exportar_excel import exportar_tabla  # openpyxl solo si se exporta
+        print(f">>> [CUBO] Exportado: {exportar_tabla(salida, out, hoja='cubo')}")
+    return out
@@ -0,0 +1,452 @@
+# src/curve_engine.py
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from curve_models import NOMBRES, MODELOS, elegir_modelos, error_cv, validar_modelos
+
+GROUP_COLS = ["nombre_proyecto", "nombre_subdivision", "nombre_tipologia"]
+UMBRAL_PCT = 0.03          # 3% tolerancia
+PRICE_COL = "precio_lista" # o "precio_m2"
+MODELOS_CURVA = ("lineal", "cuadratica", "tramos", "isotonica")  # candidatos por grupo (curve_models)
+UMBRALES_SENSIBILIDAD = (0.01, 0.02, 0.03, 0.05, 0.075, 0.10)
+METRICAS = ("precio_lista", "precio_m2")  # evaluar_metricas: ambas en una sola pasada
+
+ESTADO_SIN_CURVA = "Sin curva (solo 1 piso)"
+ESTADO_CARO = "Sobre la curva (caro)"
+ESTADO_BARATO = "Debajo de la curva (barato)"
+ESTADO_EN_LINEA = "En línea con la curva"
+
+# estado va como categórica de 1 byte por unidad; el código es la posición aquí
+ESTADOS = [ESTADO_SIN_CURVA, ESTADO_CARO, ESTADO_BARATO, ESTADO_EN_LINEA]
+ESTADO_DTYPE = pd.CategoricalDtype(ESTADOS)
+MODELO_DTYPE = pd.CategoricalDtype(NOMBRES)
+
+# La recomendación no se guarda: sale de estado/delta_pct/delta/precio_sugerido
+# al exportar (agregar_recomendacion)
+RESULT_COLS = GROUP_COLS + [
+    "unidad", "PISO", "precio_real", "precio_esperado", "delta",
+    "delta_pct", "estado", "precio_sugerido", "modelo_curva",
+]
+REPORT_COLS = RESULT_COLS + ["recomendacion"]
+
+
+def codigos_grupo(df: pd.DataFrame) -> np.ndarray:
+    """
+    Código entero por unidad, en el mismo orden que df.groupby(GROUP_COLS).
+    """
+    return df.groupby(GROUP_COLS, dropna=False, sort=True, observed=True).ngroup().to_numpy()
+
+
+def ajustar_rectas(floors: pd.DataFrame, n_grupos: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    OLS cerrado (precio = m*piso + b) sobre los promedios por piso de cada grupo,
+    todos los grupos a la vez. Devuelve (slope, intercept, n_pisos) por grupo;
+    los grupos con un solo piso quedan con slope/intercept NaN.
+    """
+    g = floors["grupo"].to_numpy()
+    x = floors["PISO"].to_numpy(dtype=float)
+    y = floors["mean"].to_numpy(dtype=float)
+
+    n = np.bincount(g, minlength=n_grupos).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_bar = np.bincount(g, weights=x, minlength=n_grupos) / n
+        y_bar = np.bincount(g, weights=y, minlength=n_grupos) / n
+        dx = x - x_bar[g]
+        sxx = np.bincount(g, weights=dx * dx, minlength=n_grupos)
+        sxy = np.bincount(g, weights=dx * (y - y_bar[g]), minlength=n_grupos)
+        slope = sxy / sxx
+    intercept = y_bar - slope * x_bar
+
+    sin_curva = n < 2
+    slope[sin_curva] = np.nan
+    intercept[sin_curva] = np.nan
+    return slope, intercept, n.astype(int)
+
+
+def texto_recomendacion(estado, delta_pct: np.ndarray,
+                        delta: np.ndarray, sugerido: np.ndarray) -> list[str]:
+    textos = []
+    for e, pct, d, nuevo in zip(estado, delta_pct, delta, sugerido):
+        if e == ESTADO_CARO:
+            textos.append(
+                f"Precio sobre la curva (+{pct:.1f}%). "
+                f"Considerar BAJAR a ~S/ {nuevo:,.0f} "
+                f"(∆ S/ {d:,.0f})."
+            )
+        elif e == ESTADO_BARATO:
+            textos.append(
+                f"Precio bajo la curva ({pct:.1f}%). "
+                f"Considerar SUBIR a ~S/ {nuevo:,.0f} "
+                f"(∆ S/ {abs(d):,.0f})."
+            )
+        elif e == ESTADO_EN_LINEA:
+            textos.append("Precio alineado, mantener sin cambios.")
+        else:
+            textos.append("No hay suficiente data por piso; revisar manualmente.")
+    return textos
+
+
+def agregar_recomendacion(result: pd.DataFrame) -> pd.DataFrame:
+    """
+    Resultado con la columna de texto, solo para exportar (Excel/correo).
+    """
+    out = result.copy()
+    out["recomendacion"] = texto_recomendacion(
+        out["estado"], out["delta_pct"].to_numpy(), out["delta"].to_numpy(),
+        out["precio_sugerido"].to_numpy())
+    return out[REPORT_COLS]
+
+
+def clasificar(real: np.ndarray, esperado: np.ndarray, sin_curva: np.ndarray,
+               umbral_pct: float = UMBRAL_PCT) -> tuple[np.ndarray, ...]:
+    """
+    Regla de la curva por unidad dado su precio esperado en la recta:
+    (esperado, delta, delta_pct, código de estado en ESTADOS, precio_sugerido).
+    Las unidades sin_curva quedan con su propio precio como esperado.
+    """
+    esperado = np.where(sin_curva, real, esperado)
+    delta = np.where(sin_curva, 0.0, real - esperado)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = np.where(esperado != 0, delta / esperado, 0.0)
+
+    caro = ~sin_curva & (ratio > umbral_pct)
+    barato = ~sin_curva & (ratio < -umbral_pct)
+    estado = np.select([sin_curva, caro, barato], [0, 1, 2], default=3).astype(np.int8)
+    sugerido = np.where(caro | barato, np.round(esperado, -2), real)
+    delta_pct = np.where(sin_curva, 0.0, ratio * 100)
+    return esperado, delta, delta_pct, estado, sugerido
+
+
+def resultado_vacio() -> pd.DataFrame:
+    out = pd.DataFrame(columns=RESULT_COLS)
+    out["estado"] = out["estado"].astype(ESTADO_DTYPE)
+    out["modelo_curva"] = out["modelo_curva"].astype(MODELO_DTYPE)
+    return out
+
+
+class Curvas(NamedTuple):
+    codes: np.ndarray       # código de grupo por unidad
+    floors: pd.DataFrame    # grupo, PISO, sum, count, mean, esperado
+    slope: np.ndarray       # recta por grupo (NaN si un solo piso), elegida o no
+    intercept: np.ndarray
+    n_pisos: np.ndarray
+    modelo: np.ndarray      # nombre del modelo elegido por grupo (None si un solo piso)
+    error_cv: pd.DataFrame  # error cuadrático medio de CV por grupo (filas) y modelo (columnas)
+    piso_unidad: np.ndarray # fila de floors de cada unidad
+
+
+def ajustar_curvas_metricas(df: pd.DataFrame, price_cols=(PRICE_COL,),
+                            modelos=MODELOS_CURVA) -> dict[str, Curvas]:
+    """
+    Curvas de varias métricas de precio con un solo agrupamiento del
+    inventario: un groupby (grupo, PISO) con todas las columnas de precio, y
+    luego cada (métrica, grupo) entra como un grupo más de la tabla de pisos
+    apilada, así que cada ajuste, pliegue de CV y resolución es una sola
+    llamada para todas las métricas. En floors["esperado"] queda la
+    predicción del modelo elegido por validación cruzada para cada grupo.
+    """
+    modelos = validar_modelos(modelos)
+    price_cols = list(dict.fromkeys(price_cols))
+    codes = codigos_grupo(df)
+    n_grupos = int(codes.max()) + 1 if len(codes) else 0
+    pisos = df["PISO"].to_numpy()
+    agg = (
+        pd.DataFrame({"grupo": codes, "PISO": pisos, **{c: df[c].to_numpy(dtype=float) for c in price_cols}})
+        .groupby(["grupo", "PISO"], sort=True)[price_cols]
+        .agg(["sum", "count"])
+    )
+    llaves = agg.index.to_frame(index=False)
+    n_m, n_f = len(price_cols), len(llaves)
+    floors = pd.DataFrame({
+        "grupo": np.concatenate([llaves["grupo"].to_numpy() + i * n_grupos for i in range(n_m)]),
+        "PISO": np.tile(llaves["PISO"].to_numpy(), n_m),
+        "sum": np.concatenate([agg[(c, "sum")].to_numpy() for c in price_cols]),
+        "count": np.concatenate([agg[(c, "count")].to_numpy() for c in price_cols]),
+    })
+    floors["mean"] = floors["sum"] / floors["count"]
+    slope, intercept, n_pisos, modelo, err = _seleccionar_modelos(floors, n_grupos * n_m, modelos)
+
+    # Fila de floors de cada unidad: floors viene ordenado por (grupo, PISO)
+    p_min = int(pisos.min()) if len(pisos) else 0
+    ancho = int(pisos.max()) - p_min + 1 if len(pisos) else 1
+    clave = llaves["grupo"].to_numpy(dtype=np.int64) * ancho + (llaves["PISO"].to_numpy(dtype=np.int64) - p_min)
+    piso_unidad = np.searchsorted(clave, codes.astype(np.int64) * ancho + (pisos.astype(np.int64) - p_min))
+
+    curvas = {}
+    for i, c in enumerate(price_cols):
+        gs, fs = slice(i * n_grupos, (i + 1) * n_grupos), slice(i * n_f, (i + 1) * n_f)
+        f = floors.iloc[fs].reset_index(drop=True)
+        f["grupo"] = llaves["grupo"].to_numpy()
+        curvas[c] = Curvas(codes, f, slope[gs], intercept[gs], n_pisos[gs], modelo[gs],
+                           pd.DataFrame(err[gs], columns=modelos), piso_unidad)
+    return curvas
+
+
+def _seleccionar_modelos(floors: pd.DataFrame, n_grupos: int, modelos: list[str]):
+    """
+    Recta, error de CV y modelo elegido por grupo; agrega floors["esperado"].
+    """
+    slope, intercept, n_pisos = ajustar_rectas(floors, n_grupos)
+    g = floors["grupo"].to_numpy()
+    x = floors["PISO"].to_numpy(dtype=float)
+    y = floors["mean"].to_numpy(dtype=float)
+    err = error_cv(g, x, y, n_grupos, modelos) if modelos != ["lineal"] else np.full((n_grupos, 1), np.nan)
+    modelo = elegir_modelos(err, modelos)
+
+    # La recta sale de ajustar_rectas (mismos números que sin selección);
+    # el resto de los modelos se ajusta con todos los pisos solo si algún grupo lo eligió
+    esperado = slope[g] * x + intercept[g]
+    finito = np.isfinite(y)
+    for nombre in set(modelo) - {"lineal"}:
+        filas = modelo[g] == nombre
+        pred = MODELOS[nombre].ajustar(g, x, y, finito, n_grupos)
+        esperado[filas] = pred[filas]
+    # Si el modelo elegido no predice algún piso con precio, el grupo vuelve a la recta
+    falla = np.zeros(n_grupos, dtype=bool)
+    falla[g[finito & ~np.isfinite(esperado)]] = True
+    falla &= modelo != "lineal"
+    if falla.any():
+        modelo[falla] = "lineal"
+        filas = falla[g]
+        esperado[filas] = slope[g[filas]] * x[filas] + intercept[g[filas]]
+    modelo[n_pisos < 2] = None
+    floors["esperado"] = esperado
+    return slope, intercept, n_pisos, modelo, err
+
+
+def ajustar_curvas(df: pd.DataFrame, price_col: str = PRICE_COL,
+                   modelos=MODELOS_CURVA) -> Curvas:
+    """
+    Agrupa el inventario una sola vez, ajusta todos los modelos candidatos en
+    todos los grupos a la vez y deja en floors["esperado"] la predicción del
+    modelo elegido por validación cruzada para cada grupo.
+    """
+    return ajustar_curvas_metricas(df, [price_col], modelos)[price_col]
+
+
+class Puntaje(NamedTuple):
+    real: np.ndarray        # arrays por unidad, en el orden de df
+    esperado: np.ndarray
+    delta: np.ndarray
+    delta_pct: np.ndarray
+    estado: np.ndarray      # código en ESTADOS
+    sugerido: np.ndarray
+    modelo: np.ndarray      # código en NOMBRES (-1 sin curva)
+
+
+def puntuar(df: pd.DataFrame, curvas: Curvas, price_col: str = PRICE_COL,
+            umbral_pct: float = UMBRAL_PCT) -> Puntaje:
+    """
+    clasificar sobre curvas ya ajustadas, por unidad y sin reordenar.
+    """
+    codes = curvas.codes
+    real = df[price_col].to_numpy(dtype=float)
+    sin_curva = (curvas.n_pisos < 2)[codes]
+    esperado, delta, delta_pct, estado, sugerido = clasificar(
+        real, curvas.floors["esperado"].to_numpy()[curvas.piso_unidad], sin_curva, umbral_pct)
+    cod_modelo = np.array([NOMBRES.index(m) if m else -1 for m in curvas.modelo], dtype=np.int8)
+    return Puntaje(real, esperado, delta, delta_pct, estado, sugerido, cod_modelo[codes])
+
+
+def puntaje_desde_resultado(df: pd.DataFrame, result: pd.DataFrame, price_col: str = PRICE_COL,
+                            umbral_pct: float = UMBRAL_PCT) -> Puntaje:
+    """
+    Puntaje por unidad de df a partir de un resultado ya puntuado (p. ej. el
+    incremental): el precio esperado es uno por (grupo, PISO) y el modelo uno
+    por grupo, así que basta cruzarlos y reclasificar sin ajustar curvas.
+    """
+    llaves = GROUP_COLS + ["PISO"]
+    por_piso = result.drop_duplicates(llaves)[llaves + ["precio_esperado", "modelo_curva"]]
+    cruce = df[llaves].merge(por_piso, on=llaves, how="left", sort=False)
+    cod_modelo = cruce["modelo_curva"].astype(MODELO_DTYPE).cat.codes.to_numpy().astype(np.int8)
+    real = df[price_col].to_numpy(dtype=float)
+    esperado, delta, delta_pct, estado, sugerido = clasificar(
+        real, cruce["precio_esperado"].to_numpy(dtype=float), cod_modelo < 0, umbral_pct)
+    return Puntaje(real, esperado, delta, delta_pct, estado, sugerido, cod_modelo)
+
+
+def puntuar_unidades(df: pd.DataFrame, curvas: Curvas, price_col: str = PRICE_COL,
+                     umbral_pct: float = UMBRAL_PCT, puntaje: Puntaje | None = None) -> pd.DataFrame:
+    """
+    Precio esperado, delta, estado y precio sugerido por unidad a partir de
+    curvas ya ajustadas, en el orden del reporte (grupo, peor desvío primero).
+    Si ya se tiene el puntaje de esas curvas no se vuelve a clasificar.
+
+    Las llaves de grupo y estado salen como categóricas y cada columna se
+    arma ya en ese orden (un solo take por columna, sin ordenar el DataFrame).
+    """
+    codes = curvas.codes
+    pisos = df["PISO"].to_numpy()
+    if puntaje is None:
+        puntaje = puntuar(df, curvas, price_col, umbral_pct)
+    real, esperado, delta, delta_pct, estado, sugerido, cod_modelo = puntaje
+
+    # Mismo orden que el sort del loop: grupo asc, delta_pct desc (estable)
+    order = np.lexsort((-delta_pct, codes))
+
+    def llave(c: str) -> pd.Categorical:
+        col = df[c] if isinstance(df[c].dtype, pd.CategoricalDtype) else df[c].astype("category")
+        return pd.Categorical.from_codes(col.cat.codes.to_numpy()[order], dtype=col.dtype)
+
+    return pd.DataFrame({
+        **{c: llave(c) for c in GROUP_COLS},
+        "unidad"          : df["nombre_unidad"].to_numpy()[order] if "nombre_unidad" in df.columns else None,
+        "PISO"            : pisos[order],
+        "precio_real"     : real[order],
+        "precio_esperado" : esperado[order],
+        "delta"           : delta[order],
+        "delta_pct"       : delta_pct[order],
+        "estado"          : pd.Categorical.from_codes(estado[order], dtype=ESTADO_DTYPE),
+        "precio_sugerido" : sugerido[order],
+        "modelo_curva"    : pd.Categorical.from_codes(cod_modelo[order], dtype=MODELO_DTYPE),
+    })
+
+
+def evaluar_unidades(df: pd.DataFrame, price_col: str = PRICE_COL,
+                     umbral_pct: float = UMBRAL_PCT, modelos=MODELOS_CURVA) -> pd.DataFrame:
+    """
+    Versión vectorizada del loop por grupo de run_pricing_model: promedios por
+    piso, curva por grupo, precio esperado, delta, estado y precio sugerido
+    calculados como columnas completas. Devuelve el mismo orden (grupo, peor
+    desvío primero) que el loop original; la recomendación en texto se agrega
+    al exportar con agregar_recomendacion. Con modelos=("lineal",) el
+    resultado es el de la recta del loop original.
+    """
+    if df.empty:
+        return resultado_vacio()
+    return puntuar_unidades(df, ajustar_curvas(df, price_col, modelos), price_col, umbral_pct)
+
+
+def columnas_metricas(price_cols) -> list[str]:
+    cols = GROUP_COLS + ["unidad", "PISO"]
+    for c in price_cols:
+        cols += [c, f"{c}_esperado", f"{c}_delta_pct", f"{c}_estado", f"{c}_sugerido", f"{c}_modelo"]
+    return cols + ["fuera_de_curva", "metricas_fuera"]
+
+
+def evaluar_metricas(df: pd.DataFrame, price_cols=METRICAS, umbral_pct: float = UMBRAL_PCT,
+                     modelos=MODELOS_CURVA,
+                     previos: dict[str, pd.DataFrame] | None = None) -> tuple[pd.DataFrame, dict[str, pd.DataFrame]]:
+    """
+    Puntúa varias métricas de precio con un solo ajuste (ajustar_curvas_metricas).
+    Devuelve (reporte combinado, {métrica: resultado como evaluar_unidades}).
+    Las métricas de previos ({métrica: resultado ya puntuado de df}) no se
+    reajustan: entran al combinado con puntaje_desde_resultado y se devuelve
+    ese mismo resultado.
+    El combinado tiene una fila por unidad con las columnas de cada métrica y
+    marca fuera_de_curva si la unidad está cara o barata en cualquiera; va
+    por grupo, primero las fuera de curva y de mayor desvío absoluto.
+    """
+    price_cols = list(dict.fromkeys(price_cols))
+    if df.empty:
+        return pd.DataFrame(columns=columnas_metricas(price_cols)), {c: resultado_vacio() for c in price_cols}
+    previos = {c: r for c, r in (previos or {}).items() if c in price_cols}
+    curvas = ajustar_curvas_metricas(df, [c for c in price_cols if c not in previos], modelos) \
+        if len(previos) < len(price_cols) else {}
+    # Una sola clasificación por métrica: sirve al combinado y a cada resultado
+    puntajes = {c: puntuar(df, cv, c, umbral_pct) for c, cv in curvas.items()}
+    puntajes.update({c: puntaje_desde_resultado(df, r, c, umbral_pct) for c, r in previos.items()})
+    resultados = {c: previos[c] if c in previos else puntuar_unidades(df, curvas[c], c, umbral_pct, puntajes[c])
+                  for c in price_cols}
+
+    codes = codigos_grupo(df)
+    fuera = np.zeros(len(df), dtype=bool)
+    peor = np.zeros(len(df))
+    etiqueta = np.zeros(len(df), dtype=np.int64)  # bit i: fuera de curva en price_cols[i]
+    for i, c in enumerate(price_cols):
+        p = puntajes[c]
+        fuera_c = (p.estado == 1) | (p.estado == 2)
+        fuera |= fuera_c
+        etiqueta |= fuera_c.astype(np.int64) << i
+        peor = np.fmax(peor, np.abs(p.delta_pct))
+
+    order = np.lexsort((-peor, ~fuera, codes))
+    unidad_col = "nombre_unidad" if "nombre_unidad" in df.columns else "nombre"
+    out = {g: df[g].to_numpy()[order] for g in GROUP_COLS}
+    out["unidad"] = df[unidad_col].to_numpy()[order] if unidad_col in df.columns else None
+    out["PISO"] = df["PISO"].to_numpy()[order]
+    for c in price_cols:
+        real, esperado, _, delta_pct, estado, sugerido, modelo = puntajes[c]
+        out[c] = real[order]
+        out[f"{c}_esperado"] = esperado[order]
+        out[f"{c}_delta_pct"] = delta_pct[order]
+        out[f"{c}_estado"] = pd.Categorical.from_codes(estado[order], dtype=ESTADO_DTYPE)
+        out[f"{c}_sugerido"] = sugerido[order]
+        out[f"{c}_modelo"] = pd.Categorical.from_codes(modelo[order], dtype=MODELO_DTYPE)
+    out["fuera_de_curva"] = fuera[order]
+    nombres = [", ".join(c for i, c in enumerate(price_cols) if k >> i & 1) for k in range(1 << len(price_cols))]
+    out["metricas_fuera"] = pd.Categorical.from_codes(etiqueta[order], categories=nombres)
+    return pd.DataFrame(out, columns=columnas_metricas(price_cols)), resultados
+
+
+SENSIBILIDAD_COLS = GROUP_COLS + [
+    "umbral_pct", "unidades", "sin_curva", "caro", "barato", "en_linea",
+    "impacto_caro", "impacto_barato", "impacto_neto",
+]
+
+
+def sensibilidad_umbral(result: pd.DataFrame, umbrales=UMBRALES_SENSIBILIDAD) -> pd.DataFrame:
+    """
+    Cuántas unidades quedan caras, baratas o en línea y cuánto movería el
+    precio de lista llevarlas a la curva (precio_sugerido - precio_real),
+    por grupo y umbral, sobre el delta ya calculado en result.
+
+    Con los umbrales ordenados, searchsorted da para cada unidad cuántos
+    umbrales supera su desvío: la unidad es "caro" en todos esos. Un solo
+    bincount por (grupo, cuántos supera) y una suma acumulada hacia atrás dan
+    todos los umbrales a la vez, así que barrer 100 umbrales cuesta casi lo
+    mismo que puntuar uno.
+    """
+    u = np.unique(np.asarray(umbrales, dtype=float))
+    if result.empty or not len(u):
+        return pd.DataFrame(columns=SENSIBILIDAD_COLS)
+    n_u = len(u)
+    codes = codigos_grupo(result)
+    n_grupos = int(codes.max()) + 1
+    _, first = np.unique(codes, return_index=True)
+
+    # Mismo cociente (y mismos bits) que clasificar
+    real = result["precio_real"].to_numpy(dtype=float)
+    esperado = result["precio_esperado"].to_numpy(dtype=float)
+    delta = result["delta"].to_numpy(dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = np.where(esperado != 0, delta / esperado, 0.0)
+    con_curva = result["estado"].to_numpy() != ESTADO_SIN_CURVA
+    impacto = np.round(esperado, -2) - real
+
+    def por_umbral(desvio: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Umbrales estrictamente menores al desvío de cada unidad (NaN no supera ninguno)
+        supera = np.where(con_curva & (desvio > u[0]), np.searchsorted(u, desvio, side="left"), 0)
+        celda = codes * (n_u + 1) + supera
+        n = np.bincount(celda, minlength=n_grupos * (n_u + 1)).reshape(n_grupos, n_u + 1)
+        w = np.bincount(celda, weights=np.where(supera > 0, impacto, 0.0),
+                        minlength=n_grupos * (n_u + 1)).reshape(n_grupos, n_u + 1)
+        # Unidad que supera k umbrales cuenta para los umbrales 0..k-1
+        return (np.cumsum(n[:, ::-1], axis=1)[:, ::-1][:, 1:],
+                np.cumsum(w[:, ::-1], axis=1)[:, ::-1][:, 1:])
+
+    n_caro, imp_caro = por_umbral(ratio)
+    n_barato, imp_barato = por_umbral(-ratio)
+    n_total = np.bincount(codes, minlength=n_grupos)
+    n_curva = np.bincount(codes, weights=con_curva, minlength=n_grupos).astype(int)
+
+    out = result[GROUP_COLS].iloc[np.repeat(first, n_u)].reset_index(drop=True)
+    out["umbral_pct"] = np.tile(u, n_grupos)
+    out["unidades"] = np.repeat(n_total, n_u)
+    out["sin_curva"] = np.repeat(n_total - n_curva, n_u)
+    out["caro"] = n_caro.ravel()
+    out["barato"] = n_barato.ravel()
+    out["en_linea"] = out["unidades"] - out["sin_curva"] - out["caro"] - out["barato"]
+    out["impacto_caro"] = imp_caro.ravel()
+    out["impacto_barato"] = imp_barato.ravel()
+    out["impacto_neto"] = out["impacto_caro"] + out["impacto_barato"]
+    return out[SENSIBILIDAD_COLS]
+
+
+def resumen_sensibilidad(sens: pd.DataFrame) -> pd.DataFrame:
+    # Totales del inventario por umbral
+    cols = ["unidades", "sin_curva", "caro", "barato", "en_linea",
+            "impacto_caro", "impacto_barato", "impacto_neto"]
+    return sens.groupby("umbral_pct", sort=True)[cols].sum().reset_index()
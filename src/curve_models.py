@@ -0,0 +1,221 @@
+# src/curve_models.py
+"""
+Modelos de curva precio ~ piso sobre los promedios por piso de cada grupo.
+Cada modelo ajusta TODOS los grupos a la vez (bincount / álgebra apilada) y
+devuelve la predicción en cada fila de pisos, así que sumar un modelo cuesta
+unas pocas pasadas sobre la tabla de pisos y no un loop por grupo.
+
+La elección por grupo es por validación cruzada: los pisos de cada grupo se
+reparten en K_FOLDS pliegues intercalados (rango del piso % K) y gana el
+modelo con menor error cuadrático medio fuera de muestra.
+"""
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+K_FOLDS = 5
+MEJORA_MIN = 0.10       # un modelo no lineal debe bajar el error de CV de la recta al menos 10%
+ISO_CELDAS = 2_000_000  # tope de celdas (grupos x pisos x pisos) por bloque de la isotónica
+TRAMOS_CUANTILES = (0.2, 0.35, 0.5, 0.65, 0.8)  # quiebres candidatos, por posición del piso
+
+
+class ModeloCurva(NamedTuple):
+    # ajustar(g, x, y, usar, n_grupos) -> predicción en todas las filas (NaN si no identificado)
+    ajustar: Callable[..., np.ndarray]
+    min_pisos: int      # pisos mínimos del grupo para entrar a la selección
+
+
+def _sumas(g: np.ndarray, w: np.ndarray, n_grupos: int) -> np.ndarray:
+    return np.bincount(g, weights=w, minlength=n_grupos)
+
+
+def _centrar(g: np.ndarray, x: np.ndarray, usar: np.ndarray, n_grupos: int) -> np.ndarray:
+    # Piso centrado en la media de los pisos de ajuste de su grupo: sistemas mejor condicionados
+    n = _sumas(g, usar.astype(float), n_grupos)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = _sumas(g, np.where(usar, x, 0.0), n_grupos) / n
+    return x - np.nan_to_num(media)[g]
+
+
+def _mco(base: np.ndarray, y: np.ndarray, g: np.ndarray, usar: np.ndarray,
+         n_grupos: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Mínimos cuadrados y = base @ beta_g para todos los grupos: ecuaciones
+    normales por grupo con bincount y resolución apilada. Devuelve (beta por
+    grupo, SSE de ajuste por grupo); NaN si el grupo tiene menos filas de
+    ajuste que parámetros.
+    """
+    p = base.shape[1]
+    w = usar.astype(float)
+    xtx = np.empty((n_grupos, p, p))
+    xty = np.empty((n_grupos, p))
+    for a in range(p):
+        xty[:, a] = _sumas(g, w * base[:, a] * y, n_grupos)
+        for b in range(a, p):
+            xtx[:, a, b] = xtx[:, b, a] = _sumas(g, w * base[:, a] * base[:, b], n_grupos)
+    # Resolución apilada con una cresta mínima relativa a la traza: los
+    # sistemas singulares (p. ej. un quiebre sin pisos a su derecha) dan la
+    # solución de norma mínima como pinv, a una fracción de su costo
+    cresta = 1e-9 * np.trace(xtx, axis1=1, axis2=2) / p + 1e-12
+    beta = np.linalg.solve(xtx + cresta[:, None, None] * np.eye(p), xty[..., None])[..., 0]
+    beta[_sumas(g, w, n_grupos) < p] = np.nan
+
+    resid = np.where(usar, y - np.einsum("ij,ij->i", base, beta[g]), 0.0)
+    return beta, _sumas(g, resid * resid, n_grupos)
+
+
+def ajustar_lineal(g, x, y, usar, n_grupos):
+    xc = _centrar(g, x, usar, n_grupos)
+    base = np.column_stack([np.ones_like(xc), xc])
+    beta, _ = _mco(base, y, g, usar, n_grupos)
+    return np.einsum("ij,ij->i", base, beta[g])
+
+
+def ajustar_cuadratica(g, x, y, usar, n_grupos):
+    xc = _centrar(g, x, usar, n_grupos)
+    base = np.column_stack([np.ones_like(xc), xc, xc * xc])
+    beta, _ = _mco(base, y, g, usar, n_grupos)
+    return np.einsum("ij,ij->i", base, beta[g])
+
+
+def ajustar_tramos(g, x, y, usar, n_grupos):
+    """
+    Recta con un quiebre continuo: y = a + b x + c max(x - k, 0). Se prueban
+    como k los pisos de ajuste en las posiciones TRAMOS_CUANTILES del grupo
+    y cada grupo se queda con el de menor SSE.
+    """
+    xc = _centrar(g, x, usar, n_grupos)
+    filas = np.flatnonzero(usar)
+    inicio = np.searchsorted(g[filas], np.arange(n_grupos))
+    n_ajuste = np.bincount(g[filas], minlength=n_grupos)
+    tiene = n_ajuste > 0
+
+    mejor_sse = np.full(n_grupos, np.inf)
+    pred = np.full(len(g), np.nan)
+    for q in TRAMOS_CUANTILES:
+        k = np.full(n_grupos, np.nan)
+        pos = inicio[tiene] + np.round(q * (n_ajuste[tiene] - 1)).astype(int)
+        k[tiene] = xc[filas[pos]]
+        base = np.column_stack([np.ones_like(xc), xc, np.maximum(xc - k[g], 0.0)])
+        beta, sse = _mco(base, y, g, usar, n_grupos)
+        gana = np.isfinite(beta[:, 0]) & (sse < mejor_sse)
+        mejor_sse[gana] = sse[gana]
+        fila_gana = gana[g]
+        pred[fila_gana] = np.einsum("ij,ij->i", base[fila_gana], beta[g[fila_gana]])
+    return pred
+
+
+def ajustar_isotonica(g, x, y, usar, n_grupos, signo=None):
+    """
+    Regresión isotónica por grupo (creciente o decreciente según el signo de
+    la recta, o según signo por grupo si se indica: 1 creciente, -1
+    decreciente), con la fórmula min-max: y_i = max_{j<=i} min_{k>=i} prom(j..k).
+    Los grupos se rellenan a una matriz de pisos y se procesan por bloques.
+    Los pisos que no son de ajuste (p. ej. el pliegue de validación) quedan
+    con el valor de la escalera en su posición.
+    """
+    inicio = np.searchsorted(g, np.arange(n_grupos + 1))
+    pos = np.arange(len(g)) - inicio[g]
+    largo = int(pos.max()) + 1 if len(g) else 0
+
+    if signo is None:
+        signo = np.sign(_pendiente(g, x, y, usar, n_grupos))
+        signo[~np.isfinite(signo) | (signo == 0)] = 1.0
+    yy = y * signo[g]
+    w = usar.astype(float)
+
+    pred = np.full(len(g), np.nan)
+    bloque = max(1, ISO_CELDAS // max(largo * largo, 1))
+    jk = np.arange(largo)[:, None] <= np.arange(largo)[None, :]   # j <= k (y j <= i)
+    for a in range(0, n_grupos, bloque):
+        b = min(a + bloque, n_grupos)
+        r = slice(inicio[a], inicio[b])
+        fila, col = g[r] - a, pos[r]
+        Y = np.zeros((b - a, largo))
+        W = np.zeros((b - a, largo))
+        Y[fila, col] = np.where(usar[r], yy[r], 0.0)
+        W[fila, col] = w[r]
+        cy = np.concatenate([np.zeros((b - a, 1)), np.cumsum(Y, axis=1)], axis=1)
+        cw = np.concatenate([np.zeros((b - a, 1)), np.cumsum(W, axis=1)], axis=1)
+
+        # prom[j, k] sobre los pisos de ajuste entre j y k
+        num = cy[:, None, 1:] - cy[:, :-1, None]
+        den = cw[:, None, 1:] - cw[:, :-1, None]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            prom = np.where(jk & (den > 0), num / den, np.nan)
+        # min_{k>=i} (fmin ignora los NaN) y luego max_{j<=i}
+        prom = np.fmin.accumulate(prom[:, :, ::-1], axis=2)[:, :, ::-1]
+        ajuste = np.fmax.reduce(np.where(jk, prom, np.nan), axis=1)
+        pred[r] = ajuste[fila, col]
+    return pred * signo[g]
+
+
+def _pendiente(g, x, y, usar, n_grupos) -> np.ndarray:
+    xc = _centrar(g, x, usar, n_grupos)
+    beta, _ = _mco(np.column_stack([np.ones_like(xc), xc]), y, g, usar, n_grupos)
+    return beta[:, 1]
+
+
+# Registro: el orden desempata (primero el más simple)
+MODELOS = {
+    "lineal": ModeloCurva(ajustar_lineal, 3),
+    "cuadratica": ModeloCurva(ajustar_cuadratica, 4),
+    "tramos": ModeloCurva(ajustar_tramos, 5),
+    "isotonica": ModeloCurva(ajustar_isotonica, 3),
+}
+NOMBRES = list(MODELOS)
+
+
+def error_cv(g: np.ndarray, x: np.ndarray, y: np.ndarray, n_grupos: int,
+             modelos: list[str], k: int = K_FOLDS) -> np.ndarray:
+    """
+    Error cuadrático medio fuera de muestra por grupo y modelo (grupos x
+    modelos). NaN si el grupo no alcanza min_pisos o algún pliegue no se pudo
+    predecir.
+    """
+    inicio = np.searchsorted(g, np.arange(n_grupos))
+    pliegue = (np.arange(len(g)) - inicio[g]) % k
+    finito = np.isfinite(y)  # pisos sin ningún precio no entran ni al ajuste ni al error
+    n_pisos = np.bincount(g[finito], minlength=n_grupos)
+
+    err = np.full((n_grupos, len(modelos)), np.nan)
+    for m, nombre in enumerate(modelos):
+        modelo = MODELOS[nombre]
+        sse = np.zeros(n_grupos)
+        n_ok = np.zeros(n_grupos)
+        for f in range(k):
+            prueba = (pliegue == f) & finito
+            if not prueba.any():
+                continue
+            pred = modelo.ajustar(g, x, y, ~prueba & finito, n_grupos)
+            ok = prueba & np.isfinite(pred)
+            sse += _sumas(g[ok], (y[ok] - pred[ok]) ** 2, n_grupos)
+            n_ok += np.bincount(g[ok], minlength=n_grupos)
+        valido = (n_pisos >= modelo.min_pisos) & (n_ok == n_pisos)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            err[:, m] = np.where(valido, sse / n_ok, np.nan)
+    return err
+
+
+def elegir_modelos(err: np.ndarray, modelos: list[str], mejora_min: float = MEJORA_MIN) -> np.ndarray:
+    """
+    Nombre del modelo elegido por grupo: el de menor error de CV; si no le
+    gana a la recta por mejora_min, la recta. Sin error de CV (pocos pisos)
+    también queda la recta, como antes de tener varios modelos.
+    """
+    elegido = np.full(err.shape[0], "lineal", dtype=object)
+    con_cv = np.isfinite(err).any(axis=1)
+    elegido[con_cv] = np.array(modelos, dtype=object)[np.nanargmin(err[con_cv], axis=1)]
+    if "lineal" in modelos:
+        e_lin = err[:, modelos.index("lineal")]
+        e_best = np.where(con_cv, np.nanmin(np.where(con_cv[:, None], err, 0.0), axis=1), np.nan)
+        elegido[np.isfinite(e_lin) & ~(e_best < (1 - mejora_min) * e_lin)] = "lineal"
+    return elegido
+
+
+def validar_modelos(modelos) -> list[str]:
+    modelos = list(modelos)
+    desconocidos = [m for m in modelos if m not in MODELOS]
+    if desconocidos or not modelos:
+        raise ValueError(f"Modelos de curva desconocidos: {desconocidos} (opciones: {', '.join(MODELOS)})")
+    return modelos
@@ -5,16 +5,133 @@ from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
 
-def run_elasticidad(df_unidades: pd.DataFrame, df_sep: pd.DataFrame) -> pd.DataFrame:
+LLAVES = ["nombre_proyecto", "nombre_tipologia"]
+METODOS = ("grupo", "pooled", "shrinkage")
+NIVEL_IC = 0.95
+
+ESTIMACION_COLS = LLAVES + [
+    "metodo", "n_obs", "elasticidad", "error_std", "ic_inf", "ic_sup", "peso_grupo",
+]
+
+
+def _estadisticos(g: np.ndarray, x: np.ndarray, y: np.ndarray, n_grupos: int) -> dict:
+    """
+    Estadísticos suficientes de la regresión y = a_g + b_g x para todos los
+    grupos a la vez: n, sumas de cuadrados centradas por grupo.
+    """
+    n = np.bincount(g, minlength=n_grupos).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_bar = np.bincount(g, weights=x, minlength=n_grupos) / n
+        y_bar = np.bincount(g, weights=y, minlength=n_grupos) / n
+    dx = x - x_bar[g]
+    dy = y - y_bar[g]
+    return {
+        "n": n,
+        "sxx": np.bincount(g, weights=dx * dx, minlength=n_grupos),
+        "sxy": np.bincount(g, weights=dx * dy, minlength=n_grupos),
+        "syy": np.bincount(g, weights=dy * dy, minlength=n_grupos),
+    }
+
+
+def estimar_elasticidades(panel: pd.DataFrame, metodo: str = "shrinkage",
+                          nivel: float = NIVEL_IC) -> pd.DataFrame:
     """
-    df_unidades: precios por unidad / tipología / mes
+    Regresión log-log log(1 + separaciones) = a_g + e_g log(precio) por
+    proyecto/tipología, resuelta para todos los grupos en una pasada.
+
+    - "grupo": OLS por grupo; e_g con IC t de Student (n - 2 gl).
+    - "pooled": una sola elasticidad con efectos fijos por grupo (within).
+    - "shrinkage": cada e_g se encoge hacia la pooled según su precisión
+      (Bayes empírico; varianza entre grupos por momentos). Los grupos sin
+      variación de precio quedan con la pooled.
+
+    log(1 + q) para no perder los meses sin separaciones.
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método de elasticidad desconocido: {metodo!r} (opciones: {', '.join(METODOS)})")
+    from scipy import stats
+
+    datos = panel.dropna(subset=["precio_lista", "separaciones"])
+    datos = datos[(datos["precio_lista"] > 0) & (datos["separaciones"] >= 0)]
+    if datos.empty:
+        return pd.DataFrame(columns=ESTIMACION_COLS)
+
+    codes = datos.groupby(LLAVES, sort=True, observed=True).ngroup().to_numpy()
+    n_grupos = int(codes.max()) + 1
+    _, first = np.unique(codes, return_index=True)
+    out = datos[LLAVES].iloc[first].reset_index(drop=True)
+
+    x = np.log(datos["precio_lista"].to_numpy(dtype=float))
+    y = np.log1p(datos["separaciones"].to_numpy(dtype=float))
+    s = _estadisticos(codes, x, y, n_grupos)
+    n, sxx, sxy, syy = s["n"], s["sxx"], s["sxy"], s["syy"]
+
+    # Sin variación de precio (sxx ~ 0) la pendiente del grupo no está identificada
+    identificado = sxx > 1e-12 * np.maximum(n, 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        b = np.where(identificado, sxy / sxx, np.nan)
+        sse = np.where(identificado, np.maximum(syy - b * sxy, 0.0), syy)
+        gl = n - 2
+        se = np.where(identificado & (gl > 0), np.sqrt(sse / gl / sxx), np.nan)
+
+    # Within: pendiente común con intercepto por grupo
+    sxx_tot = sxx[identificado].sum()
+    gl_pool = n.sum() - n_grupos - 1
+    if sxx_tot > 0:
+        b_pool = sxy[identificado].sum() / sxx_tot
+        sse_pool = (syy - 2 * b_pool * sxy + b_pool ** 2 * sxx).sum()
+        se_pool = np.sqrt(sse_pool / gl_pool / sxx_tot) if gl_pool > 0 else np.nan
+    else:
+        b_pool, se_pool = np.nan, np.nan
+
+    alpha = 1 - nivel
+    if metodo == "grupo":
+        est, err, peso = b, se, np.ones(n_grupos)
+        crit = stats.t.ppf(1 - alpha / 2, np.where(gl > 0, gl, np.nan))
+    elif metodo == "pooled":
+        est = np.full(n_grupos, b_pool)
+        err = np.full(n_grupos, se_pool)
+        peso = np.zeros(n_grupos)
+        crit = np.full(n_grupos, stats.t.ppf(1 - alpha / 2, gl_pool) if gl_pool > 0 else np.nan)
+    else:
+        ok = np.isfinite(b) & np.isfinite(se)
+        # Varianza entre grupos por momentos (DerSimonian–Laird simplificado)
+        tau2 = max(float(np.var(b[ok]) - np.mean(se[ok] ** 2)), 0.0) if ok.sum() > 1 else 0.0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            peso = np.where(ok, tau2 / (tau2 + se ** 2), 0.0)
+        peso = np.nan_to_num(peso)
+        est = np.where(ok, peso * np.nan_to_num(b) + (1 - peso) * b_pool, b_pool)
+        # Varianza posterior; sin dato propio, la incertidumbre de un grupo nuevo
+        err = np.where(ok, np.sqrt(peso * np.nan_to_num(se) ** 2 + (1 - peso) ** 2 * se_pool ** 2),
+                       np.sqrt(tau2 + se_pool ** 2))
+        crit = np.full(n_grupos, stats.norm.ppf(1 - alpha / 2))
+
+    out["metodo"] = metodo
+    out["n_obs"] = n.astype(int)
+    out["elasticidad"] = est
+    out["error_std"] = err
+    out["ic_inf"] = est - crit * err
+    out["ic_sup"] = est + crit * err
+    out["peso_grupo"] = peso
+    return out[ESTIMACION_COLS]
+
+
+def run_elasticidad(df_unidades: pd.DataFrame, df_sep: pd.DataFrame,
+                    metodo: str = "shrinkage") -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    df_unidades: precios por unidad / tipología / mes (p. ej. el panel mensual
+                 de historial_precios.panel_precios_mensual)
     df_sep: separaciones por tipología / mes
+
+    Devuelve (panel mensual, estimaciones por proyecto/tipología). La columna
+    elasticidad del panel es la estimación de su grupo, no el cociente de
+    variaciones de cada mes.
     """
 
     # 1) Aggregar por mes + tipología + proyecto
     precios = (
         df_unidades
-        .groupby(["nombre_proyecto","nombre_tipologia","mes"])
+        .groupby(["nombre_proyecto","nombre_tipologia","mes"], observed=True)
         ["precio_lista"]
         .mean()
         .reset_index()
@@ -28,13 +145,27 @@ def run_elasticidad(df_unidades: pd.DataFrame, df_sep: pd.DataFrame) -> pd.DataF
         .reset_index()
     )
 
-    panel = precios.merge(qty, on=["nombre_proyecto","nombre_tipologia","mes"])
+    return _estimar_panel(precios.merge(qty, on=["nombre_proyecto","nombre_tipologia","mes"]), metodo)
+
+
+def run_elasticidad_cubo(cubo, metodo: str = "shrinkage") -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Como run_elasticidad, pero con el panel proyecto/tipología/mes leído del
+    cubo de ventas (cubo_ventas.CuboVentas) en vez de reagregar las tablas:
+    meses con precio y separaciones.
+    """
+    corte = cubo.consultar(LLAVES + ["mes"])
+    corte = corte[(corte["precio_n"] > 0) & corte["separaciones"].notna()]
+    return _estimar_panel(corte[LLAVES + ["mes", "precio_lista", "separaciones"]].reset_index(drop=True), metodo)
+
 
-    # Cambios % mes a mes
+def _estimar_panel(panel: pd.DataFrame, metodo: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # Cambios % mes a mes (descriptivos)
     panel["pct_delta_p"] = panel.groupby(["nombre_proyecto","nombre_tipologia"])["precio_lista"].pct_change()
     panel["pct_delta_q"] = panel.groupby(["nombre_proyecto","nombre_tipologia"])["separaciones"].pct_change()
 
-    # Elasticidad
-    panel["elasticidad"] = panel["pct_delta_q"] / panel["pct_delta_p"]
+    # Elasticidad: regresión log-log por grupo en vez de pct_delta_q / pct_delta_p
+    estimaciones = estimar_elasticidades(panel, metodo=metodo)
+    panel = panel.merge(estimaciones[LLAVES + ["elasticidad"]], on=LLAVES, how="left")
 
-    return panel
+    return panel, estimaciones
@@ -1,39 +1,191 @@
 # src/etl_unidades.py
-import pandas as pd
+import time
+import hashlib
+import argparse
+import resource
 from pathlib import Path
 
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
 ROOT = Path(__file__).resolve().parents[1]
 
-def run_etl_unidades() -> Path:
-    raw_path = ROOT / "data" / "Unidades.csv"
-    out_path = ROOT / "data" / "intermediate" / "unidades_clean.parquet"
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    df = pd.read_csv(raw_path)
-
-    # Ajusta estos nombres a tus columnas reales
-    rename_map = {
-        "nombre": "nombre_unidad",
-        "proyecto": "nombre_proyecto",
-        "torre": "nombre_subdivision",
-        "tipologia": "nombre_tipologia",
-        "PISO": "PISO",
-        "precio_lista": "precio_lista",
-        "area_total": "area_total",
-    }
-    df = df.rename(columns={k: v for k, v in rename_map.items() if k in df.columns})
+RAW_PATH = ROOT / "data" / "Unidades.csv"
+CLEAN_PATH = ROOT / "data" / "intermediate" / "unidades_clean.parquet"
+
+# Ajusta estos nombres a tus columnas reales
+RENAME_MAP = {
+    "nombre": "nombre_unidad",
+    "proyecto": "nombre_proyecto",
+    "torre": "nombre_subdivision",
+    "tipologia": "nombre_tipologia",
+}
+
+# Esquema declarado del CSV: solo las columnas que usan las pipelines. Las
+# columnas de texto para mostrar ("precio lista miles", "P_m2 dolares ...")
+# y los duplicados ("Estado comercial") no se leen.
+CATEGORICAS = ["nombre_proyecto", "nombre_subdivision", "nombre_tipologia", "estado_comercial"]
+RAW_DTYPES = {
+    "nombre_proyecto": "category",
+    "nombre_subdivision": "category",
+    "nombre_tipologia": "category",
+    "estado_comercial": "category",
+    "nombre": "object",
+    "PISO": "float32",         # puede venir vacío; pasa a int16 tras el dropna
+    "precio_lista": "float64", # montos: float32 perdería los céntimos
+    "area_total": "float64",
+}
+RAW_DTYPES.update({k: RAW_DTYPES[v] for k, v in RENAME_MAP.items() if v in RAW_DTYPES})
+
+# Esquema de unidades_clean.parquet; fijo para que todos los row groups coincidan
+_DICT = pa.dictionary(pa.int32(), pa.string())
+CLEAN_SCHEMA = pa.schema([
+    ("nombre_proyecto", _DICT),
+    ("nombre_subdivision", _DICT),
+    ("nombre_tipologia", _DICT),
+    ("nombre_unidad", pa.string()),
+    ("estado_comercial", _DICT),
+    ("PISO", pa.int16()),
+    ("precio_lista", pa.float64()),
+    ("area_total", pa.float64()),
+    ("precio_m2", pa.float64()),
+])
+
+
+def _leer_csv(raw_path: Path, chunksize: int | None = None):
+    return pd.read_csv(
+        raw_path,
+        usecols=lambda c: c in RAW_DTYPES,
+        dtype=RAW_DTYPES,
+        chunksize=chunksize,
+    )
+
+
+def _limpiar(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.rename(columns={k: v for k, v in RENAME_MAP.items() if k in df.columns})
 
     # Filtros básicos
     df = df.dropna(subset=["PISO", "precio_lista"])
-    df["PISO"] = df["PISO"].astype(int)
-    df["precio_lista"] = df["precio_lista"].astype(float)
+    df["PISO"] = df["PISO"].astype("int16")
 
     if "area_total" in df.columns:
         df["precio_m2"] = df["precio_lista"] / df["area_total"]
 
-    df.to_parquet(out_path, index=False)
-    return out_path
+    return df.reindex(columns=[c for c in CLEAN_SCHEMA.names if c in df.columns])
+
+
+def _ordenar_categorias(df: pd.DataFrame) -> pd.DataFrame:
+    # Categorías en orden alfabético: los groupby/sort por llaves quedan en el
+    # mismo orden que con columnas de texto, venga el parquet de uno o varios chunks
+    for c in CATEGORICAS:
+        if c in df.columns and isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].cat.set_categories(sorted(df[c].cat.categories))
+    return df
+
+
+def cargar_unidades(raw_path: Path = RAW_PATH) -> pd.DataFrame:
+    return _ordenar_categorias(_limpiar(_leer_csv(raw_path)))
+
+
+def guardar_unidades(df: pd.DataFrame, clean_path: Path = CLEAN_PATH) -> Path:
+    clean_path.parent.mkdir(parents=True, exist_ok=True)
+    schema = pa.schema([f for f in CLEAN_SCHEMA if f.name in df.columns])
+    pq.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False), clean_path)
+    return clean_path
+
+
+def huella_csv(raw_path: Path = RAW_PATH) -> str:
+    # sha256 del contenido: las fechas de modificación dependen del checkout, no de los datos
+    h = hashlib.sha256()
+    with Path(raw_path).open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _ruta_huella(clean_path: Path) -> Path:
+    return clean_path.with_name(clean_path.name + ".sha256")
+
+
+def registrar_huella(huella: str, clean_path: Path = CLEAN_PATH) -> None:
+    # Se escribe después del parquet: sin huella (o con otra) el ETL se vuelve a correr
+    _ruta_huella(clean_path).write_text(huella + "\n")
+
+
+def limpio_vigente(raw_path: Path = RAW_PATH, clean_path: Path = CLEAN_PATH) -> bool:
+    """
+    True si clean_path salió del contenido actual de raw_path.
+    """
+    ruta = _ruta_huella(clean_path)
+    if not (clean_path.exists() and ruta.exists() and Path(raw_path).exists()):
+        return False
+    return ruta.read_text().strip() == huella_csv(raw_path)
+
+
+def leer_unidades(clean_path: Path = CLEAN_PATH, proyectos: list[str] | None = None) -> pd.DataFrame:
+    # Con proyectos, el filtro se aplica al leer el parquet (no se carga el resto)
+    filtros = [("nombre_proyecto", "in", list(proyectos))] if proyectos else None
+    return _ordenar_categorias(pd.read_parquet(clean_path, filters=filtros))
+
+
+def _mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def _pico_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB en Linux
+
+
+def run_etl_unidades(raw_path: Path = RAW_PATH, clean_path: Path = CLEAN_PATH,
+                     chunksize: int | None = None, comparar: bool = False) -> Path:
+    """
+    CSV -> parquet con el esquema declarado. Con chunksize el archivo se lee
+    por bloques y cada bloque se escribe como un row group, así la memoria
+    máxima no crece con el tamaño del export.
+    """
+    if comparar:
+        # Lectura de referencia: todas las columnas y tipos inferidos
+        t0 = time.perf_counter()
+        mb = _mb(pd.read_csv(raw_path))
+        print(f">>> [ETL UNIDADES] Antes: {mb:.1f} MB en memoria, {time.perf_counter() - t0:.2f} s")
+
+    t0 = time.perf_counter()
+    filas = 0
+    huella = huella_csv(raw_path)
+    if chunksize is None:
+        df = cargar_unidades(raw_path)
+        guardar_unidades(df, clean_path)
+        filas, mb = len(df), _mb(df)
+    else:
+        clean_path.parent.mkdir(parents=True, exist_ok=True)
+        writer, mb = None, 0.0
+        try:
+            for chunk in _leer_csv(raw_path, chunksize):
+                chunk = _limpiar(chunk)
+                if writer is None:
+                    schema = pa.schema([f for f in CLEAN_SCHEMA if f.name in chunk.columns])
+                    writer = pq.ParquetWriter(clean_path, schema)
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                filas += len(chunk)
+                mb = max(mb, _mb(chunk))
+        finally:
+            if writer is not None:
+                writer.close()
+    registrar_huella(huella, clean_path)
+
+    print(f">>> [ETL UNIDADES] Después: {filas} filas, {mb:.1f} MB en memoria"
+          f"{' por chunk' if chunksize else ''}, {time.perf_counter() - t0:.2f} s, "
+          f"pico RSS {_pico_rss_mb():.0f} MB")
+    return clean_path
+
 
 if __name__ == "__main__":
-    p = run_etl_unidades()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="filas por bloque; escribe un row group por bloque")
+    parser.add_argument("--comparar", action="store_true",
+                        help="mide también la lectura con tipos inferidos")
+    args = parser.parse_args()
+    p = run_etl_unidades(chunksize=args.chunksize, comparar=args.comparar)
     print(f"Unidades limpias guardadas en: {p}")
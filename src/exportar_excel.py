@@ -0,0 +1,168 @@
+# src/exportar_excel.py
+"""
+Exportación xlsx compartida, en streaming: openpyxl en modo write_only
+escribe cada fila directo al XML de la hoja, sin el árbol de celdas que arma
+DataFrame.to_excel, así que la memoria no crece con el inventario.
+
+El formato se define una vez por hoja y no celda por celda:
+- encabezado fijo (freeze panes) y autofiltro sobre todo el rango,
+- anchos de columna estimados con una muestra de filas,
+- formato condicional por estado: una regla por valor sobre el rango de la
+  hoja, en las columnas "estado" o "<métrica>_estado".
+
+Las hojas de más de MAX_FILAS_HOJA filas se parten por proyecto (y si un
+proyecto solo no cabe, en partes numeradas).
+"""
+import re
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from curve_engine import ESTADO_BARATO, ESTADO_CARO, ESTADO_EN_LINEA, ESTADO_SIN_CURVA
+
+MAX_FILAS_HOJA = 100_000   # sobre esto la hoja se parte por PARTIR_POR
+PARTIR_POR = "nombre_proyecto"
+FILAS_BLOQUE = 10_000      # filas convertidas a objetos Python por vez
+MUESTRA_ANCHO = 1_000      # filas para estimar el ancho de cada columna
+ANCHO_MAX = 60
+
+COLORES_ESTADO = {
+    ESTADO_CARO: "FFC7CE",      # rojo claro
+    ESTADO_BARATO: "FFEB9C",    # amarillo
+    ESTADO_EN_LINEA: "C6EFCE",  # verde claro
+    ESTADO_SIN_CURVA: "D9D9D9", # gris
+}
+COLORES = {"estado": COLORES_ESTADO}
+
+_INVALIDOS_HOJA = re.compile(r"[\[\]:*?/\\]")
+
+
+def _nombre_hoja(nombre: str, usados: set[str]) -> str:
+    # Excel: hasta 31 caracteres, sin []:*?/\ y sin repetir
+    base = _INVALIDOS_HOJA.sub("_", str(nombre)).strip() or "hoja"
+    nombre, i = base[:31], 1
+    while nombre.lower() in usados:
+        i += 1
+        nombre = f"{base[:31 - len(str(i)) - 1]} {i}"
+    usados.add(nombre.lower())
+    return nombre
+
+
+def _partes(hoja: str, df: pd.DataFrame, max_filas: int, partir_por: str | None):
+    """
+    (nombre, DataFrame) por hoja: la tabla entera si cabe; si no, una por
+    valor de partir_por en el orden en que aparecen, y bloques numerados si
+    aun así no cabe.
+    """
+    if len(df) <= max_filas:
+        yield hoja, df
+        return
+    if partir_por in df.columns:
+        grupos = df.groupby(partir_por, sort=False, observed=True, dropna=False)
+        trozos = [(f"{hoja} {valor}", sub) for valor, sub in grupos]
+    else:
+        trozos = [(hoja, df)]
+    for nombre, sub in trozos:
+        if len(sub) <= max_filas:
+            yield nombre, sub
+            continue
+        for n, i in enumerate(range(0, len(sub), max_filas), start=1):
+            yield f"{nombre} ({n})", sub.iloc[i:i + max_filas]
+
+
+def _filas(df: pd.DataFrame):
+    # Bloques de filas como objetos Python; NaN/NaT/None quedan como celda vacía
+    for i in range(0, len(df), FILAS_BLOQUE):
+        bloque = df.iloc[i:i + FILAS_BLOQUE]
+        cols = []
+        for c in bloque.columns:
+            s = bloque[c]
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                s = s.astype(object)
+            v = s.to_numpy(dtype=object)
+            v[pd.isna(s).to_numpy()] = None
+            cols.append(v.tolist())
+        yield from zip(*cols)
+
+
+def _anchos(df: pd.DataFrame) -> list[float]:
+    muestra = df.head(MUESTRA_ANCHO).astype(str)
+    largos = [max([len(str(c))] + muestra[c].str.len().tolist()) for c in df.columns]
+    return [min(l + 2, ANCHO_MAX) for l in largos]
+
+
+def _reglas_estado(ws, df: pd.DataFrame, colores: dict[str, dict[str, str]]) -> None:
+    # Una regla por (columna de estado, valor) sobre todas las filas de datos:
+    # la celda de estado toma el color de su valor
+    n = len(df)
+    if not n:
+        return
+    for j, c in enumerate(df.columns, start=1):
+        tabla = next((v for k, v in colores.items() if c == k or str(c).endswith(f"_{k}")), None)
+        if tabla is None:
+            continue
+        letra = get_column_letter(j)
+        rango = f"{letra}2:{letra}{n + 1}"
+        for valor, color in tabla.items():
+            texto = str(valor).replace('"', '""')
+            ws.conditional_formatting.add(rango, FormulaRule(
+                formula=[f'${letra}2="{texto}"'],
+                fill=PatternFill("solid", start_color=color, end_color=color)))
+
+
+def exportar_xlsx(path: Path, hojas: dict[str, pd.DataFrame], colores: dict | None = COLORES,
+                  max_filas: int = MAX_FILAS_HOJA, partir_por: str | None = PARTIR_POR) -> Path:
+    """
+    Escribe {nombre de hoja: DataFrame} en path, sin índice, en streaming.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb = Workbook(write_only=True)
+    usados: set[str] = set()
+    negrita = Font(bold=True)
+
+    for hoja, df in hojas.items():
+        for nombre, parte in _partes(hoja, df, max_filas, partir_por):
+            ws = wb.create_sheet(_nombre_hoja(nombre, usados))
+            # Todo lo que va antes de <sheetData> se fija antes de la primera fila
+            ws.freeze_panes = "A2"
+            for j, ancho in enumerate(_anchos(parte), start=1):
+                ws.column_dimensions[get_column_letter(j)].width = ancho
+            if len(parte.columns):
+                ws.auto_filter.ref = f"A1:{get_column_letter(len(parte.columns))}{len(parte) + 1}"
+            if colores:
+                _reglas_estado(ws, parte, colores)
+
+            encabezado = []
+            for c in parte.columns:
+                celda = WriteOnlyCell(ws, value=str(c))
+                celda.font = negrita
+                encabezado.append(celda)
+            ws.append(encabezado)
+            for fila in _filas(parte):
+                ws.append(fila)
+
+    if not usados:
+        wb.create_sheet("vacio")
+    wb.save(path)
+    return path
+
+
+def exportar_tabla(path: Path, df: pd.DataFrame, hoja: str = "Sheet1", **kwargs) -> Path:
+    """
+    Una tabla a .xlsx (streaming), .csv o .parquet según la extensión.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() == ".csv":
+        df.to_csv(path, index=False)
+    elif path.suffix.lower() == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        exportar_xlsx(path, {hoja: df}, **kwargs)
+    return path
@@ -0,0 +1,106 @@
+# src/forecast_cache.py
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_DIR = ROOT / "data" / "intermediate" / "forecast_cache"
+MAX_BYTES = 500 * 1024 * 1024  # 500 MB
+
+
+def clave_serie(df: pd.DataFrame, params: dict) -> str:
+    """
+    Hash del contenido de la serie (ds, y) más los parámetros del modelo.
+    """
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(df[["ds", "y"]], index=False).to_numpy().tobytes())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def _escribir_atomico(path: Path, escribir) -> None:
+    # Escribe a un temporal del mismo directorio y renombra, para que otro
+    # proceso nunca lea una entrada a medio escribir.
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=path.suffix + ".tmp")
+    os.close(fd)
+    try:
+        escribir(Path(tmp))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class ForecastCache:
+    """
+    Caché en disco de modelos Prophet ajustados y sus forecasts, compartida
+    entre procesos y corridas. El LRU usa el mtime de cada entrada: un hit
+    la "toca" y al superar max_bytes se borran las menos usadas.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.cache_dir / f"{key}.parquet", self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> tuple[pd.DataFrame, str] | None:
+        forecast_path, model_path = self._paths(key)
+        try:
+            forecast = pd.read_parquet(forecast_path)
+            model_json = model_path.read_text()
+        except (FileNotFoundError, OSError, ValueError):
+            self.misses += 1
+            return None
+
+        for p in (forecast_path, model_path):
+            try:
+                os.utime(p)
+            except FileNotFoundError:
+                pass
+        self.hits += 1
+        return forecast, model_json
+
+    def put(self, key: str, forecast: pd.DataFrame, model_json: str) -> None:
+        forecast_path, model_path = self._paths(key)
+        _escribir_atomico(model_path, lambda p: p.write_text(model_json))
+        _escribir_atomico(forecast_path, lambda p: forecast.to_parquet(p, index=False))
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Borra las entradas menos recientes hasta quedar bajo max_bytes.
+        Devuelve cuántas entradas se eliminaron.
+        """
+        entradas = {}
+        for f in self.cache_dir.iterdir():
+            if f.suffix not in (".parquet", ".json"):
+                continue
+            try:
+                st = f.stat()
+            except FileNotFoundError:
+                continue
+            size, mtime = entradas.get(f.stem, (0, 0.0))
+            entradas[f.stem] = (size + st.st_size, max(mtime, st.st_mtime))
+
+        total = sum(size for size, _ in entradas.values())
+        borradas = 0
+        for key, (size, _) in sorted(entradas.items(), key=lambda kv: kv[1][1]):
+            if total <= self.max_bytes:
+                break
+            for p in self._paths(key):
+                p.unlink(missing_ok=True)
+            total -= size
+            borradas += 1
+        return borradas
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,244 @@
+# src/forecast_engines.py
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from forecast_cache import ForecastCache, clave_serie
+
+PROPHET_PARAMS: dict = {}  # kwargs de Prophet(); forman parte de la llave de caché
+PERIODS = 90               # horizonte en días
+MIN_OBS_PROPHET = 12       # con menos observaciones "auto" usa el baseline
+
+# Grilla del baseline: se evalúan todas las combinaciones a la vez y cada
+# serie se queda con la de menor error a un paso.
+ALPHAS = np.array([0.1, 0.2, 0.4, 0.6, 0.8])
+BETAS = np.array([0.01, 0.05, 0.1, 0.2, 0.3])
+PHI = 0.9                  # amortiguación de la tendencia
+SEASON = 12                # estacionalidad mensual
+Z_80 = 1.2816              # intervalo 80%, como interval_width de Prophet
+
+FORECAST_COLS = ["ds", "trend", "yhat_lower", "yhat_upper", "yhat"]
+
+_cache: ForecastCache | None = None
+
+def get_cache() -> ForecastCache:
+    # Una instancia por proceso, para que los contadores acumulen entre combos
+    global _cache
+    if _cache is None:
+        _cache = ForecastCache()
+    return _cache
+
+
+# ---------------- PROPHET ---------------- #
+
+def forecast_prophet(series: dict, periods: int = PERIODS, use_cache: bool = True) -> dict:
+    """
+    series: {llave: DataFrame(ds, y)}. Un modelo Prophet por serie.
+    """
+    import prophet
+    from prophet import Prophet
+    from prophet.serialize import model_to_json
+
+    cache = get_cache() if use_cache else None
+    out = {}
+    for key, df in series.items():
+        ckey = clave_serie(df, {
+            "prophet": prophet.__version__, "params": PROPHET_PARAMS, "periods": periods,
+        })
+        cached = cache.get(ckey) if cache is not None else None
+        if cached is not None:
+            out[key] = cached[0]
+            continue
+
+        model = Prophet(**PROPHET_PARAMS)
+        model.fit(df)
+
+        future = model.make_future_dataframe(periods=periods)
+        forecast = model.predict(future)
+        if cache is not None:
+            cache.put(ckey, forecast, model_to_json(model))
+        out[key] = forecast
+    return out
+
+
+# ---------------- BASELINE NUMPY ---------------- #
+
+def _paso_temporal(fechas: pd.DatetimeIndex) -> pd.DateOffset | pd.Timedelta:
+    freq = pd.infer_freq(fechas) if len(fechas) >= 3 else None
+    if freq is not None:
+        return pd.tseries.frequencies.to_offset(freq)
+    if len(fechas) >= 2:
+        return pd.Timedelta(np.median(np.diff(fechas.values)))
+    return pd.offsets.MonthBegin()
+
+def _indices_estacionales(Y: np.ndarray, season: int) -> np.ndarray:
+    """
+    Índices estacionales aditivos por serie (S x season), calculados sobre los
+    residuos de una recta; cero para series con menos de dos ciclos.
+    """
+    S, T = Y.shape
+    obs = ~np.isnan(Y)
+    t = np.broadcast_to(np.arange(T, dtype=float), Y.shape)
+    n = obs.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t_bar = np.where(obs, t, 0).sum(axis=1) / n
+        y_bar = np.nansum(Y, axis=1) / n
+        dt = np.where(obs, t - t_bar[:, None], 0)
+        dy = np.where(obs, Y - y_bar[:, None], 0)
+        slope = (dt * dy).sum(axis=1) / (dt * dt).sum(axis=1)
+    resid = Y - (y_bar[:, None] + np.nan_to_num(slope)[:, None] * (t - t_bar[:, None]))
+
+    pos = np.arange(T) % season
+    idx = np.zeros((S, season))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # posiciones sin datos
+        for p in range(min(season, T)):
+            idx[:, p] = np.nan_to_num(np.nanmean(resid[:, pos == p], axis=1))
+    idx -= idx.mean(axis=1, keepdims=True)
+    idx[n < 2 * season] = 0.0
+    return idx
+
+def _holt(D: np.ndarray, a: np.ndarray, b: np.ndarray, guardar: bool = False):
+    """
+    Recursión de Holt amortiguado para S series y P pares (alpha, beta) a la
+    vez; a y b son (1, P) o (S, P). Un NaN solo propaga nivel y tendencia.
+    """
+    S, T = D.shape
+    P = max(a.shape[1], b.shape[1])
+    level = np.full((S, P), np.nan)
+    trend = np.zeros((S, P))
+    sse = np.zeros((S, P))
+    fitted = np.full((S, P, T), np.nan) if guardar else None
+
+    for t in range(T):
+        y = D[:, t][:, None]
+        pred = level + PHI * trend
+        if guardar:
+            fitted[:, :, t] = pred
+        has_y = ~np.isnan(y)
+        err = np.where(has_y & ~np.isnan(pred), y - pred, 0.0)
+        sse += err * err
+
+        nuevo = np.isnan(level) & has_y
+        actualiza = has_y & ~nuevo
+        prev_level = level
+        level = np.where(actualiza, pred + a * err, np.where(nuevo, y, pred))
+        trend = np.where(actualiza, PHI * trend + b * (level - prev_level - PHI * trend),
+                         np.where(nuevo, 0.0, PHI * trend))
+    return level, trend, sse, fitted
+
+def _horizonte_diario(ultima: pd.Timestamp, paso, periods: int) -> tuple[pd.DatetimeIndex, np.ndarray]:
+    """
+    Los `periods` días siguientes a `ultima` (como make_future_dataframe de
+    Prophet) y su distancia en pasos de la serie: exacta en cada fecha del
+    paso (p. ej. el primero de cada mes) y lineal entre ellas.
+    """
+    dias = pd.DatetimeIndex([ultima + pd.Timedelta(days=d) for d in range(1, periods + 1)])
+    if isinstance(paso, pd.Timedelta):
+        return dias, (dias - ultima) / paso
+    n = 1
+    anclas = [ultima, ultima + paso]
+    while anclas[-1] < dias[-1]:
+        n += 1
+        anclas.append(ultima + paso * n)
+    anclas = pd.DatetimeIndex(anclas)
+    k = np.searchsorted(anclas.values, dias.values, side="left")   # anclas[k-1] < día <= anclas[k]
+    frac = (dias - anclas[k - 1]) / (anclas[k] - anclas[k - 1])
+    return dias, (k - 1) + np.asarray(frac, dtype=float)
+
+def forecast_baseline(series: dict, periods: int = PERIODS) -> dict:
+    """
+    Holt con tendencia amortiguada + estacionalidad aditiva, ajustado para todas
+    las series a la vez sobre una matriz ancha (series x fechas). Cada paso de
+    tiempo actualiza todas las series y todas las combinaciones de la grilla
+    alpha/beta en una sola operación; los NaN (series que empiezan tarde o
+    con huecos) solo propagan nivel y tendencia.
+
+    Las series se alinean por su última fecha, así que cada una proyecta
+    desde su propio final. El horizonte sale diario, como Prophet: `periods`
+    días con yhat en el nivel del paso de la serie (separaciones por mes).
+    """
+    if not series:
+        return {}
+
+    keys = list(series)
+    largo = pd.concat(
+        [df[["ds", "y"]].assign(_k=i) for i, df in enumerate(series.values())],
+        ignore_index=True,
+    )
+    largo["ds"] = pd.to_datetime(largo["ds"])
+    wide = largo.pivot_table(index="_k", columns="ds", values="y", aggfunc="sum")
+    wide = wide.reindex(range(len(keys)))
+    fechas = pd.DatetimeIndex(wide.columns)
+    Y_cal = wide.to_numpy(dtype=float)
+    S, T = Y_cal.shape
+
+    # Alineadas a la derecha: la última observación de cada serie queda en la columna T-1
+    obs_cal = ~np.isnan(Y_cal)
+    ultima = np.where(obs_cal.any(axis=1), T - 1 - np.argmax(obs_cal[:, ::-1], axis=1), T - 1)
+    cols = np.arange(T)[None, :] - (T - 1 - ultima)[:, None]   # columna de calendario de cada posición
+    Y = np.where(cols >= 0, Y_cal[np.arange(S)[:, None], np.clip(cols, 0, None)], np.nan)
+
+    season_idx = _indices_estacionales(Y, SEASON)
+    pos = np.arange(T) % SEASON
+    D = Y - season_idx[:, pos]                                  # desestacionalizada
+
+    # 1) Todas las combinaciones de la grilla a la vez: (S, P)
+    a = np.repeat(ALPHAS, len(BETAS))[None, :]
+    b = np.tile(BETAS, len(ALPHAS))[None, :]
+    _, _, sse, _ = _holt(D, a, b)
+
+    # 2) Re-pasada solo con los parámetros ganadores, guardando el ajuste
+    best = np.argmin(sse, axis=1)
+    level, trend, sse_f, fitted = _holt(D, a[0, best][:, None], b[0, best][:, None], guardar=True)
+    level_f, trend_f, fitted_f = level[:, 0], trend[:, 0], fitted[:, 0, :]
+    n_err = np.maximum((~np.isnan(Y) & ~np.isnan(fitted_f)).sum(axis=1), 1)
+    sigma = np.sqrt(sse_f[:, 0] / n_err)
+    yhat_hist = fitted_f + season_idx[:, pos]
+
+    paso = _paso_temporal(fechas)
+    # Un horizonte por última fecha distinta (pocas): días futuros y distancia en pasos
+    horizontes = {u: _horizonte_diario(fechas[u], paso, periods) for u in np.unique(ultima)} if T else {}
+
+    out = {}
+    for i, key in enumerate(keys):
+        # Solo desde la primera observación de la serie, como hace Prophet
+        hay = ~np.isnan(Y[i])
+        desde = int(np.argmax(hay)) if hay.any() else T
+        ds_hist = fechas[cols[i, desde:]]
+        if T:
+            dias, h = horizontes[ultima[i]]
+            amort = PHI * (1 - PHI ** h) / (1 - PHI)            # sum_{j<=h} phi^j, también con h fraccional
+            trend_fut = level_f[i] + trend_f[i] * amort
+            yhat_fut = trend_fut + season_idx[i, (T - 1 + np.ceil(h).astype(int)) % SEASON]
+            ancho = Z_80 * sigma[i] * np.sqrt(h)
+        else:
+            dias, trend_fut, yhat_fut, ancho = pd.DatetimeIndex([]), np.array([]), np.array([]), np.array([])
+        ancho_hist = np.full(T - desde, Z_80 * sigma[i])
+        out[key] = pd.DataFrame({
+            "ds": ds_hist.append(dias),
+            "trend": np.r_[fitted_f[i, desde:], trend_fut],
+            "yhat_lower": np.r_[yhat_hist[i, desde:] - ancho_hist, yhat_fut - ancho],
+            "yhat_upper": np.r_[yhat_hist[i, desde:] + ancho_hist, yhat_fut + ancho],
+            "yhat": np.r_[yhat_hist[i, desde:], yhat_fut],
+        })
+    return out
+
+
+# ---------------- REGISTRO ---------------- #
+
+ENGINES = {
+    "prophet": forecast_prophet,
+    "baseline": forecast_baseline,
+}
+
+def elegir_motor(engine: str, n_obs: int) -> str:
+    """
+    "auto" usa Prophet solo cuando la serie tiene historia suficiente.
+    """
+    if engine == "auto":
+        return "prophet" if n_obs >= MIN_OBS_PROPHET else "baseline"
+    if engine not in ENGINES:
+        raise ValueError(f"Motor de forecast desconocido: {engine!r} (opciones: auto, {', '.join(ENGINES)})")
+    return engine
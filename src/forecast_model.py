@@ -1,22 +1,68 @@
 # src/forecast_model.py
 import pandas as pd
-from prophet import Prophet
 from pathlib import Path
 
+from exportar_excel import exportar_xlsx
+from forecast_engines import ENGINES, FORECAST_COLS, PERIODS, elegir_motor, get_cache
+from intermediate_store import guardar_tabla, leer_tabla, ruta_tabla
+
 ROOT = Path(__file__).resolve().parents[1]
 
-def run_forecast(df_sep: pd.DataFrame, proyecto: str, tipo: str):
+FORECAST_DIR = ruta_tabla("forecasts")                          # parquet particionado por proyecto
+FORECAST_XLSX = ROOT / "output" / "forecast_separaciones.xlsx"  # tabla larga para el correo
+
+def _serie(df_sep: pd.DataFrame, proyecto: str, tipo: str) -> pd.DataFrame:
     g = df_sep[(df_sep["nombre_proyecto"]==proyecto) &
                (df_sep["nombre_tipologia"]==tipo)]
+    return g[["fecha","separaciones"]].rename(columns={"fecha":"ds","separaciones":"y"})
+
+def _etiquetar(forecast: pd.DataFrame, proyecto: str, tipo: str, motor: str) -> pd.DataFrame:
+    # Mismo esquema para todos los motores, para poder apilar los combos
+    out = forecast.reindex(columns=FORECAST_COLS)
+    out.insert(0, "motor", motor)
+    out.insert(0, "nombre_tipologia", tipo)
+    out.insert(0, "nombre_proyecto", proyecto)
+    return out
+
+def run_forecast(df_sep: pd.DataFrame, proyecto: str, tipo: str,
+                 use_cache: bool = True, engine: str = "auto") -> pd.DataFrame:
+    df = _serie(df_sep, proyecto, tipo)
 
-    df = g[["fecha","separaciones"]].rename(columns={"fecha":"ds","separaciones":"y"})
-    
-    model = Prophet()
-    model.fit(df)
+    motor = elegir_motor(engine, int(df["y"].notna().sum()))
+    kwargs = {"use_cache": use_cache} if motor == "prophet" else {}
+    forecast = ENGINES[motor]({(proyecto, tipo): df}, PERIODS, **kwargs)[(proyecto, tipo)]
 
-    future = model.make_future_dataframe(periods=90)
-    forecast = model.predict(future)
+    return _etiquetar(forecast, proyecto, tipo, motor)
 
-    out = ROOT / "output" / f"forecast_{proyecto}_{tipo}.xlsx"
-    forecast.to_excel(out, index=False)
+def run_forecast_batch(df_sep: pd.DataFrame, combos: list[tuple[str, str]],
+                       engine: str = "baseline") -> dict:
+    """
+    Varios combos con un mismo motor en una sola llamada; para el baseline
+    eso es un único ajuste vectorizado sobre todas las series.
+    """
+    # Un solo groupby y un take por combo, en vez de una máscara sobre todo df_sep por combo
+    filas = df_sep.groupby(["nombre_proyecto", "nombre_tipologia"], sort=False, observed=True).indices
+    ds_y = df_sep[["fecha", "separaciones"]].rename(columns={"fecha": "ds", "separaciones": "y"})
+    series = {(p, t): ds_y.iloc[filas.get((p, t), [])] for p, t in combos}
+    forecasts = ENGINES[engine](series, PERIODS)
+    return {key: _etiquetar(fc, *key, engine) for key, fc in forecasts.items()}
+
+def guardar_forecasts(frames: list[pd.DataFrame], excel: bool = True) -> Path:
+    """
+    Escribe todos los forecasts de una vez en la capa intermedia (parquet
+    particionado por proyecto) y, opcionalmente, un único xlsx para el correo.
+    Sin excel se borra el xlsx anterior para que nadie adjunte uno viejo.
+    """
+    cols = ["nombre_proyecto", "nombre_tipologia", "motor", *FORECAST_COLS]
+    todos = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=cols)
+
+    out = guardar_tabla("forecasts", todos)
+
+    if excel:
+        exportar_xlsx(FORECAST_XLSX, {"forecast": todos})
+    else:
+        FORECAST_XLSX.unlink(missing_ok=True)
     return out
+
+def leer_forecasts() -> pd.DataFrame:
+    return leer_tabla("forecasts")
@@ -0,0 +1,239 @@
+# src/historial_precios.py
+"""
+Historial append-only de snapshots de unidades, particionado por día:
+
+    data/intermediate/historial_precios/
+        dia=2025-10-01/<marca>.parquet   solo filas nuevas o que cambiaron
+        ultimo.parquet                   estado vigente por unidad (para el diff)
+        panel_mensual.parquet            precio promedio por proyecto/tipología/mes
+
+Cada registro compara el snapshot contra ultimo.parquet y agrega solo las
+altas, cambios y bajas; ni el diff ni el panel mensual releen el historial.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+ROOT = Path(__file__).resolve().parents[1]
+HIST_DIR = ROOT / "data" / "intermediate" / "historial_precios"
+
+KEY_COLS = ["nombre_proyecto", "nombre_subdivision", "nombre_unidad"]
+VALOR_COLS = ["nombre_tipologia", "PISO", "precio_lista", "estado_comercial", "area_total"]
+PANEL_COLS = ["nombre_proyecto", "nombre_tipologia", "mes", "precio_lista", "unidades"]
+
+SCHEMA = pa.schema([
+    ("nombre_proyecto", pa.string()),
+    ("nombre_subdivision", pa.string()),
+    ("nombre_unidad", pa.string()),
+    ("nombre_tipologia", pa.string()),
+    ("PISO", pa.int16()),
+    ("precio_lista", pa.float64()),
+    ("estado_comercial", pa.string()),
+    ("area_total", pa.float64()),
+    ("vigente", pa.bool_()),          # False: la unidad desapareció del export
+    ("fecha", pa.timestamp("us")),
+    ("huella", pa.uint64()),
+])
+PARTICION = pa.schema([("dia", pa.string())])
+
+
+def _normalizar(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Columnas del historial con tipos planos (sin categorías) y huella de los
+    valores rastreados, para comparar snapshots sin importar cómo se leyeron.
+    """
+    out = pd.DataFrame({c: df[c].astype(object) if c in df.columns else None
+                        for c in KEY_COLS + VALOR_COLS})
+    out["PISO"] = out["PISO"].astype("int16")
+    out["precio_lista"] = out["precio_lista"].astype(float)
+    out["area_total"] = pd.to_numeric(out["area_total"], errors="coerce").astype(float)
+    out["huella"] = pd.util.hash_pandas_object(out[VALOR_COLS], index=False).to_numpy()
+    return out.drop_duplicates(KEY_COLS, keep="last").reset_index(drop=True)
+
+
+def _leer_ultimo(hist_dir: Path) -> pd.DataFrame | None:
+    path = hist_dir / "ultimo.parquet"
+    return pd.read_parquet(path) if path.exists() else None
+
+
+def _escribir(df: pd.DataFrame, path: Path, schema: pa.Schema | None = None) -> None:
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False), tmp)
+    tmp.replace(path)
+
+
+def _panel_del_mes(vigente: pd.DataFrame, mes: pd.Timestamp) -> pd.DataFrame:
+    precios = (
+        vigente.groupby(["nombre_proyecto", "nombre_tipologia"], dropna=False)["precio_lista"]
+        .agg(precio_lista="mean", unidades="count")
+        .reset_index()
+    )
+    precios.insert(2, "mes", mes)
+    return precios[PANEL_COLS]
+
+
+def registrar_snapshot(df_unidades: pd.DataFrame, fecha: pd.Timestamp | None = None,
+                       hist_dir: Path = HIST_DIR) -> dict:
+    """
+    Agrega al historial las unidades nuevas, las que cambiaron en alguno de
+    VALOR_COLS y las que dejaron de aparecer (vigente=False). Las fechas deben
+    llegar en orden: el historial no se reescribe hacia atrás.
+    """
+    fecha = pd.Timestamp(fecha if fecha is not None else pd.Timestamp.now()).floor("us")
+    hist_dir.mkdir(parents=True, exist_ok=True)
+
+    snap = _normalizar(df_unidades)
+    snap["vigente"] = True
+    previo = _leer_ultimo(hist_dir)
+
+    if previo is None:
+        cambios = snap
+    else:
+        if fecha <= previo["fecha"].max():
+            raise ValueError(f"Snapshot del {fecha} no es posterior al último registrado "
+                             f"({previo['fecha'].max()})")
+        cruce = snap.merge(previo[KEY_COLS + ["huella", "vigente"]], on=KEY_COLS,
+                           how="outer", suffixes=("", "_prev"), indicator=True)
+        nuevo_o_cambio = (cruce["_merge"] == "left_only") | (
+            (cruce["_merge"] == "both")
+            & ((cruce["huella"] != cruce["huella_prev"]) | ~cruce["vigente_prev"].astype(bool))
+        )
+        # Bajas: estaban vigentes y ya no vienen en el export
+        bajas_keys = cruce.loc[(cruce["_merge"] == "right_only") & cruce["vigente_prev"].astype(bool), KEY_COLS]
+        bajas = previo.merge(bajas_keys, on=KEY_COLS).assign(vigente=False)
+        cambios = pd.concat(
+            [snap.merge(cruce.loc[nuevo_o_cambio, KEY_COLS], on=KEY_COLS), bajas.drop(columns="fecha")],
+            ignore_index=True,
+        )
+
+    # Ordenado por llave: las estadísticas por row group acotan las búsquedas por unidad
+    cambios = cambios.assign(fecha=fecha)[SCHEMA.names].sort_values(KEY_COLS, kind="stable")
+    if len(cambios):
+        dia_dir = hist_dir / f"dia={fecha:%Y-%m-%d}"
+        dia_dir.mkdir(exist_ok=True)
+        pq.write_table(pa.Table.from_pandas(cambios, schema=SCHEMA, preserve_index=False),
+                       dia_dir / f"{fecha:%H%M%S%f}.parquet")
+
+    # Estado vigente por unidad = último + cambios (las bajas quedan con vigente=False)
+    if previo is None:
+        ultimo = cambios
+    else:
+        sin_cambio = previo.merge(cambios[KEY_COLS], on=KEY_COLS, how="left", indicator=True)
+        ultimo = pd.concat([previo[(sin_cambio["_merge"] == "left_only").to_numpy()], cambios],
+                           ignore_index=True)
+    _escribir(ultimo[SCHEMA.names], hist_dir / "ultimo.parquet", SCHEMA)
+
+    # El panel del mes del snapshot se recalcula desde el estado vigente
+    mes = fecha.to_period("M").to_timestamp()
+    panel_path = hist_dir / "panel_mensual.parquet"
+    panel = _panel_del_mes(ultimo[ultimo["vigente"]], mes)
+    if panel_path.exists():
+        previo_panel = pd.read_parquet(panel_path)
+        panel = pd.concat([previo_panel[previo_panel["mes"] != mes], panel], ignore_index=True)
+    _escribir(panel, panel_path)
+
+    stats = {
+        "fecha": fecha,
+        "altas_o_cambios": int(cambios["vigente"].sum()),
+        "bajas": int((~cambios["vigente"]).sum()),
+        "vigentes": int(ultimo["vigente"].sum()),
+    }
+    return stats
+
+
+def leer_vigentes(hist_dir: Path = HIST_DIR) -> pd.DataFrame:
+    """
+    Unidades vigentes al último snapshot registrado (sin releer el historial).
+    """
+    ultimo = _leer_ultimo(hist_dir)
+    if ultimo is None:
+        return pd.DataFrame(columns=SCHEMA.names)
+    return ultimo[ultimo["vigente"]].reset_index(drop=True)
+
+
+def _dataset(hist_dir: Path) -> ds.Dataset:
+    return ds.dataset(hist_dir, format="parquet", schema=SCHEMA.append(PARTICION.field("dia")),
+                      partitioning=ds.partitioning(PARTICION, flavor="hive"),
+                      exclude_invalid_files=False,
+                      ignore_prefixes=["ultimo", "panel_mensual", "."])
+
+
+def leer_historial(hist_dir: Path = HIST_DIR, hasta: pd.Timestamp | None = None,
+                   filtro: dict | None = None) -> pd.DataFrame:
+    """
+    Filas del historial (opcionalmente hasta una fecha y filtradas por igualdad
+    de columnas, p. ej. {"nombre_proyecto": "Alicanto"}). Las particiones de
+    días posteriores a `hasta` no se abren.
+    """
+    if not hist_dir.exists():
+        return pd.DataFrame(columns=SCHEMA.names)
+    conds = []
+    if hasta is not None:
+        hasta = pd.Timestamp(hasta)
+        conds += [ds.field("dia") <= f"{hasta:%Y-%m-%d}", ds.field("fecha") <= hasta]
+    for col, val in (filtro or {}).items():
+        conds.append(ds.field(col).isin(val if isinstance(val, (list, tuple, set)) else [val]))
+    expr = None
+    for c in conds:
+        expr = c if expr is None else expr & c
+    table = _dataset(hist_dir).to_table(columns=SCHEMA.names, filter=expr)
+    return table.to_pandas().sort_values(KEY_COLS + ["fecha"], kind="stable").reset_index(drop=True)
+
+
+def precio_asof(consultas: pd.DataFrame, hist_dir: Path = HIST_DIR) -> pd.DataFrame:
+    """
+    consultas: KEY_COLS + "fecha". Devuelve cada consulta con los valores que
+    tenía la unidad a esa fecha (último registro con fecha <= consulta); NaN
+    si todavía no existía o ya estaba dada de baja.
+    """
+    consultas = consultas.assign(fecha=pd.to_datetime(consultas["fecha"]).astype("datetime64[us]"))
+    hist = leer_historial(hist_dir, hasta=consultas["fecha"].max(),
+                          filtro={c: consultas[c].dropna().unique().tolist() for c in ["nombre_proyecto"]})
+    hist = hist.rename(columns={"fecha": "fecha_registro"})
+
+    izq = consultas.reset_index().sort_values("fecha", kind="stable")
+    der = hist.assign(fecha=hist["fecha_registro"]).sort_values("fecha", kind="stable")
+    # merge_asof exige llaves sin nulos; las subdivisiones vacías van como ""
+    for c in KEY_COLS:
+        izq[c] = izq[c].astype(object).fillna("")
+        der[c] = der[c].astype(object).fillna("")
+    out = pd.merge_asof(izq, der.drop(columns="huella"), on="fecha", by=KEY_COLS, direction="backward")
+    baja = out["vigente"].eq(False)
+    out.loc[baja, VALOR_COLS] = np.nan
+    out = out.set_index("index").sort_index()
+    out.index.name = None
+    out[KEY_COLS] = consultas[KEY_COLS]
+    return out
+
+
+def panel_precios_mensual(hist_dir: Path = HIST_DIR, hasta: pd.Timestamp | None = None) -> pd.DataFrame:
+    """
+    Precio promedio por proyecto/tipología y mes, leído del panel ya
+    agregado. Los meses sin snapshot heredan el último precio conocido
+    (el inventario no cambió entre snapshots).
+    """
+    path = hist_dir / "panel_mensual.parquet"
+    if not path.exists():
+        return pd.DataFrame(columns=PANEL_COLS)
+    panel = pd.read_parquet(path)
+    hasta = pd.Timestamp(hasta if hasta is not None else pd.Timestamp.now()).to_period("M").to_timestamp()
+    panel = panel[panel["mes"] <= hasta]
+    if panel.empty:
+        return panel.reset_index(drop=True)
+
+    # Cada mes con snapshot tiene el panel completo del inventario vigente:
+    # un mes sin snapshot toma el del último mes con snapshot anterior
+    con_snapshot = np.sort(panel["mes"].unique())
+    meses = pd.date_range(con_snapshot[0], hasta, freq="MS")
+    fuente = con_snapshot[np.searchsorted(con_snapshot, meses.to_numpy(), side="right") - 1]
+    mapa = pd.DataFrame({"mes": meses, "mes_fuente": fuente})
+    largo = mapa.merge(panel.rename(columns={"mes": "mes_fuente"}), on="mes_fuente")
+    return (
+        largo[PANEL_COLS]
+        .sort_values(["nombre_proyecto", "nombre_tipologia", "mes"])
+        .reset_index(drop=True)
+    )
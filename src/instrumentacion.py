@@ -0,0 +1,205 @@
+# src/instrumentacion.py
+"""
+Métricas por etapa compartidas por las pipelines:
+
+    with etapa("pricing", "modelo") as m:
+        ...
+        m["unidades"] = len(df)
+        m["unidades_por_estado"] = result["estado"].value_counts().to_dict()
+
+Cada etapa agrega una línea al log JSON-lines (duración, estado y métricas),
+reescribe el textfile de Prometheus si está configurado y, si su nombre
+coincide con el patrón de perfilado, corre bajo cProfile (o pyinstrument).
+
+Variables de entorno:
+    PRICING_METRICS_DIR   carpeta del log y los perfiles
+    PRICING_PROMETHEUS    ruta del .prom (p. ej. para el textfile collector de node_exporter)
+    PRICING_PROFILE       patrones "pipeline.etapa" separados por coma (admite *)
+    PRICING_PROFILER      cprofile (por defecto) o pyinstrument
+"""
+import os
+import io
+import json
+import time
+import fnmatch
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+METRICS_DIR = Path(os.environ.get("PRICING_METRICS_DIR", ROOT / "data" / "intermediate" / "metricas"))
+LOG_MAX_BYTES = 50 * 1024 * 1024  # al pasarlo, runs.jsonl rota a runs.jsonl.1
+
+RUN_ID = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+
+_config = {
+    "log": METRICS_DIR / "runs.jsonl",
+    "prometheus": Path(os.environ["PRICING_PROMETHEUS"]) if os.environ.get("PRICING_PROMETHEUS") else None,
+    "perfil": [p.strip() for p in os.environ.get("PRICING_PROFILE", "").split(",") if p.strip()],
+    "profiler": os.environ.get("PRICING_PROFILER", "cprofile"),
+}
+_lock = threading.Lock()
+_ultimas: dict[tuple[str, str], dict] = {}  # última corrida por etapa, para el .prom
+
+
+def configurar(log: Path | None = None, prometheus: Path | None = None,
+               perfil: str | list[str] | None = None, profiler: str | None = None) -> None:
+    """
+    Sobrescribe la configuración del entorno (p. ej. desde flags de CLI).
+    """
+    if log is not None:
+        _config["log"] = Path(log)
+    if prometheus is not None:
+        _config["prometheus"] = Path(prometheus)
+    if perfil is not None:
+        _config["perfil"] = [p.strip() for p in perfil.split(",")] if isinstance(perfil, str) else list(perfil)
+    if profiler is not None:
+        _config["profiler"] = profiler
+
+
+def _a_json(v):
+    # numpy/pandas -> tipos nativos; lo demás como texto
+    if hasattr(v, "item"):
+        return v.item()
+    if isinstance(v, dict):
+        return {str(k): _a_json(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple)):
+        return [_a_json(x) for x in v]
+    if isinstance(v, (int, float, str, bool)) or v is None:
+        return v
+    return str(v)
+
+
+def _escribir_log(registro: dict) -> None:
+    path = _config["log"]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    linea = json.dumps(registro, ensure_ascii=False) + "\n"
+    with _lock:
+        if path.exists() and path.stat().st_size > LOG_MAX_BYTES:
+            path.replace(path.with_name(path.name + ".1"))
+        with path.open("a", encoding="utf-8") as f:
+            f.write(linea)
+
+
+def _escapar(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _escribir_prometheus() -> None:
+    path = _config["prometheus"]
+    if path is None:
+        return
+    lineas = [
+        "# HELP pricing_etapa_segundos Duración de la última corrida de la etapa.",
+        "# TYPE pricing_etapa_segundos gauge",
+    ]
+    metricas, estados, marcas = [], [], []
+    for (pipeline, nombre), r in sorted(_ultimas.items()):
+        base = f'pipeline="{_escapar(pipeline)}",etapa="{_escapar(nombre)}"'
+        lineas.append(f"pricing_etapa_segundos{{{base}}} {r['segundos']:.6f}")
+        estados.append(f"pricing_etapa_ok{{{base}}} {int(r['estado'] == 'ok')}")
+        marcas.append(f"pricing_etapa_fin_timestamp_seconds{{{base}}} {r['fin']:.3f}")
+        for clave, valor in r["metricas"].items():
+            items = valor.items() if isinstance(valor, dict) else [(None, valor)]
+            for sub, v in items:
+                if isinstance(v, bool) or not isinstance(v, (int, float)):
+                    continue
+                extra = f',clave="{_escapar(sub)}"' if sub is not None else ""
+                metricas.append(f'pricing_etapa_metrica{{{base},metrica="{_escapar(clave)}"{extra}}} {v}')
+    lineas += ["# HELP pricing_etapa_ok 1 si la última corrida terminó bien.",
+               "# TYPE pricing_etapa_ok gauge", *estados,
+               "# HELP pricing_etapa_fin_timestamp_seconds Fin de la última corrida.",
+               "# TYPE pricing_etapa_fin_timestamp_seconds gauge", *marcas,
+               "# HELP pricing_etapa_metrica Volúmenes de la última corrida (filas, grupos, combos, bytes...).",
+               "# TYPE pricing_etapa_metrica gauge", *metricas]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")  # el collector no debe leer un archivo a medias
+    tmp.write_text("\n".join(lineas) + "\n")
+    tmp.replace(path)
+
+
+@contextmanager
+def _perfilar(pipeline: str, nombre: str, registro: dict):
+    clave = f"{pipeline}.{nombre}"
+    if not any(fnmatch.fnmatch(clave, p) for p in _config["perfil"]):
+        yield
+        return
+
+    destino = _config["log"].parent / "perfiles"
+    destino.mkdir(parents=True, exist_ok=True)
+    if _config["profiler"] == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("    ⚠ pyinstrument no está instalado; se usa cProfile")
+        else:
+            prof = Profiler()
+            prof.start()
+            try:
+                yield
+            finally:
+                prof.stop()
+                out = destino / f"{RUN_ID}_{clave}.html"
+                out.write_text(prof.output_html())
+                registro["perfil"] = str(out)
+            return
+
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:
+        # Python >= 3.12 admite un solo cProfile activo a la vez (etapas en paralelo)
+        print(f"    ⚠ Otro perfil está activo; {clave} corre sin perfilar")
+        yield
+        return
+    try:
+        yield
+    finally:
+        prof.disable()
+        out = destino / f"{RUN_ID}_{clave}.prof"
+        prof.dump_stats(out)
+        resumen = io.StringIO()
+        pstats.Stats(prof, stream=resumen).sort_stats("cumulative").print_stats(15)
+        out.with_suffix(".txt").write_text(resumen.getvalue())
+        registro["perfil"] = str(out)
+
+
+@contextmanager
+def etapa(pipeline: str, nombre: str):
+    """
+    Mide la etapa y entrega un dict para cargar sus métricas. Si la etapa
+    falla, el registro queda con estado "error" y la excepción sigue su curso.
+    """
+    metricas: dict = {}
+    registro = {"run_id": RUN_ID, "pipeline": pipeline, "etapa": nombre,
+                "inicio": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    t0 = time.perf_counter()
+    try:
+        with _perfilar(pipeline, nombre, registro):
+            yield metricas
+        registro["estado"] = "ok"
+    except BaseException as e:
+        registro["estado"] = "error"
+        registro["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        registro["segundos"] = round(time.perf_counter() - t0, 6)
+        registro["metricas"] = _a_json(metricas)
+        _escribir_log(registro)
+        with _lock:
+            _ultimas[(pipeline, nombre)] = {**registro, "fin": time.time()}
+            _escribir_prometheus()
+
+
+def leer_log(path: Path | None = None, run_id: str | None = None) -> list[dict]:
+    """
+    Registros del log JSON-lines, opcionalmente de una sola corrida.
+    """
+    path = path or _config["log"]
+    if not path.exists():
+        return []
+    with path.open(encoding="utf-8") as f:
+        registros = [json.loads(linea) for linea in f if linea.strip()]
+    return [r for r in registros if run_id is None or r["run_id"] == run_id]
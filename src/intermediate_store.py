@@ -0,0 +1,178 @@
+# src/intermediate_store.py
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+ROOT = Path(__file__).resolve().parents[1]
+STORE_DIR = ROOT / "data" / "intermediate"
+
+# Esquema declarado por tabla. Las tablas con partition_cols se guardan como
+# dataset parquet particionado; el resto como Arrow IPC sin comprimir, que se
+# lee con memory map sin copiar ni parsear.
+TABLAS = {
+    # Llaves y estado como diccionario: se leen de vuelta como categóricas.
+    # Sin recomendación: se arma al exportar (curve_engine.agregar_recomendacion)
+    "pricing_resultado": {
+        "schema": pa.schema([
+            ("nombre_proyecto", pa.dictionary(pa.int32(), pa.string())),
+            ("nombre_subdivision", pa.dictionary(pa.int32(), pa.string())),
+            ("nombre_tipologia", pa.dictionary(pa.int32(), pa.string())),
+            ("unidad", pa.string()),
+            ("PISO", pa.int16()),
+            ("precio_real", pa.float64()),
+            ("precio_esperado", pa.float64()),
+            ("delta", pa.float64()),
+            ("delta_pct", pa.float64()),
+            ("estado", pa.dictionary(pa.int8(), pa.string())),
+            ("precio_sugerido", pa.float64()),
+            ("modelo_curva", pa.dictionary(pa.int8(), pa.string())),
+        ]),
+        "partition_cols": None,
+    },
+    "elasticidad_panel": {
+        "schema": pa.schema([
+            ("nombre_proyecto", pa.string()),
+            ("nombre_tipologia", pa.string()),
+            ("mes", pa.timestamp("ns")),
+            ("precio_lista", pa.float64()),
+            ("separaciones", pa.float64()),
+            ("pct_delta_p", pa.float64()),
+            ("pct_delta_q", pa.float64()),
+            ("elasticidad", pa.float64()),
+        ]),
+        "partition_cols": None,
+    },
+    "elasticidad_estimaciones": {
+        "schema": pa.schema([
+            ("nombre_proyecto", pa.string()),
+            ("nombre_tipologia", pa.string()),
+            ("metodo", pa.string()),
+            ("n_obs", pa.int64()),
+            ("elasticidad", pa.float64()),
+            ("error_std", pa.float64()),
+            ("ic_inf", pa.float64()),
+            ("ic_sup", pa.float64()),
+            ("peso_grupo", pa.float64()),
+        ]),
+        "partition_cols": None,
+    },
+    "forecasts": {
+        "schema": pa.schema([
+            ("nombre_proyecto", pa.string()),
+            ("nombre_tipologia", pa.string()),
+            ("motor", pa.string()),
+            ("ds", pa.timestamp("ns")),
+            ("trend", pa.float64()),
+            ("yhat_lower", pa.float64()),
+            ("yhat_upper", pa.float64()),
+            ("yhat", pa.float64()),
+        ]),
+        "partition_cols": ["nombre_proyecto"],
+    },
+    # Cubo de precios y separaciones al grano proyecto/subdivisión/tipología/mes (cubo_ventas)
+    "cubo_ventas": {
+        "schema": pa.schema([
+            ("nombre_proyecto", pa.dictionary(pa.int32(), pa.string())),
+            ("nombre_subdivision", pa.dictionary(pa.int32(), pa.string())),
+            ("nombre_tipologia", pa.dictionary(pa.int32(), pa.string())),
+            ("mes", pa.timestamp("ns")),
+            ("precio_suma", pa.float64()),
+            ("precio_n", pa.int64()),
+            ("separaciones", pa.float64()),
+            ("mes_precio", pa.timestamp("ns")),
+        ]),
+        "partition_cols": None,
+    },
+    # Cortes en caché del cubo, apilados: "corte" lista sus niveles y las
+    # dimensiones que no son del corte quedan nulas (cubo_ventas)
+    "cubo_cortes": {
+        "schema": pa.schema([
+            ("corte", pa.dictionary(pa.int32(), pa.string())),
+            ("nombre_proyecto", pa.dictionary(pa.int32(), pa.string())),
+            ("nombre_subdivision", pa.dictionary(pa.int32(), pa.string())),
+            ("nombre_tipologia", pa.dictionary(pa.int32(), pa.string())),
+            ("mes", pa.timestamp("ns")),
+            ("trimestre", pa.timestamp("ns")),
+            ("anio", pa.int32()),
+            ("precio_suma", pa.float64()),
+            ("precio_n", pa.int64()),
+            ("separaciones", pa.float64()),
+        ]),
+        "partition_cols": None,
+    },
+    # Escalera de precios óptima por piso (optimizador_precios)
+    "escalera_precios": {
+        "schema": pa.schema([
+            ("nombre_proyecto", pa.dictionary(pa.int32(), pa.string())),
+            ("nombre_subdivision", pa.dictionary(pa.int32(), pa.string())),
+            ("nombre_tipologia", pa.dictionary(pa.int32(), pa.string())),
+            ("PISO", pa.int16()),
+            ("unidades_disponibles", pa.int32()),
+            ("precio_actual", pa.float64()),
+            ("precio_curva", pa.float64()),
+            ("precio_optimo", pa.float64()),
+        ]),
+        "partition_cols": None,
+    },
+}
+
+
+def ruta_tabla(nombre: str, store_dir: Path = STORE_DIR) -> Path:
+    spec = TABLAS[nombre]
+    return store_dir / (nombre if spec["partition_cols"] else f"{nombre}.arrow")
+
+
+def guardar_tabla(nombre: str, df: pd.DataFrame, store_dir: Path = STORE_DIR) -> Path:
+    """
+    Valida df contra el esquema declarado (castea tipos, falla si falta una
+    columna) y lo escribe en el formato de la tabla.
+    """
+    spec = TABLAS[nombre]
+    schema = spec["schema"]
+    faltan = [f.name for f in schema if f.name not in df.columns]
+    if faltan:
+        raise ValueError(f"Tabla {nombre!r}: faltan columnas {faltan}")
+    table = pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+    path = ruta_tabla(nombre, store_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if spec["partition_cols"]:
+        # Reescritura completa: sin esto pyarrow agregaría archivos a las particiones viejas
+        shutil.rmtree(path, ignore_errors=True)
+        # Sin filas pyarrow no escribe nada: la carpeta vacía marca la tabla como guardada
+        path.mkdir(parents=True, exist_ok=True)
+        pq.write_to_dataset(table, path, partition_cols=spec["partition_cols"])
+    else:
+        tmp = path.with_suffix(".arrow.tmp")
+        with pa.OSFile(str(tmp), "wb") as sink, ipc.new_file(sink, schema) as writer:
+            writer.write_table(table)
+        tmp.replace(path)
+    return path
+
+
+def leer_tabla(nombre: str, store_dir: Path = STORE_DIR, columns: list[str] | None = None) -> pd.DataFrame:
+    spec = TABLAS[nombre]
+    schema = spec["schema"]
+    path = ruta_tabla(nombre, store_dir)
+
+    def a_pandas(table: pa.Table) -> pd.DataFrame:
+        # Mismo orden de columnas que el esquema, también para las de partición
+        orden = [c for c in schema.names if c in table.column_names and (columns is None or c in columns)]
+        return table.select(orden).to_pandas()
+
+    if spec["partition_cols"]:
+        if not any(path.rglob("*.parquet")):
+            # Tabla guardada vacía (o nunca guardada): vacía pero con el esquema
+            return a_pandas(schema.empty_table())
+        partitioning = ds.partitioning(
+            pa.schema([schema.field(c) for c in spec["partition_cols"]]), flavor="hive",
+        )
+        return a_pandas(pq.read_table(path, columns=columns, memory_map=True, partitioning=partitioning))
+
+    with pa.memory_map(str(path), "r") as source:
+        return a_pandas(ipc.open_file(source).read_all())
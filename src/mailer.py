@@ -0,0 +1,162 @@
+# src/mailer.py
+import os
+import base64
+import smtplib
+import mimetypes
+import tempfile
+import zipfile
+from email.header import Header
+from email.utils import encode_rfc2231, formatdate, make_msgid
+from pathlib import Path
+from typing import Iterator
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Gmail rechaza mensajes de más de 25 MB ya codificados en base64 (+33%)
+MAX_EMAIL_BYTES = int(float(os.environ.get("EMAIL_MAX_MB", "18")) * 1024 * 1024)
+CHUNK = 57 * 1024  # múltiplo de 57 bytes -> líneas base64 completas de 76 caracteres
+
+# Formatos que ya vienen comprimidos: en el zip van sin volver a comprimir
+YA_COMPRIMIDOS = {".jpg", ".jpeg", ".png", ".xlsx", ".parquet", ".zip"}
+
+MIME_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".zip": "application/zip",
+}
+
+
+def smtp_config() -> dict:
+    """
+    Destino SMTP desde el entorno; por defecto Gmail por SSL. Para probar en
+    local: SMTP_HOST=localhost SMTP_PORT=8025 SMTP_SSL=0 (p. ej. con aiosmtpd).
+    """
+    return {
+        "host": os.environ.get("SMTP_HOST", "smtp.gmail.com"),
+        "port": int(os.environ.get("SMTP_PORT", "465")),
+        "ssl": os.environ.get("SMTP_SSL", "1") != "0",
+        "user": os.environ["GMAIL_USER"],
+        "password": os.environ.get("GMAIL_APP_PASSWORD", ""),
+        "to": os.environ["GMAIL_TO"],
+    }
+
+
+def partir_en_lotes(paths: list[Path], max_bytes: int = MAX_EMAIL_BYTES) -> list[list[Path]]:
+    """
+    Agrupa archivos en lotes cuyo tamaño codificado (base64) no pase max_bytes.
+    Un archivo más grande que el presupuesto va solo en su propio lote.
+    """
+    lotes, actual, usado = [], [], 0
+    for p in paths:
+        size = p.stat().st_size * 4 // 3
+        if actual and usado + size > max_bytes:
+            lotes.append(actual)
+            actual, usado = [], 0
+        actual.append(p)
+        usado += size
+    if actual:
+        lotes.append(actual)
+    return lotes
+
+
+def empaquetar_zip(paths: list[Path], out_path: Path) -> Path:
+    # ZipFile.write lee cada archivo por bloques: nunca entero en memoria
+    with zipfile.ZipFile(out_path, "w") as zf:
+        for p in paths:
+            tipo = zipfile.ZIP_STORED if p.suffix.lower() in YA_COMPRIMIDOS else zipfile.ZIP_DEFLATED
+            zf.write(p, arcname=p.name, compress_type=tipo)
+    return out_path
+
+
+def _parametro(clave: str, valor: str) -> str:
+    # ASCII: clave="valor" tal cual; si no, RFC 2231 (clave*=utf-8''...). Los
+    # encoded-words de RFC 2047 no valen dentro de un parámetro entre comillas
+    if valor.isascii():
+        escapado = valor.replace("\\", "\\\\").replace('"', '\\"')
+        return f'{clave}="{escapado}"'
+    return f"{clave}*={encode_rfc2231(valor, 'utf-8')}"
+
+
+def _lineas_mime(remitente: str, destino: str, asunto: str, cuerpo: str,
+                 adjuntos: list[Path]) -> Iterator[bytes]:
+    """
+    Mensaje multipart generado línea a línea; los adjuntos se leen del disco y
+    se codifican en base64 por bloques.
+    """
+    boundary = f"=={make_msgid(domain='pricing').strip('<>')}=="
+    yield f"From: {remitente}\r\n".encode()
+    yield f"To: {destino}\r\n".encode()
+    # Los asuntos largos se pliegan en varias líneas: con CRLF, nunca un LF suelto en el DATA
+    subject = Header(asunto, "utf-8").encode(linesep="\r\n")
+    yield f"Subject: {subject}\r\n".encode()
+    yield f"Date: {formatdate(localtime=True)}\r\n".encode()
+    yield f"Message-ID: {make_msgid()}\r\n".encode()
+    yield b"MIME-Version: 1.0\r\n"
+    yield f'Content-Type: multipart/mixed; boundary="{boundary}"\r\n\r\n'.encode()
+
+    yield f"--{boundary}\r\n".encode()
+    yield b'Content-Type: text/plain; charset="utf-8"\r\nContent-Transfer-Encoding: base64\r\n\r\n'
+    texto = base64.encodebytes(cuerpo.encode("utf-8")).replace(b"\n", b"\r\n")
+    yield texto
+
+    for p in adjuntos:
+        mime = MIME_TYPES.get(p.suffix.lower()) or mimetypes.guess_type(p.name)[0] or "application/octet-stream"
+        yield f"--{boundary}\r\n".encode()
+        yield f"Content-Type: {mime}; {_parametro('name', p.name)}\r\n".encode()
+        yield b"Content-Transfer-Encoding: base64\r\n"
+        yield f"Content-Disposition: attachment; {_parametro('filename', p.name)}\r\n\r\n".encode()
+        with p.open("rb") as f:
+            for bloque in iter(lambda: f.read(CHUNK), b""):
+                yield base64.encodebytes(bloque).replace(b"\n", b"\r\n")
+    yield f"--{boundary}--\r\n".encode()
+
+
+def _enviar_streaming(smtp: smtplib.SMTP, remitente: str, destino: str,
+                      lineas: Iterator[bytes]) -> None:
+    # Equivalente a smtp.sendmail pero escribiendo el DATA a medida que se genera.
+    # Ninguna línea generada empieza con "." (encabezados y base64), así que
+    # no hace falta dot-stuffing.
+    smtp.ehlo_or_helo_if_needed()
+    code, resp = smtp.mail(remitente)
+    if code != 250:
+        raise smtplib.SMTPSenderRefused(code, resp, remitente)
+    for rcpt in [d.strip() for d in destino.split(",") if d.strip()]:
+        code, resp = smtp.rcpt(rcpt)
+        if code not in (250, 251):
+            raise smtplib.SMTPRecipientsRefused({rcpt: (code, resp)})
+    code, resp = smtp.docmd("data")
+    if code != 354:
+        raise smtplib.SMTPDataError(code, resp)
+    for linea in lineas:
+        smtp.send(linea)
+    # docmd envía ".\r\n"; como la última línea ya terminó en CRLF, queda el "\r\n.\r\n" final
+    code, resp = smtp.docmd(".")
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+
+
+def enviar_reporte(asunto: str, cuerpo: str, adjuntos: list[Path],
+                   comprimir: bool = True, max_bytes: int = MAX_EMAIL_BYTES,
+                   config: dict | None = None) -> int:
+    """
+    Envía los adjuntos en uno o varios correos de hasta max_bytes cada uno.
+    Con comprimir=True cada lote viaja como un único .zip. Devuelve el
+    número de correos enviados.
+    """
+    cfg = config or smtp_config()
+    adjuntos = [p for p in adjuntos if p.exists()]
+    lotes = partir_en_lotes(adjuntos, max_bytes) or [[]]
+
+    smtp_cls = smtplib.SMTP_SSL if cfg["ssl"] else smtplib.SMTP
+    with tempfile.TemporaryDirectory() as tmp, smtp_cls(cfg["host"], cfg["port"]) as smtp:
+        if cfg["password"]:
+            smtp.login(cfg["user"], cfg["password"])
+        for i, lote in enumerate(lotes, start=1):
+            sufijo = f" ({i}/{len(lotes)})" if len(lotes) > 1 else ""
+            if comprimir and lote:
+                nombre = f"reporte_pricing_{i}.zip" if len(lotes) > 1 else "reporte_pricing.zip"
+                lote = [empaquetar_zip(lote, Path(tmp) / nombre)]
+            lineas = _lineas_mime(cfg["user"], cfg["to"], asunto + sufijo, cuerpo, lote)
+            _enviar_streaming(smtp, cfg["user"], cfg["to"], lineas)
+    return len(lotes)
@@ -0,0 +1,212 @@
+# src/monotonicidad.py
+"""
+Detector de violaciones a la regla de la curva lógica: dentro de un
+proyecto/torre/tipología, al subir de piso el precio NO debería subir más
+que la tolerancia.
+
+    python src/monotonicidad.py --col precio_m2 --por-piso max
+    python src/monotonicidad.py --col precio_lista,precio_m2
+"""
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from curve_engine import GROUP_COLS, codigos_grupo
+from exportar_excel import exportar_tabla
+from etl_unidades import CLEAN_PATH, cargar_unidades, leer_unidades
+
+ROOT = Path(__file__).resolve().parents[1]
+OUT_PATH = ROOT / "output" / "precios_fuera_de_curva.xlsx"
+
+TOLERANCIA_PCT = 0.01
+AGREGADOS = ("max", "median", "min", "mean")
+
+
+def columnas_violacion(col_precio: str) -> list[str]:
+    return GROUP_COLS + [
+        "unidad", "PISO", f"{col_precio}_actual", "PISO_ref", f"{col_precio}_ref",
+        "delta", "delta_pct",
+    ]
+
+
+def _previo_en_grupo(codes: np.ndarray, valores: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    shift(1) dentro de cada grupo sobre arrays ya ordenados por grupo:
+    (valor anterior, máscara de que existe un anterior en el mismo grupo).
+    """
+    tiene_prev = np.zeros(len(codes), dtype=bool)
+    tiene_prev[1:] = codes[1:] == codes[:-1]
+    prev = np.empty_like(valores)
+    if len(valores):
+        prev[1:] = valores[:-1]
+        prev[0] = valores[0]
+    return prev, tiene_prev
+
+
+def _violaciones_ordenadas(c: np.ndarray, piso: np.ndarray, precio: np.ndarray,
+                           tolerancia_pct: float, por_piso: str | None) -> tuple[np.ndarray, ...]:
+    """
+    Regla de la curva lógica sobre arrays ya ordenados por grupo y piso:
+    (máscara de violación, precio de referencia, piso de referencia).
+    """
+    if por_piso is None:
+        ref, tiene_prev = _previo_en_grupo(c, precio)
+        piso_ref, _ = _previo_en_grupo(c, piso)
+    else:
+        # Un registro por (grupo, piso); cada unidad apunta al agregado del piso anterior
+        inicio = np.ones(len(c), dtype=bool)
+        inicio[1:] = (c[1:] != c[:-1]) | (piso[1:] != piso[:-1])
+        piso_id = np.cumsum(inicio) - 1
+        agregado = pd.Series(precio).groupby(piso_id, sort=True).agg(por_piso).to_numpy()
+        agg_prev, piso_tiene_prev = _previo_en_grupo(c[inicio], agregado)
+        pisos_prev, _ = _previo_en_grupo(c[inicio], piso[inicio])
+        ref, tiene_prev, piso_ref = agg_prev[piso_id], piso_tiene_prev[piso_id], pisos_prev[piso_id]
+
+    # Regla: precio_actual <= precio_ref * (1 + tolerancia)
+    return tiene_prev & (precio > ref * (1 + tolerancia_pct)), ref, piso_ref
+
+
+def _ordenar(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # (orden, código de grupo y piso ya ordenados); estable: empates de piso en el orden de df
+    codes = codigos_grupo(df)
+    pisos = df["PISO"].to_numpy(dtype=np.int64)
+    order = np.lexsort((pisos, codes))
+    return order, codes[order], pisos[order]
+
+
+def detectar_violaciones(df: pd.DataFrame, col_precio: str = "precio_lista",
+                         tolerancia_pct: float = TOLERANCIA_PCT,
+                         por_piso: str | None = None) -> pd.DataFrame:
+    """
+    Una sola pasada sobre todo el inventario, ordenado por grupo y piso.
+
+    por_piso=None compara cada unidad con la fila anterior del grupo, como el
+    script original (las unidades de un mismo piso quedan en el orden de df).
+    por_piso="max"/"median"/"min"/"mean" compara cada unidad contra ese
+    agregado del piso anterior del grupo, sin depender del orden dentro del piso.
+    """
+    if por_piso is not None and por_piso not in AGREGADOS:
+        raise ValueError(f"por_piso debe ser None o uno de {AGREGADOS}, no {por_piso!r}")
+    cols = columnas_violacion(col_precio)
+    df = df.dropna(subset=["PISO", col_precio])
+    if df.empty:
+        return pd.DataFrame(columns=cols)
+
+    order, c, piso = _ordenar(df)
+    precio = df[col_precio].to_numpy(dtype=float)[order]
+    viol, ref, piso_ref = _violaciones_ordenadas(c, piso, precio, tolerancia_pct, por_piso)
+    filas = order[viol]
+    delta = precio[viol] - ref[viol]
+
+    unidad_col = "nombre_unidad" if "nombre_unidad" in df.columns else "nombre"
+    return pd.DataFrame({
+        **{g: df[g].to_numpy()[filas] for g in GROUP_COLS},
+        "unidad": df[unidad_col].to_numpy()[filas] if unidad_col in df.columns else None,
+        "PISO": piso[viol],
+        f"{col_precio}_actual": precio[viol],
+        "PISO_ref": piso_ref[viol],
+        f"{col_precio}_ref": ref[viol],
+        "delta": delta,
+        "delta_pct": delta / ref[viol] * 100,
+    }, columns=cols)
+
+
+def columnas_violacion_metricas(cols_precio) -> list[str]:
+    cols = GROUP_COLS + ["unidad", "PISO"]
+    for c in cols_precio:
+        cols += [f"{c}_actual", f"PISO_ref_{c}", f"{c}_ref", f"delta_pct_{c}"]
+    return cols + ["metricas"]
+
+
+def detectar_violaciones_metricas(df: pd.DataFrame, cols_precio=("precio_lista", "precio_m2"),
+                                  tolerancia_pct: float = TOLERANCIA_PCT,
+                                  por_piso: str | None = None) -> pd.DataFrame:
+    """
+    detectar_violaciones para varias métricas con un solo ordenamiento del
+    inventario: una fila por unidad que viola la regla en alguna métrica, con
+    la comparación de cada una (NaN donde esa métrica no viola) y en
+    "metricas" cuáles la violan. Por métrica, el resultado coincide con
+    detectar_violaciones: las unidades sin precio en una métrica se saltan
+    solo en esa (filtrar un arreglo ordenado lo deja ordenado).
+    """
+    if por_piso is not None and por_piso not in AGREGADOS:
+        raise ValueError(f"por_piso debe ser None o uno de {AGREGADOS}, no {por_piso!r}")
+    cols_precio = list(dict.fromkeys(cols_precio))
+    cols = columnas_violacion_metricas(cols_precio)
+    df = df.dropna(subset=["PISO"])
+    if df.empty:
+        return pd.DataFrame(columns=cols)
+
+    order, c, piso = _ordenar(df)
+    n = len(order)
+    alguna = np.zeros(n, dtype=bool)
+    etiqueta = np.zeros(n, dtype=np.int64)  # bit i: viola en cols_precio[i]
+    por_metrica = {}
+    for i, col in enumerate(cols_precio):
+        precio = df[col].to_numpy(dtype=float)[order]
+        ok = np.flatnonzero(~np.isnan(precio))
+        viol, ref, piso_ref = _violaciones_ordenadas(c[ok], piso[ok], precio[ok], tolerancia_pct, por_piso)
+        v = np.zeros(n, dtype=bool)
+        v[ok[viol]] = True
+        r = np.full(n, np.nan)
+        r[ok] = ref
+        pr = np.full(n, np.nan)
+        pr[ok] = piso_ref
+        alguna |= v
+        etiqueta |= v.astype(np.int64) << i
+        por_metrica[col] = (v, precio, pr, r)
+
+    filas = order[alguna]
+    unidad_col = "nombre_unidad" if "nombre_unidad" in df.columns else "nombre"
+    out = {g: df[g].to_numpy()[filas] for g in GROUP_COLS}
+    out["unidad"] = df[unidad_col].to_numpy()[filas] if unidad_col in df.columns else None
+    out["PISO"] = piso[alguna]
+    for col, (v, precio, pr, r) in por_metrica.items():
+        va = v[alguna]
+        out[f"{col}_actual"] = precio[alguna]
+        out[f"PISO_ref_{col}"] = np.where(va, pr[alguna], np.nan)
+        out[f"{col}_ref"] = np.where(va, r[alguna], np.nan)
+        out[f"delta_pct_{col}"] = np.where(va, (precio[alguna] - r[alguna]) / r[alguna] * 100, np.nan)
+    nombres = [", ".join(c for i, c in enumerate(cols_precio) if k >> i & 1) for k in range(1 << len(cols_precio))]
+    out["metricas"] = pd.Categorical.from_codes(etiqueta[alguna], categories=nombres)
+    return pd.DataFrame(out, columns=cols)
+
+
+def exportar_violaciones(outliers: pd.DataFrame, out_path: Path = OUT_PATH) -> Path:
+    return exportar_tabla(out_path, outliers, hoja="violaciones")
+
+
+def main(col_precio: str = "precio_lista", tolerancia_pct: float = TOLERANCIA_PCT,
+         por_piso: str | None = None, out_path: Path | None = OUT_PATH) -> pd.DataFrame:
+    df = leer_unidades() if CLEAN_PATH.exists() else cargar_unidades()
+
+    # "precio_lista,precio_m2": todas las métricas con un solo ordenamiento y un reporte combinado
+    cols = [c for c in col_precio.split(",") if c]
+    t0 = time.perf_counter()
+    if len(cols) > 1:
+        outliers = detectar_violaciones_metricas(df, cols, tolerancia_pct, por_piso)
+    else:
+        outliers = detectar_violaciones(df, col_precio, tolerancia_pct, por_piso)
+    print(outliers.head(20))
+    print(f">>> [DETECTOR] {len(outliers)} unidades fuera de curva de {len(df)} "
+          f"({time.perf_counter() - t0:.2f} s)")
+
+    if out_path is not None:
+        print(f">>> [DETECTOR] Exportado: {exportar_violaciones(outliers, out_path)}")
+    return outliers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--col", default="precio_lista",
+                        help="precio_lista, precio_m2 o ambas separadas por coma")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PCT)
+    parser.add_argument("--por-piso", choices=AGREGADOS, default=None,
+                        help="compara contra este agregado del piso anterior en vez de la fila anterior")
+    parser.add_argument("--salida", type=Path, default=OUT_PATH, help=".xlsx o .csv")
+    parser.add_argument("--sin-exportar", action="store_true")
+    args = parser.parse_args()
+    main(args.col, args.tolerancia, args.por_piso, None if args.sin_exportar else args.salida)
@@ -0,0 +1,299 @@
+# src/optimizador_precios.py
+"""
+Escalera de precios que maximiza el valor presente de vender todo el stock
+disponible de cada grupo (proyecto, subdivisión, tipología).
+
+Cada escalera candidata parte de la curva del grupo (curve_engine, con el
+modelo elegido por grupo) llevada a la regla de la curva lógica del
+detector: el precio no sube al subir de piso. Sobre esa base se mueven dos
+perillas, el nivel (multiplica toda la escalera) y la pendiente (estira o
+aplana la diferencia entre pisos alrededor del precio medio):
+
+    precio_piso = nivel * (centro + pendiente * (base_piso - centro))
+
+Con pendiente >= 0 toda candidata sigue siendo monótona. El ritmo de venta
+mensual de cada piso responde a su precio con la elasticidad del
+proyecto/tipología (elasticidad_model) sobre la demanda del forecast,
+repartida según las unidades disponibles; el piso se vende en
+meses = disponibles / ritmo y su ingreso se descuenta a la mitad de ese
+plazo con TASA_MENSUAL (costo de mantener el stock):
+
+    ritmo_piso = demanda_mensual * share * (precio / actual) ** elasticidad
+    valor_piso = precio * disponibles * exp(-TASA_MENSUAL * meses / 2)
+
+Subir el precio cobra más por unidad pero alarga la venta, así que el
+óptimo es interior: el plazo de venta que lo maximiza es 2 / (TASA * |e|).
+NIVELES acota el cambio permitido y en_borde marca cuando el óptimo queda
+fuera. Elasticidades no negativas no se optimizan y las negativas se
+acotan a ELASTICIDAD_RANGO; los grupos sin elasticidad ni forecast propios
+quedan con optimizado=False y sin escalera.
+
+Todas las candidatas de todos los grupos se evalúan como una grilla
+(filas de pisos x candidatas) por bloques; no hay loop por grupo.
+
+    python src/optimizador_precios.py
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from curve_engine import GROUP_COLS, PRICE_COL, ajustar_curvas
+from curve_models import ajustar_isotonica
+from exportar_excel import exportar_xlsx
+from forecast_engines import PERIODS
+
+ROOT = Path(__file__).resolve().parents[1]
+OUT_PATH = ROOT / "output" / "escalera_precios.xlsx"
+
+NIVELES = np.round(np.linspace(0.90, 1.10, 21), 4)   # ±10% sobre la curva, de a 1%
+PENDIENTES = np.round(np.linspace(0.0, 2.0, 9), 4)   # 0 = todos los pisos al mismo precio
+ELASTICIDAD_DEFECTO = -1.5  # combos sin estimación propia
+ELASTICIDAD_RANGO = (-5.0, -0.2)  # las estimaciones negativas se acotan a este rango
+VENTA_DEFECTO = 0.25        # combos sin forecast: fracción del stock que vende la curva actual en el horizonte
+TASA_MENSUAL = 0.02         # costo mensual de mantener el stock sin vender (capital y mantención)
+DISPONIBLES = ("disponible",)
+CELDAS = 4_000_000          # tope de celdas (pisos x candidatas) por bloque
+
+GRUPO_COLS_OUT = GROUP_COLS + [
+    "unidades_disponibles", "elasticidad", "fuente_elasticidad", "fuente_demanda", "demanda_horizonte",
+    "optimizado", "motivo", "nivel", "pendiente", "en_borde", "meses_venta_actual", "meses_venta_optimo",
+    "ingreso_actual", "ingreso_optimo", "mejora_pct",
+]
+PISO_COLS_OUT = GROUP_COLS + [
+    "PISO", "unidades_disponibles", "precio_actual", "precio_curva", "precio_optimo",
+]
+
+
+def candidatas(niveles=NIVELES, pendientes=PENDIENTES) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Grilla (nivel, pendiente) aplanada, ordenada por cercanía a la curva
+    actual (1, 1): ante empates argmax se queda con el cambio más chico.
+    """
+    s, t = np.meshgrid(np.asarray(niveles, float), np.asarray(pendientes, float), indexing="ij")
+    s, t = s.ravel(), t.ravel()
+    orden = np.lexsort((np.abs(t - 1), np.abs(s - 1) + np.abs(t - 1)))
+    return s[orden], t[orden]
+
+
+def demanda_horizonte(forecasts: pd.DataFrame, periods: int = PERIODS) -> pd.DataFrame:
+    """
+    Separaciones esperadas en el horizonte por proyecto/tipología: promedio
+    de yhat (>= 0) en los últimos `periods` días del forecast por los meses
+    del horizonte. Los dos motores dan el horizonte diario con yhat en
+    separaciones por mes.
+    """
+    llaves = ["nombre_proyecto", "nombre_tipologia"]
+    if forecasts is None or forecasts.empty:
+        return pd.DataFrame(columns=llaves + ["demanda_horizonte"])
+    fc = forecasts.dropna(subset=["yhat"])
+    fin = fc.groupby(llaves, observed=True)["ds"].transform("max")
+    fut = fc[fc["ds"] > fin - pd.Timedelta(days=periods)]
+    out = fut.assign(yhat=fut["yhat"].clip(lower=0)).groupby(llaves, observed=True)["yhat"].mean()
+    return (out * periods / 30).rename("demanda_horizonte").reset_index()
+
+
+def _valor_presente(precio, actual, disponibles, ritmo, elasticidad, tasa):
+    # Stock vendido al ritmo que da el precio, descontado a la mitad del plazo de venta
+    meses = disponibles / (ritmo * (precio / actual) ** elasticidad)
+    return precio * disponibles * np.exp(-tasa * meses / 2)
+
+
+def _por_combo(keys: pd.DataFrame, tabla: pd.DataFrame, col: str) -> np.ndarray:
+    # Valor de tabla[col] para el proyecto/tipología de cada grupo (NaN si no está)
+    llaves = ["nombre_proyecto", "nombre_tipologia"]
+    if tabla is None or tabla.empty:
+        return np.full(len(keys), np.nan)
+    tabla = tabla.drop_duplicates(llaves).astype({c: str for c in llaves})
+    cruce = keys[llaves].astype(str).merge(tabla[llaves + [col]], on=llaves, how="left")
+    return cruce[col].to_numpy(dtype=float)
+
+
+def optimizar_escaleras(df: pd.DataFrame, estimaciones: pd.DataFrame | None = None,
+                        forecasts: pd.DataFrame | None = None, price_col: str = PRICE_COL,
+                        niveles=NIVELES, pendientes=PENDIENTES,
+                        tasa: float = TASA_MENSUAL) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Devuelve (grupos, pisos): la candidata elegida y el valor presente del
+    stock por grupo (actual y óptimo), y la escalera por piso (actual, curva
+    monótona y óptima) de los grupos optimizados. Solo entran los grupos con
+    unidades disponibles.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=GRUPO_COLS_OUT), pd.DataFrame(columns=PISO_COLS_OUT)
+
+    curvas = ajustar_curvas(df, price_col)
+    floors = curvas.floors
+    n_grupos = len(curvas.n_pisos)
+    g = floors["grupo"].to_numpy()
+    x = floors["PISO"].to_numpy(dtype=float)
+    _, first = np.unique(curvas.codes, return_index=True)
+    keys = df[GROUP_COLS].iloc[first].reset_index(drop=True)
+
+    # Stock y precio actual por piso, solo de unidades disponibles
+    precio = df[price_col].to_numpy(dtype=float)
+    disp = np.isfinite(precio)
+    if "estado_comercial" in df.columns:
+        disp &= df["estado_comercial"].astype(str).str.lower().isin(DISPONIBLES).to_numpy()
+    n_piso = np.bincount(curvas.piso_unidad[disp], minlength=len(floors)).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p_actual = np.bincount(curvas.piso_unidad[disp], weights=precio[disp], minlength=len(floors)) / n_piso
+
+    # Base monótona: la curva del grupo (o el promedio del piso si no hay curva)
+    # proyectada a "no sube al subir de piso"
+    esperado = floors["esperado"].to_numpy()
+    curva = np.where(np.isfinite(esperado), esperado, floors["mean"].to_numpy())
+    base = ajustar_isotonica(g, x, curva, np.isfinite(curva), n_grupos, signo=-np.ones(n_grupos))
+
+    n_grupo = np.bincount(g, weights=n_piso, minlength=n_grupos)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centro = np.bincount(g, weights=np.where(n_piso > 0, n_piso * base, 0.0), minlength=n_grupos) / n_grupo
+
+    estimada = _por_combo(keys, estimaciones, "elasticidad")
+    con_elasticidad = np.isfinite(estimada)
+    elasticidad = np.where(con_elasticidad, np.clip(estimada, *ELASTICIDAD_RANGO), ELASTICIDAD_DEFECTO)
+    # La demanda del combo se reparte entre sus subdivisiones según el stock
+    demanda_combo = _por_combo(keys, demanda_horizonte(forecasts), "demanda_horizonte")
+    con_forecast = np.isfinite(demanda_combo)
+    combo = keys[["nombre_proyecto", "nombre_tipologia"]].astype(str).agg("|".join, axis=1)
+    stock_combo = pd.Series(n_grupo).groupby(combo.to_numpy()).transform("sum").to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        demanda = np.where(con_forecast, demanda_combo * n_grupo / stock_combo, VENTA_DEFECTO * n_grupo)
+    ritmo = demanda / (PERIODS / 30)   # unidades por mes al precio actual
+
+    # Sin dato propio de elasticidad ni de demanda la escalera sería solo el supuesto
+    motivo = np.select(
+        [con_elasticidad & (estimada >= 0), ~con_elasticidad & ~con_forecast, ~(ritmo > 0)],
+        ["elasticidad no negativa", "sin elasticidad ni forecast", "sin demanda"], default="",
+    )
+    optimizar = motivo == ""
+
+    # Grilla: solo los pisos con stock y precio aportan ingreso
+    s, t = candidatas(niveles, pendientes)
+    k = len(s)
+    filas = np.flatnonzero((n_piso > 0) & np.isfinite(base) & (p_actual > 0) & np.isfinite(centro[g])
+                           & optimizar[g])
+    gf = g[filas]
+    elegida = np.zeros(n_grupos, dtype=int)
+    ingreso_opt = np.full(n_grupos, np.nan)
+
+    inicio = np.flatnonzero(np.r_[True, gf[1:] != gf[:-1]]) if len(gf) else np.array([], dtype=int)
+    fin = np.r_[inicio[1:], len(gf)]
+    paso = max(1, CELDAS // k)
+    a = 0
+    while a < len(inicio):
+        # Bloques de grupos completos con hasta ~CELDAS celdas
+        b = max(a + 1, int(np.searchsorted(inicio, inicio[a] + paso, side="right")))
+        r = filas[inicio[a]:fin[b - 1]]
+        gr = g[r]
+        c = centro[gr][:, None]
+        P = s[None, :] * (c + t[None, :] * (base[r][:, None] - c))
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            ingreso = np.where(P > 0, _valor_presente(P, p_actual[r][:, None], n_piso[r][:, None],
+                                                      (ritmo[gr] * n_piso[r] / n_grupo[gr])[:, None],
+                                                      elasticidad[gr][:, None], tasa), -np.inf)
+        cortes = inicio[a:b] - inicio[a]
+        por_grupo = np.add.reduceat(ingreso, cortes, axis=0)
+        grupos_b = gr[cortes]
+        elegida[grupos_b] = np.argmax(por_grupo, axis=1)
+        ingreso_opt[grupos_b] = por_grupo[np.arange(len(cortes)), elegida[grupos_b]]
+        a = b
+
+    nivel, pendiente = s[elegida], t[elegida]
+    optimo = nivel[g] * (centro[g] + pendiente[g] * (base - centro[g]))
+    ok = np.isfinite(ingreso_opt)
+
+    # Valor presente y meses de venta con la escalera actual y la óptima
+    todas = np.flatnonzero((n_piso > 0) & (p_actual > 0))
+    gt = g[todas]
+    cuota = ritmo[gt] * n_piso[todas] / n_grupo[gt]
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        ingreso_act = np.bincount(gt, weights=_valor_presente(p_actual[todas], p_actual[todas], n_piso[todas],
+                                                              cuota, elasticidad[gt], tasa),
+                                  minlength=n_grupos)
+        ritmo_opt = np.bincount(gt, weights=cuota * (optimo[todas] / p_actual[todas]) ** elasticidad[gt],
+                                minlength=n_grupos)
+        meses_act = n_grupo / ritmo
+        meses_opt = np.where(ok, n_grupo / ritmo_opt, np.nan)
+
+    grupos = keys.copy()
+    grupos["unidades_disponibles"] = n_grupo.astype(int)
+    grupos["elasticidad"] = np.where(con_elasticidad, estimada, ELASTICIDAD_DEFECTO)
+    grupos["fuente_elasticidad"] = np.where(con_elasticidad, "estimada", "supuesto")
+    grupos["fuente_demanda"] = np.where(con_forecast, "forecast", "supuesto")
+    grupos["demanda_horizonte"] = demanda
+    grupos["optimizado"] = ok
+    grupos["motivo"] = np.where(ok | (motivo != ""), motivo, "sin pisos con precio")
+    grupos["nivel"] = np.where(ok, nivel, np.nan)
+    grupos["pendiente"] = np.where(ok, pendiente, np.nan)
+    grupos["en_borde"] = ok & (np.isin(nivel, [s.min(), s.max()]) | np.isin(pendiente, [t.min(), t.max()]))
+    grupos["meses_venta_actual"] = meses_act
+    grupos["meses_venta_optimo"] = meses_opt
+    grupos["ingreso_actual"] = ingreso_act
+    grupos["ingreso_optimo"] = ingreso_opt
+    with np.errstate(invalid="ignore", divide="ignore"):
+        grupos["mejora_pct"] = (ingreso_opt / ingreso_act - 1) * 100
+    grupos = grupos[n_grupo > 0].reset_index(drop=True)
+
+    pisos = keys.iloc[g].reset_index(drop=True)
+    pisos["PISO"] = floors["PISO"].to_numpy()
+    pisos["unidades_disponibles"] = n_piso.astype(int)
+    pisos["precio_actual"] = p_actual
+    pisos["precio_curva"] = base
+    pisos["precio_optimo"] = optimo
+    pisos = pisos[ok[g]].reset_index(drop=True)
+    return grupos[GRUPO_COLS_OUT], pisos[PISO_COLS_OUT]
+
+
+def exportar_escaleras(grupos: pd.DataFrame, pisos: pd.DataFrame, out_path: Path = OUT_PATH) -> Path:
+    return exportar_xlsx(out_path, {"grupos": grupos, "pisos": pisos})
+
+
+def optimizar_inventario(df: pd.DataFrame, price_col: str = PRICE_COL,
+                         out_path: Path | None = OUT_PATH) -> pd.DataFrame:
+    """
+    Optimiza con las elasticidades y forecasts que haya en la capa intermedia,
+    guarda la escalera por piso y exporta el Excel. Devuelve la tabla por grupo.
+    """
+    from instrumentacion import etapa
+    from intermediate_store import guardar_tabla, leer_tabla, ruta_tabla
+
+    def leer_opcional(nombre: str) -> pd.DataFrame | None:
+        return leer_tabla(nombre) if ruta_tabla(nombre).exists() else None
+
+    with etapa("optimizacion", "escalera") as m:
+        grupos, pisos = optimizar_escaleras(df, leer_opcional("elasticidad_estimaciones"),
+                                            leer_opcional("forecasts"), price_col)
+        guardar_tabla("escalera_precios", pisos)
+        opt = grupos[grupos["optimizado"]]
+        m.update(grupos=len(grupos), grupos_optimizados=len(opt), pisos=len(pisos),
+                 candidatas=len(NIVELES) * len(PENDIENTES),
+                 grupos_con_forecast=int((grupos["fuente_demanda"] == "forecast").sum()),
+                 grupos_en_borde=int(opt["en_borde"].sum()),
+                 ingreso_actual=float(opt["ingreso_actual"].sum()),
+                 ingreso_optimo=float(opt["ingreso_optimo"].sum()))
+
+    print(f">>> [OPTIMIZADOR] {len(grupos)} grupos, {m['grupos_optimizados']} optimizados "
+          f"({m['grupos_en_borde']} en el borde de la grilla), {len(pisos)} pisos, "
+          f"{m['grupos_con_forecast']} con forecast; valor presente del stock optimizado "
+          f"{m['ingreso_actual']:,.0f} -> {m['ingreso_optimo']:,.0f}")
+    if len(opt) < len(grupos):
+        print(grupos.loc[~grupos["optimizado"], "motivo"].value_counts().to_string())
+    if out_path is not None:
+        print(f">>> [OPTIMIZADOR] Exportado: {exportar_escaleras(grupos, pisos, out_path)}")
+    return grupos
+
+
+def main(price_col: str = PRICE_COL, out_path: Path | None = OUT_PATH) -> pd.DataFrame:
+    from etl_unidades import leer_unidades
+    return optimizar_inventario(leer_unidades(), price_col, out_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--col", default=PRICE_COL, help="precio_lista o precio_m2")
+    parser.add_argument("--salida", type=Path, default=OUT_PATH, help=".xlsx")
+    parser.add_argument("--sin-exportar", action="store_true")
+    args = parser.parse_args()
+    main(args.col, None if args.sin_exportar else args.salida)
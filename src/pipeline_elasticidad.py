@@ -1,32 +1,86 @@
 # src/pipeline_elasticidad.py
+import argparse
 from pathlib import Path
 import pandas as pd
 
-from elasticidad_model import run_elasticidad
+from cubo_ventas import CuboVentas, cargar_cubo
+from elasticidad_model import METODOS, run_elasticidad_cubo
+from etl_unidades import leer_unidades
+from exportar_excel import exportar_xlsx
+from historial_precios import leer_vigentes, registrar_snapshot
+from instrumentacion import etapa
+from intermediate_store import guardar_tabla, leer_tabla
 
 ROOT = Path(__file__).resolve().parents[1]
 
-def main() -> None:
-    print(">>> [PIPELINE ELASTICIDAD] Cargando unidades limpias...")
-    clean_unidades = ROOT / "data" / "intermediate" / "unidades_clean.parquet"
-    df_unidades = pd.read_parquet(clean_unidades)
+SEP_PATH = ROOT / "data" / "separaciones_mensual.csv"
+ELAST_XLSX = ROOT / "output" / "elasticidad_panel.xlsx"
 
-    print(">>> [PIPELINE ELASTICIDAD] Cargando separaciones mensuales...")
-    sep_path = ROOT / "data" / "separaciones_mensual.csv"
+def cargar_separaciones(sep_path: Path = SEP_PATH) -> pd.DataFrame:
     df_sep = pd.read_csv(sep_path)
 
-    # Asegura columna mes en formato fecha (si viene como texto tipo '2025-10')
-    if "mes" in df_sep.columns:
-        df_sep["mes"] = pd.to_datetime(df_sep["mes"])
+    # Asegura columnas de fecha (si vienen como texto tipo '2025-10')
+    for col in ("mes", "fecha"):
+        if col in df_sep.columns:
+            df_sep[col] = pd.to_datetime(df_sep[col])
+    return df_sep
+
+def actualizar_historial(df_unidades: pd.DataFrame) -> CuboVentas:
+    """
+    Registra el snapshot de unidades en el historial de precios y pasa el
+    inventario vigente al mes del snapshot en el cubo de ventas.
+    """
+    with etapa("elasticidad", "historial") as m:
+        stats = registrar_snapshot(df_unidades)
+        m.update(filas=len(df_unidades), **{k: v for k, v in stats.items() if k != "fecha"})
+        cubo = cargar_cubo()
+        cubo.actualizar_precios(leer_vigentes(), stats["fecha"])
+        cubo.guardar()
+        m["filas_cubo"] = len(cubo.base)
+    print(f">>> [PIPELINE ELASTICIDAD] Historial de precios: {stats['altas_o_cambios']} altas/cambios, "
+          f"{stats['bajas']} bajas, {stats['vigentes']} unidades vigentes")
+    return cubo
+
+def calcular_panel(cubo: CuboVentas, df_sep: pd.DataFrame,
+                   metodo: str = "shrinkage") -> pd.DataFrame:
+    print(f">>> [PIPELINE ELASTICIDAD] Estimando elasticidad log-log ({metodo})...")
+    with etapa("elasticidad", "estimacion") as m:
+        # Solo se agregan los meses de separaciones que el cubo no tenía
+        m["meses_separaciones"] = cubo.actualizar_separaciones(df_sep)
+        panel, estimaciones = run_elasticidad_cubo(cubo, metodo=metodo)
+        cubo.guardar()  # con el corte del panel en la caché
+        m.update(metodo=metodo, filas_separaciones=len(df_sep), filas_panel=len(panel),
+                 grupos_estimados=len(estimaciones),
+                 grupos_sin_dato_propio=int((estimaciones["peso_grupo"] == 0).sum()))
+
+        store_path = guardar_tabla("elasticidad_panel", panel)
+        guardar_tabla("elasticidad_estimaciones", estimaciones)
+    print(f">>> [PIPELINE ELASTICIDAD] Panel guardado en: {store_path} "
+          f"({len(estimaciones)} elasticidades por proyecto/tipología)")
 
-    print(">>> [PIPELINE ELASTICIDAD] Calculando elasticidad precio–cantidad...")
-    panel = run_elasticidad(df_unidades, df_sep)
+    out_path = exportar_panel(panel, estimaciones)
+    print(f">>> [PIPELINE ELASTICIDAD] Exportado a: {out_path}")
+    return panel
 
-    out_path = ROOT / "output" / "elasticidad_panel.xlsx"
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    panel.to_excel(out_path, index=False)
+def exportar_panel(panel: pd.DataFrame, estimaciones: pd.DataFrame | None = None) -> Path:
+    # Excel solo como exportación final para el correo
+    if estimaciones is None:
+        estimaciones = leer_tabla("elasticidad_estimaciones")
+    return exportar_xlsx(ELAST_XLSX, {"elasticidades": estimaciones, "panel": panel})
+
+def main(metodo: str = "shrinkage") -> None:
+    print(">>> [PIPELINE ELASTICIDAD] Cargando unidades limpias...")
+    clean_unidades = ROOT / "data" / "intermediate" / "unidades_clean.parquet"
+    df_unidades = leer_unidades(clean_unidades)
+
+    print(">>> [PIPELINE ELASTICIDAD] Cargando separaciones mensuales...")
+    df_sep = cargar_separaciones()
 
-    print(f">>> [PIPELINE ELASTICIDAD] Panel guardado en: {out_path}")
+    calcular_panel(actualizar_historial(df_unidades), df_sep, metodo=metodo)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--metodo", choices=METODOS, default="shrinkage",
+                        help="grupo: OLS por grupo; pooled: una sola; shrinkage: por grupo encogida a la pooled")
+    args = parser.parse_args()
+    main(metodo=args.metodo)
@@ -1,32 +1,196 @@
 # src/pipeline_forecast.py
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import pandas as pd
 
-from forecast_model import run_forecast
+from forecast_model import run_forecast, run_forecast_batch, guardar_forecasts, get_cache
+from forecast_engines import ENGINES, elegir_motor
+from instrumentacion import etapa
 
 ROOT = Path(__file__).resolve().parents[1]
 
-def main() -> None:
+DEFAULT_TIMEOUT = 300  # segundos por combo
+# Sin fork: el runner abre el pool desde un hilo y el hijo heredaría locks tomados por otros hilos
+CONTEXTO_PROCESOS = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+def _timeout_handler(signum, frame):
+    raise TimeoutError("tiempo máximo por combo excedido")
+
+def forecast_combo(g: pd.DataFrame, proyecto: str, tipo: str, timeout: int | None,
+                   engine: str = "prophet") -> tuple[dict, pd.DataFrame | None]:
+    """
+    Corre un combo y devuelve (resumen, forecast) en vez de propagar la
+    excepción, para que un combo fallido no tumbe el resto del lote.
+    """
+    # SIGALRM solo se puede armar desde el hilo principal (p. ej. no dentro del runner)
+    usa_alarma = (bool(timeout) and hasattr(signal, "SIGALRM")
+                  and threading.current_thread() is threading.main_thread())
+    if usa_alarma:
+        signal.signal(signal.SIGALRM, _timeout_handler)
+        signal.alarm(int(timeout))
+
+    cache = get_cache()
+    hits_antes = cache.hits
+    t0 = time.perf_counter()
+    forecast, error = None, None
+    try:
+        forecast = run_forecast(g, proyecto, tipo, engine=engine)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        if usa_alarma:
+            signal.alarm(0)
+
+    return {
+        "nombre_proyecto": proyecto,
+        "nombre_tipologia": tipo,
+        "motor": engine,
+        "filas": len(forecast) if forecast is not None else 0,
+        "error": error,
+        "cache_hit": cache.hits > hits_antes,
+        "segundos": time.perf_counter() - t0,
+    }, forecast
+
+def _forecast_baseline_lote(df_sep: pd.DataFrame,
+                            combos: list[tuple[str, str]]) -> tuple[list[dict], list[pd.DataFrame]]:
+    # Un solo ajuste vectorizado para todos los combos; el tiempo se reparte
+    t0 = time.perf_counter()
+    error = None
+    try:
+        forecasts = run_forecast_batch(df_sep, combos, engine="baseline")
+    except Exception as e:
+        forecasts, error = {}, f"{type(e).__name__}: {e}"
+    por_combo = (time.perf_counter() - t0) / max(len(combos), 1)
+    resumen = [
+        {
+            "nombre_proyecto": proyecto,
+            "nombre_tipologia": tipo,
+            "motor": "baseline",
+            "filas": len(forecasts.get((proyecto, tipo), ())),
+            "error": error,
+            "cache_hit": False,
+            "segundos": por_combo,
+        }
+        for proyecto, tipo in combos
+    ]
+    return resumen, list(forecasts.values())
+
+def run_forecasts(df_sep: pd.DataFrame, workers: int = 1, timeout: int | None = DEFAULT_TIMEOUT,
+                  engine: str = "auto") -> tuple[pd.DataFrame, list[pd.DataFrame]]:
+    """
+    Forecast de todos los combos proyecto–tipología. Los combos que van al
+    baseline se ajustan juntos en un solo lote; los de Prophet se reparten en
+    un pool de procesos cuando workers > 1. Fuera del hilo principal (runner)
+    SIGALRM no se puede armar, así que con timeout se usa igual un proceso
+    aparte, aunque workers sea 1. Devuelve (resumen por combo, forecasts en
+    memoria).
+    """
+    grupos, lote_baseline = [], []
+    for (proyecto, tipo), g in df_sep.groupby(["nombre_proyecto", "nombre_tipologia"], sort=False):
+        motor = elegir_motor(engine, int(g["separaciones"].notna().sum()))
+        if motor == "baseline":
+            lote_baseline.append((proyecto, tipo))
+        else:
+            grupos.append((g, proyecto, tipo, motor))
+
+    resultados, frames = [], []
+    if lote_baseline:
+        print(f">>> [PIPELINE FORECAST] Baseline vectorizado para {len(lote_baseline)} combos ...")
+        resumen, fcs = _forecast_baseline_lote(df_sep, lote_baseline)
+        resultados.extend(resumen)
+        frames.extend(fcs)
+
+    # Fuera del hilo principal no hay SIGALRM: el timeout se aplica en el proceso hijo
+    alarma_en_hijo = (bool(timeout) and hasattr(signal, "SIGALRM")
+                      and threading.current_thread() is not threading.main_thread())
+    if workers <= 1 and not alarma_en_hijo:
+        for g, proyecto, tipo, motor in grupos:
+            print(f">>> [PIPELINE FORECAST] Forecast para {proyecto} / {tipo} ...")
+            r, fc = forecast_combo(g, proyecto, tipo, timeout, motor)
+            resultados.append(r)
+            if fc is not None:
+                frames.append(fc)
+    elif grupos:
+        if workers <= 1:
+            print(">>> [PIPELINE FORECAST] Fuera del hilo principal: combos en un proceso aparte para el timeout")
+        with ProcessPoolExecutor(max_workers=max(workers, 1),
+                                 mp_context=multiprocessing.get_context(CONTEXTO_PROCESOS)) as pool:
+            futures = [pool.submit(forecast_combo, g, proyecto, tipo, timeout, motor)
+                       for g, proyecto, tipo, motor in grupos]
+            for fut in as_completed(futures):
+                r, fc = fut.result()
+                print(f">>> [PIPELINE FORECAST] {r['nombre_proyecto']} / {r['nombre_tipologia']} "
+                      f"({r['segundos']:.1f} s)")
+                resultados.append(r)
+                if fc is not None:
+                    frames.append(fc)
+
+    resumen = pd.DataFrame(
+        resultados,
+        columns=["nombre_proyecto", "nombre_tipologia", "motor", "filas",
+                 "error", "cache_hit", "segundos"],
+    )
+    return resumen, frames
+
+def forecast_separaciones(df_sep: pd.DataFrame, workers: int = 1,
+                          timeout: int | None = DEFAULT_TIMEOUT, engine: str = "auto",
+                          excel: bool = True) -> pd.DataFrame:
+    with etapa("forecast", "forecast") as m:
+        t0 = time.perf_counter()
+        resumen, frames = run_forecasts(df_sep, workers=workers, timeout=timeout, engine=engine)
+        total = time.perf_counter() - t0
+        m.update(filas=len(df_sep), combos=len(resumen), workers=workers,
+                 combos_con_error=int(resumen["error"].notna().sum()),
+                 cache_hits=int(resumen["cache_hit"].sum()),
+                 combos_por_motor=resumen["motor"].value_counts().to_dict())
+
+    t0 = time.perf_counter()
+    with etapa("forecast", "guardar") as m:
+        out = guardar_forecasts(frames, excel=excel)
+        m["filas"] = sum(len(f) for f in frames)
+    print(f">>> [PIPELINE FORECAST] {len(frames)} forecasts guardados en {out} "
+          f"({time.perf_counter() - t0:.1f} s)")
+
+    errores = resumen[resumen["error"].notna()]
+    for r in errores.itertuples(index=False):
+        print(f"    ⚠ Error con {r.nombre_proyecto} / {r.nombre_tipologia}: {r.error}")
+
+    print(">>> [PIPELINE FORECAST] Tiempo por combo (más lentos primero):")
+    print(resumen.sort_values("segundos", ascending=False)
+                 [["nombre_proyecto", "nombre_tipologia", "motor", "segundos"]]
+                 .to_string(index=False, float_format="%.1f"))
+    hits = int(resumen["cache_hit"].sum())
+    print(f">>> [PIPELINE FORECAST] Caché de modelos: {hits} hits, {len(resumen) - hits} misses")
+    print(f">>> [PIPELINE FORECAST] {len(resumen)} combos, {len(errores)} con error, "
+          f"{total:.1f} s en total con {workers} worker(s)")
+    return resumen
+
+def main(workers: int = 1, timeout: int | None = DEFAULT_TIMEOUT,
+         engine: str = "auto", excel: bool = True) -> pd.DataFrame:
     print(">>> [PIPELINE FORECAST] Cargando separaciones históricas...")
     sep_path = ROOT / "data" / "separaciones_mensual.csv"
     df_sep = pd.read_csv(sep_path)
     df_sep["fecha"] = pd.to_datetime(df_sep["fecha"])
 
-    # Recorrer combos proyecto–tipología
-    combos = (
-        df_sep[["nombre_proyecto", "nombre_tipologia"]]
-        .drop_duplicates()
-        .itertuples(index=False)
-    )
-
-    for combo in combos:
-        proyecto, tipo = combo
-        print(f">>> [PIPELINE FORECAST] Forecast para {proyecto} / {tipo} ...")
-        try:
-            out = run_forecast(df_sep, proyecto, tipo)
-            print(f"    Archivo: {out}")
-        except Exception as e:
-            print(f"    ⚠ Error con {proyecto} / {tipo}: {e}")
+    return forecast_separaciones(df_sep, workers=workers, timeout=timeout,
+                                 engine=engine, excel=excel)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="procesos en paralelo (1 = en serie)")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT,
+                        help="segundos máximos por combo (0 = sin límite)")
+    parser.add_argument("--engine", choices=["auto", *ENGINES], default="auto",
+                        help="motor de forecast; auto usa el baseline en series cortas")
+    parser.add_argument("--sin-excel", action="store_true",
+                        help="solo escribe el dataset parquet, sin el xlsx consolidado")
+    args = parser.parse_args()
+    main(workers=args.workers, timeout=args.timeout or None, engine=args.engine,
+         excel=not args.sin_excel)
@@ -1,60 +1,99 @@
 # src/pipeline_pricing.py
 import os
+import argparse
 from pathlib import Path
-from email.message import EmailMessage
-import smtplib
 
-from etl_unidades import run_etl_unidades
-from pricing_model import run_pricing_model
+import pandas as pd
+
+from curve_engine import MODELOS_CURVA, codigos_grupo, resumen_sensibilidad, sensibilidad_umbral
+from etl_unidades import (
+    RAW_PATH, CLEAN_PATH, cargar_unidades, guardar_unidades, huella_csv, leer_unidades, limpio_vigente,
+    registrar_huella,
+)
+from instrumentacion import etapa
+from mailer import enviar_reporte
+from pricing_model import REPORT_PATH, evaluar_inventario, evaluar_inventario_metricas, guardar_resultado
 
 ROOT = Path(__file__).resolve().parents[1]
 
+def cargar_unidades_limpias() -> pd.DataFrame:
+    with etapa("pricing", "etl") as m:
+        huella = huella_csv(RAW_PATH)
+        df = cargar_unidades(RAW_PATH)
+        guardar_unidades(df, CLEAN_PATH)
+        registrar_huella(huella, CLEAN_PATH)
+        m["filas"] = len(df)
+        m["mb_memoria"] = round(df.memory_usage(deep=True).sum() / 1e6, 2)
+    return df
+
+def modelo_pricing(df: pd.DataFrame, incremental: bool = False, modelos=MODELOS_CURVA,
+                   umbrales=None, metricas=None) -> pd.DataFrame:
+    with etapa("pricing", "modelo") as m:
+        combinado = None
+        if metricas:
+            result, combinado = evaluar_inventario_metricas(df, metricas, incremental=incremental, modelos=modelos)
+            m["fuera_de_curva_alguna_metrica"] = int(combinado["fuera_de_curva"].sum())
+        else:
+            result = evaluar_inventario(df, incremental=incremental, modelos=modelos)
+        # Barrido de umbrales sobre el mismo delta, sin volver a puntuar
+        sens = sensibilidad_umbral(result, umbrales) if umbrales else None
+        guardar_resultado(result, sens, combinado)
+        if sens is not None:
+            m["umbrales"] = len(set(umbrales))
+            print(">>> [PIPELINE PRICING] Sensibilidad al umbral:")
+            print(resumen_sensibilidad(sens).to_string(index=False))
+        m["unidades"] = len(result)
+        m["grupos"] = int(codigos_grupo(df).max()) + 1 if len(df) else 0
+        m["unidades_por_estado"] = result["estado"].value_counts().to_dict()
+        m["unidades_por_modelo"] = result["modelo_curva"].value_counts().to_dict()
+    return result
+
 def send_email_with_report(report_path: Path):
-    user = os.environ["GMAIL_USER"]
-    app_password = os.environ["GMAIL_APP_PASSWORD"]
-    to_addr = os.environ["GMAIL_TO"]
-
-    msg = EmailMessage()
-    msg["From"] = user
-    msg["To"] = to_addr
-    msg["Subject"] = "Reporte de precios fuera de curva – unidades"
-
-    msg.set_content(
-        "Hola,\n\n"
-        "Adjunto el último reporte de precios por piso/tipología con "
-        "recomendaciones de ajuste (subir, bajar o mantener).\n\n"
-        "Enviado automáticamente por GitHub Actions.\n"
-    )
-
-    with report_path.open("rb") as f:
-        data = f.read()
-
-    msg.add_attachment(
-        data,
-        maintype="application",
-        subtype=(
-            "vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        ),
-        filename=report_path.name,
-    )
-
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-        smtp.login(user, app_password)
-        smtp.send_message(msg)
-
-    print(f"Correo enviado a {to_addr} con {report_path.name}")
-
-def main():
+    # Un solo xlsx: va suelto, leído del disco por bloques al enviarlo
+    with etapa("pricing", "email") as m:
+        m["correos"] = enviar_reporte(
+            "Reporte de precios fuera de curva – unidades",
+            "Hola,\n\n"
+            "Adjunto el último reporte de precios por piso/tipología con "
+            "recomendaciones de ajuste (subir, bajar o mantener).\n\n"
+            "Enviado automáticamente por GitHub Actions.\n",
+            [report_path],
+            comprimir=False,
+        )
+        m["bytes_adjuntos"] = report_path.stat().st_size
+
+    print(f"Correo enviado a {os.environ['GMAIL_TO']} con {report_path.name}")
+
+def main(incremental: bool = False, email: bool = True, modelos=MODELOS_CURVA, umbrales=None,
+         metricas=None):
     """ clean_path = run_etl_unidades()
     report_path = run_pricing_model(clean_path) """
-    print(">>> [PIPELINE PRICING] Iniciando ETL de unidades...")
-    clean_path = run_etl_unidades()
-    print(f">>> [PIPELINE PRICING] ETL listo: {clean_path}")
+    if incremental and limpio_vigente(RAW_PATH, CLEAN_PATH):
+        print(f">>> [PIPELINE PRICING] Unidades.csv sin cambios, se reutiliza: {CLEAN_PATH}")
+        df = leer_unidades(CLEAN_PATH)
+    else:
+        print(">>> [PIPELINE PRICING] Iniciando ETL de unidades...")
+        df = cargar_unidades_limpias()
+        print(f">>> [PIPELINE PRICING] ETL listo: {CLEAN_PATH}")
 
     print(">>> [PIPELINE PRICING] Corriendo modelo de precios-curva...")
-    report_path = run_pricing_model(clean_path)
-    print(f">>> [PIPELINE PRICING] Reporte generado: {report_path}")
-    send_email_with_report(report_path)
+    modelo_pricing(df, incremental=incremental, modelos=modelos, umbrales=umbrales, metricas=metricas)
+    print(f">>> [PIPELINE PRICING] Reporte generado: {REPORT_PATH}")
+    if email:
+        send_email_with_report(REPORT_PATH)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--incremental", action="store_true",
+                        help="reajusta solo los grupos cuyas unidades cambiaron")
+    parser.add_argument("--sin-email", action="store_true", help="no envía el correo")
+    parser.add_argument("--modelos", default=",".join(MODELOS_CURVA),
+                        help="modelos de curva candidatos por grupo, separados por coma")
+    parser.add_argument("--umbrales", default=None,
+                        help="umbrales a barrer, p. ej. 0.01,0.02,0.05: hojas de sensibilidad en el Excel")
+    parser.add_argument("--metricas", default=None,
+                        help="otras métricas a puntuar junto a precio_lista (p. ej. precio_m2): hoja combinada")
+    args = parser.parse_args()
+    main(incremental=args.incremental, email=not args.sin_email, modelos=args.modelos.split(","),
+         umbrales=[float(u) for u in args.umbrales.split(",")] if args.umbrales else None,
+         metricas=args.metricas.split(",") if args.metricas else None)
@@ -1,68 +1,153 @@
 # src/pipeline_reporting.py
 import os
+import argparse
+import multiprocessing
 from pathlib import Path
-from email.message import EmailMessage
-import smtplib
 
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+from exportar_excel import exportar_xlsx
+from forecast_model import FORECAST_DIR, FORECAST_XLSX, leer_forecasts
+from instrumentacion import etapa
+from intermediate_store import leer_tabla
+from mailer import MAX_EMAIL_BYTES, enviar_reporte
+from pipeline_elasticidad import ELAST_XLSX
+from pipeline_forecast import CONTEXTO_PROCESOS
 
 ROOT = Path(__file__).resolve().parents[1]
+PLOTS_DIR = ROOT / "output" / "plots_econometricos"
+MANIFEST = ".manifest.json"  # huella de datos + parámetros por imagen
 
 # ---------------- VISUALIZACIONES EN JPG ---------------- #
 
-def build_econometric_plots_jpg(panel_elast: pd.DataFrame) -> Path:
-    out_dir = ROOT / "output" / "plots_econometricos"
+def _pyplot():
+    # matplotlib se importa recién al graficar: el envío del correo y la CLI no lo cargan
+    import matplotlib
+    matplotlib.use("Agg")  # sin display; también en los procesos del pool
+    import matplotlib.pyplot as plt
+    return plt
+
+def _huella_plot(data: pd.DataFrame, cols: list[str], **params) -> str:
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(data[cols], index=False).to_numpy().tobytes())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+def render_curva_demanda(g: pd.DataFrame, proj: str, tipo: str, out_path: Path,
+                         rapido: bool = False, dpi: int = 200) -> Path:
+    plt = _pyplot()
+    plt.figure(figsize=(7, 5))
+    if rapido:
+        # Solo matplotlib: recta OLS sin el bootstrap del intervalo de seaborn
+        x = g["precio_lista"].to_numpy(dtype=float)
+        y = g["separaciones"].to_numpy(dtype=float)
+        ok = ~(np.isnan(x) | np.isnan(y))
+        plt.scatter(x[ok], y[ok])
+        slope, intercept = np.polyfit(x[ok], y[ok], 1)
+        xs = np.array([x[ok].min(), x[ok].max()])
+        plt.plot(xs, slope * xs + intercept, linewidth=2)
+    else:
+        import seaborn as sns
+        sns.scatterplot(x="precio_lista", y="separaciones", data=g)
+        sns.regplot(x="precio_lista", y="separaciones", data=g,
+                    scatter=False, line_kws={"linewidth": 2})
+    plt.title(f"Demanda vs Precio – {proj} / {tipo}")
+    plt.xlabel("Precio promedio (S/)")
+    plt.ylabel("Separaciones")
+    plt.tight_layout()
+
+    # GUARDAR EN JPG
+    plt.savefig(out_path, dpi=dpi, format="jpg")
+    plt.close()
+    return out_path
+
+def build_econometric_plots_jpg(panel_elast: pd.DataFrame, workers: int = 1,
+                                rapido: bool = False, dpi: int = 200) -> Path:
+    """
+    Curva de demanda por proyecto/tipología + boxplot de elasticidad. Cada
+    imagen se re-renderiza solo si cambió su grupo de datos (o rapido/dpi);
+    las curvas pendientes se reparten en un pool de procesos si workers > 1.
+    """
+    with etapa("reporting", "plots") as m:
+        out_dir, renderizadas, sin_cambios = _renderizar_plots(panel_elast, workers, rapido, dpi)
+        m.update(filas_panel=len(panel_elast), plots_renderizados=renderizadas,
+                 plots_sin_cambios=sin_cambios, workers=workers)
+    return out_dir
+
+def _renderizar_plots(panel_elast: pd.DataFrame, workers: int, rapido: bool,
+                      dpi: int) -> tuple[Path, int, int]:
+    out_dir = PLOTS_DIR
     out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / MANIFEST
+    previo = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    manifest = {}
 
     # 1) Curva demanda (Precio vs Separaciones) por proyecto/tipología
+    tareas = []
     for (proj, tipo), g in panel_elast.groupby(["nombre_proyecto", "nombre_tipologia"]):
         if g["precio_lista"].nunique() < 2 or g["separaciones"].nunique() < 2:
             continue  # muy pocos datos para curva
 
-        plt.figure(figsize=(7, 5))
-        sns.scatterplot(x="precio_lista", y="separaciones", data=g)
-        sns.regplot(x="precio_lista", y="separaciones", data=g,
-                    scatter=False, line_kws={"linewidth": 2})
-        plt.title(f"Demanda vs Precio – {proj} / {tipo}")
-        plt.xlabel("Precio promedio (S/)")
-        plt.ylabel("Separaciones")
+        fname = f"demand_curve_{proj}_{tipo}.jpg".replace(" ", "_")
+        manifest[fname] = _huella_plot(g, ["precio_lista", "separaciones"],
+                                       titulo=(proj, tipo), rapido=rapido, dpi=dpi)
+        if previo.get(fname) != manifest[fname] or not (out_dir / fname).exists():
+            tareas.append((g[["precio_lista", "separaciones"]], proj, tipo, out_dir / fname, rapido, dpi))
+
+    if workers > 1 and len(tareas) > 1:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context(CONTEXTO_PROCESOS)) as pool:
+            list(pool.map(render_curva_demanda, *zip(*tareas)))
+    else:
+        for t in tareas:
+            render_curva_demanda(*t)
+
+    # 2) Boxplot de elasticidad: una estimación por proyecto/tipología
+    box_name = "elasticidad_boxplot.jpg"
+    por_grupo = panel_elast.drop_duplicates(["nombre_proyecto", "nombre_tipologia"])
+    manifest[box_name] = _huella_plot(por_grupo, ["nombre_proyecto", "elasticidad"], dpi=dpi)
+    box_renderizado = previo.get(box_name) != manifest[box_name] or not (out_dir / box_name).exists()
+    if box_renderizado:
+        import seaborn as sns
+        plt = _pyplot()
+        plt.figure(figsize=(10, 6))
+        sns.boxplot(x="nombre_proyecto", y="elasticidad", data=por_grupo)
+        plt.xticks(rotation=45, ha="right")
+        plt.title("Distribución de Elasticidad Precio-Demanda")
+        plt.xlabel("Proyecto")
+        plt.ylabel("Elasticidad")
         plt.tight_layout()
 
-        # GUARDAR EN JPG
-        fname = f"demand_curve_{proj}_{tipo}.jpg".replace(" ", "_")
-        plt.savefig(out_dir / fname, dpi=200, format="jpg")
+        plt.savefig(out_dir / box_name, dpi=dpi, format="jpg")
         plt.close()
 
-    # 2) Boxplot de elasticidad
-    plt.figure(figsize=(10, 6))
-    sns.boxplot(x="nombre_proyecto", y="elasticidad", data=panel_elast)
-    plt.xticks(rotation=45, ha="right")
-    plt.title("Distribución de Elasticidad Precio-Demanda")
-    plt.xlabel("Proyecto")
-    plt.ylabel("Elasticidad")
-    plt.tight_layout()
-
-    box_fname = out_dir / "elasticidad_boxplot.jpg"
-    plt.savefig(box_fname, dpi=200, format="jpg")
-    plt.close()
+    # Imágenes de combos que ya no existen no deben ir al correo
+    for img in out_dir.glob("*.jpg"):
+        if img.name not in manifest:
+            img.unlink()
+    manifest_path.write_text(json.dumps(manifest, indent=2))
 
-    return out_dir
+    n_curvas = len(manifest) - 1
+    print(f">>> [PIPELINE REPORTING] Curvas de demanda: {len(tareas)} renderizadas, "
+          f"{n_curvas - len(tareas)} sin cambios")
+    return out_dir, len(tareas) + int(box_renderizado), n_curvas - len(tareas) + int(not box_renderizado)
 
 # ---------------- ENVÍO DE CORREO ---------------- #
 
-def send_summary_email(attachments: list[Path]) -> None:
-    user = os.environ["GMAIL_USER"]
-    app_password = os.environ["GMAIL_APP_PASSWORD"]
-    to_addr = os.environ["GMAIL_TO"]
-
-    msg = EmailMessage()
-    msg["From"] = user
-    msg["To"] = to_addr
-    msg["Subject"] = "Reporte econométrico de Pricing – Curva, Elasticidad y Forecast"
+def send_summary_email(attachments: list[Path], comprimir: bool = True,
+                       max_bytes: int = MAX_EMAIL_BYTES) -> None:
+    """
+    Los adjuntos se leen del disco por bloques al enviarlos. Con comprimir=True
+    van en un .zip por correo; si superan max_bytes se reparten en varios correos.
+    """
+    asunto = "Reporte econométrico de Pricing – Curva, Elasticidad y Forecast"
 
-    msg.set_content(
+    cuerpo = (
         "Hola,\n\n"
         "Adjunto el paquete de reporting econométrico de pricing:\n"
         "- Curva de precios por piso con recomendaciones (subir/bajar/mantener).\n"
@@ -97,51 +182,27 @@ def send_summary_email(attachments: list[Path]) -> None:
     "Se adjuntan:\n"
     "- Archivo de pricing con recomendaciones.\n"
     "- Elasticidad por proyecto/tipología.\n"
-    "- Forecast de demanda.\n"
+    "- Forecast de demanda (un solo archivo con todos los proyectos/tipologías).\n"
     "- Imágenes JPG de análisis econométrico.\n\n"
 
     "Enviado automáticamente por GitHub Actions (actualización cada 1 hora).\n"
 )
 
-    for path in attachments:
-        if not path.exists():
-            continue
-        with path.open("rb") as f:
-            data = f.read()
-
-        # Detectar tipo básico por extensión
-        suffix = path.suffix.lower()
-        if suffix in [".jpg", ".jpeg"]:
-            maintype, subtype = "image", "jpeg"
-        elif suffix in [".xlsx"]:
-            maintype = "application"
-            subtype = "vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        else:
-            maintype, subtype = "application", "octet-stream"
-
-        msg.add_attachment(
-            data,
-            maintype=maintype,
-            subtype=subtype,
-            filename=path.name,
-        )
-
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-        smtp.login(user, app_password)
-        smtp.send_message(msg)
-
-    print(f">>> [PIPELINE REPORTING] Correo enviado a {to_addr} con {len(attachments)} adjuntos.")
-
-def main() -> None:
-    print(">>> [PIPELINE REPORTING] Preparando archivos para el correo...")
+    with etapa("reporting", "email") as m:
+        existentes = [p for p in attachments if p.exists()]
+        enviados = enviar_reporte(asunto, cuerpo, attachments, comprimir=comprimir, max_bytes=max_bytes)
+        m.update(correos=enviados, adjuntos=len(existentes), comprimir=comprimir,
+                 bytes_adjuntos=sum(p.stat().st_size for p in existentes))
+    print(f">>> [PIPELINE REPORTING] {enviados} correo(s) enviado(s) con {len(attachments)} adjuntos.")
 
-    # 1) Cargar panel de elasticidad
-    elast_path = ROOT / "output" / "elasticidad_panel.xlsx"
-    panel_elast = pd.read_excel(elast_path)
+def reportar(panel_elast: pd.DataFrame, workers: int = 1,
+             rapido: bool = False, dpi: int = 200,
+             comprimir: bool = True, max_bytes: int = MAX_EMAIL_BYTES) -> None:
+    elast_path = ELAST_XLSX
 
     # 2) Generar visualizaciones en JPG
     print(">>> [PIPELINE REPORTING] Generando gráficos econométricos en JPG...")
-    plots_dir = build_econometric_plots_jpg(panel_elast)
+    plots_dir = build_econometric_plots_jpg(panel_elast, workers=workers, rapido=rapido, dpi=dpi)
 
     # 3) Reunir adjuntos
     attachments: list[Path] = []
@@ -153,9 +214,13 @@ def main() -> None:
     # 3.2 Panel elasticidad
     attachments.append(elast_path)
 
-    # 3.3 Forecasts (todos los forecast_*.xlsx)
-    for f in (ROOT / "output").glob("forecast_*.xlsx"):
-        attachments.append(f)
+    # 3.3 Forecasts (un solo xlsx consolidado; se rearma desde el parquet si
+    # no existe o si el parquet es más nuevo)
+    if FORECAST_DIR.exists():
+        parquet_mtime = max((p.stat().st_mtime for p in FORECAST_DIR.rglob("*") if p.is_file()), default=0.0)
+        if not FORECAST_XLSX.exists() or FORECAST_XLSX.stat().st_mtime < parquet_mtime:
+            exportar_xlsx(FORECAST_XLSX, {"forecast": leer_forecasts()})
+    attachments.append(FORECAST_XLSX)
 
     # 3.4 Todas las imágenes JPG
     for img in plots_dir.glob("*.jpg"):
@@ -163,7 +228,28 @@ def main() -> None:
 
     # 4) Enviar email
     print(f">>> [PIPELINE REPORTING] Adjuntando {len(attachments)} archivos...")
-    send_summary_email(attachments)
+    send_summary_email(attachments, comprimir=comprimir, max_bytes=max_bytes)
+
+def main(workers: int = 1, rapido: bool = False, dpi: int = 200,
+         comprimir: bool = True, max_bytes: int = MAX_EMAIL_BYTES) -> None:
+    print(">>> [PIPELINE REPORTING] Preparando archivos para el correo...")
+
+    # 1) Cargar panel de elasticidad (capa intermedia tipada, sin parsear Excel)
+    panel_elast = leer_tabla("elasticidad_panel")
+    reportar(panel_elast, workers=workers, rapido=rapido, dpi=dpi,
+             comprimir=comprimir, max_bytes=max_bytes)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="procesos para renderizar las curvas de demanda")
+    parser.add_argument("--rapido", action="store_true",
+                        help="matplotlib puro, sin el intervalo bootstrap de seaborn")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--sin-zip", action="store_true",
+                        help="adjunta los archivos sueltos en vez de un .zip por correo")
+    parser.add_argument("--max-mb", type=float, default=MAX_EMAIL_BYTES / 1024 / 1024,
+                        help="tope por correo en MB (base64); si se pasa, se parte en varios correos")
+    args = parser.parse_args()
+    main(workers=args.workers, rapido=args.rapido, dpi=args.dpi,
+         comprimir=not args.sin_zip, max_bytes=int(args.max_mb * 1024 * 1024))
@@ -0,0 +1,260 @@
+# src/pipeline_runner.py
+"""
+Corre las cuatro pipelines (pricing, elasticidad, forecast, reporting) y la
+escalera de precios óptima en un solo proceso como un grafo de etapas: los DataFrames pasan en memoria entre
+etapas, las etapas independientes corren en paralelo y las que no cambiaron
+de entradas, código ni parámetros desde la última corrida se omiten.
+
+    python src/pipeline_runner.py --incremental --workers 4
+"""
+import os
+import json
+import hashlib
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+import pandas as pd
+
+import etl_unidades
+import pricing_model
+import pipeline_pricing
+import pipeline_elasticidad
+import pipeline_forecast
+import pipeline_reporting
+import optimizador_precios
+import instrumentacion
+from cubo_ventas import cargar_cubo
+from curve_engine import MODELOS_CURVA
+from elasticidad_model import METODOS
+from forecast_model import leer_forecasts
+from intermediate_store import leer_tabla
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = Path(__file__).resolve().parent
+STATE_PATH = ROOT / "data" / "intermediate" / "runner_state.json"
+
+
+class Etapa(NamedTuple):
+    nombre: str
+    deps: list[str]
+    run: Callable[..., object]          # recibe las salidas de deps en orden
+    load: Callable[[], object] | None   # recarga la salida persistida si se omite
+    archivos: list[Path]                # entradas en disco que forman la huella
+    codigo: list[str]                   # módulos de src/ cuyo cambio invalida la etapa
+    siempre: bool = False               # efectos laterales (correo): corre siempre
+    parametros: dict | None = None      # opciones de la corrida que cambian la salida
+
+
+def _digest_archivo(path: Path) -> str:
+    if not path.exists():
+        return "ausente"
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def construir_etapas(incremental: bool = False, workers: int = 1,
+                     engine: str = "auto", email: bool = True, modelos=MODELOS_CURVA,
+                     metodo: str = "shrinkage") -> dict[str, Etapa]:
+    def unidades():
+        return pipeline_pricing.cargar_unidades_limpias()
+
+    def pricing(df_unidades):
+        return pipeline_pricing.modelo_pricing(df_unidades, incremental=incremental, modelos=modelos)
+
+    def elasticidad(cubo, df_sep):
+        return pipeline_elasticidad.calcular_panel(cubo, df_sep, metodo=metodo)
+
+    def email_pricing(result):
+        # Si pricing se omitió en un checkout limpio, el xlsx se rehace desde el store
+        if not pricing_model.REPORT_PATH.exists():
+            pricing_model.guardar_resultado(result)
+        pipeline_pricing.send_email_with_report(pricing_model.REPORT_PATH)
+
+    def forecast(df_sep):
+        pipeline_forecast.forecast_separaciones(df_sep, workers=workers, engine=engine)
+        return None
+
+    def escalera(df_unidades, _panel, _forecast):
+        # Elasticidades y forecasts se leen de la capa intermedia que dejaron sus etapas
+        return optimizador_precios.optimizar_inventario(df_unidades)
+
+    def reporting(result, panel, _forecast):
+        if not pricing_model.REPORT_PATH.exists():
+            pricing_model.guardar_resultado(result)
+        if not pipeline_elasticidad.ELAST_XLSX.exists():
+            pipeline_elasticidad.exportar_panel(panel)
+        if email:
+            pipeline_reporting.reportar(panel, workers=workers)
+        else:
+            pipeline_reporting.build_econometric_plots_jpg(panel, workers=workers)
+        return None
+
+    etapas = [
+        Etapa("unidades", [], unidades, etl_unidades.leer_unidades,
+              [etl_unidades.RAW_PATH], ["etl_unidades"]),
+        Etapa("separaciones", [], pipeline_elasticidad.cargar_separaciones, None,
+              [pipeline_elasticidad.SEP_PATH], ["pipeline_elasticidad"]),
+        Etapa("pricing", ["unidades"], pricing, lambda: leer_tabla("pricing_resultado"),
+              [], ["curve_engine", "pricing_model", "pricing_incremental"],
+              parametros={"incremental": incremental, "modelos": list(modelos)}),
+        Etapa("historial", ["unidades"], pipeline_elasticidad.actualizar_historial,
+              cargar_cubo, [], ["historial_precios", "cubo_ventas"]),
+        Etapa("elasticidad", ["historial", "separaciones"], elasticidad,
+              lambda: leer_tabla("elasticidad_panel"), [], ["elasticidad_model", "pipeline_elasticidad", "cubo_ventas"],
+              parametros={"metodo": metodo}),
+        Etapa("forecast", ["separaciones"], forecast, lambda: leer_forecasts(),
+              [], ["forecast_engines", "forecast_model", "pipeline_forecast"],
+              parametros={"engine": engine}),
+        Etapa("escalera", ["unidades", "elasticidad", "forecast"], escalera,
+              lambda: leer_tabla("escalera_precios"), [], ["optimizador_precios", "curve_engine", "curve_models"]),
+        Etapa("reporting", ["pricing", "elasticidad", "forecast"], reporting, None,
+              [], ["pipeline_reporting"], siempre=email),
+    ]
+    if email:
+        etapas.append(Etapa("email_pricing", ["pricing"], email_pricing, None,
+                            [], ["pipeline_pricing"], siempre=True))
+    return {e.nombre: e for e in etapas}
+
+
+def _huellas(etapas: dict[str, Etapa]) -> dict[str, str]:
+    huellas: dict[str, str] = {}
+
+    def huella(nombre: str) -> str:
+        if nombre not in huellas:
+            e = etapas[nombre]
+            h = hashlib.sha256(nombre.encode())
+            for d in e.deps:
+                h.update(huella(d).encode())
+            for p in e.archivos:
+                h.update(_digest_archivo(p).encode())
+            for m in e.codigo:
+                h.update(_digest_archivo(SRC / f"{m}.py").encode())
+            # Otro motor, modelo o método con las mismas entradas da otra salida
+            h.update(json.dumps(e.parametros or {}, sort_keys=True).encode())
+            huellas[nombre] = h.hexdigest()
+        return huellas[nombre]
+
+    for nombre in etapas:
+        huella(nombre)
+    return huellas
+
+
+def run_dag(etapas: dict[str, Etapa], max_paralelo: int = 2, force: bool = False,
+            state_path: Path = STATE_PATH) -> pd.DataFrame:
+    """
+    Ejecuta el grafo respetando dependencias. Devuelve una fila por etapa con
+    estado (ok / omitida / error / bloqueada) y segundos.
+    """
+    previo = json.loads(state_path.read_text()) if state_path.exists() and not force else {}
+    huellas = _huellas(etapas)
+
+    salidas: dict[str, object] = {}
+    lock = threading.RLock()
+    registro: dict[str, dict] = {}
+
+    def salida(nombre: str):
+        # Las etapas omitidas solo se recargan si alguien las necesita
+        with lock:
+            if nombre not in salidas:
+                e = etapas[nombre]
+                salidas[nombre] = e.load() if e.load is not None else e.run(
+                    *[salida(d) for d in e.deps])
+            return salidas[nombre]
+
+    def ejecutar(nombre: str) -> None:
+        e = etapas[nombre]
+        t0 = time.perf_counter()
+        with instrumentacion.etapa("runner", nombre) as m:
+            if not e.siempre and previo.get(nombre) == huellas[nombre]:
+                registro[nombre] = {"etapa": nombre, "estado": "omitida", "segundos": 0.0}
+                m["omitida"] = True
+                return
+            args = [salida(d) for d in e.deps]
+            out = e.run(*args)
+            m["omitida"] = False
+            if isinstance(out, pd.DataFrame):
+                m["filas_salida"] = len(out)
+        with lock:
+            salidas[nombre] = out
+        registro[nombre] = {"etapa": nombre, "estado": "ok",
+                            "segundos": time.perf_counter() - t0}
+
+    pendientes = dict(etapas)
+    en_curso = {}
+    with ThreadPoolExecutor(max_workers=max_paralelo) as pool:
+        while pendientes or en_curso:
+            cambio = True
+            while cambio:
+                cambio = False
+                for nombre, e in list(pendientes.items()):
+                    estados = [registro.get(d, {}).get("estado") for d in e.deps]
+                    if any(s in ("error", "bloqueada") for s in estados):
+                        registro[nombre] = {"etapa": nombre, "estado": "bloqueada", "segundos": 0.0}
+                        del pendientes[nombre]
+                        cambio = True
+                    elif all(s in ("ok", "omitida") for s in estados):
+                        print(f">>> [RUNNER] Iniciando etapa {nombre}...")
+                        en_curso[pool.submit(ejecutar, nombre)] = nombre
+                        del pendientes[nombre]
+            if not en_curso:
+                break  # lo que quede pendiente depende de etapas que no existen
+            hechos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for fut in hechos:
+                nombre = en_curso.pop(fut)
+                if fut.exception() is not None:
+                    registro[nombre] = {"etapa": nombre, "estado": "error", "segundos": 0.0,
+                                        "error": f"{type(fut.exception()).__name__}: {fut.exception()}"}
+                    print(f"    ⚠ Error en etapa {nombre}: {registro[nombre]['error']}")
+
+    # Solo se recuerdan las huellas de etapas que terminaron bien
+    estado = {n: huellas[n] for n, r in registro.items() if r["estado"] in ("ok", "omitida")}
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    state_path.write_text(json.dumps(estado, indent=2))
+
+    return pd.DataFrame([registro[n] for n in etapas if n in registro])
+
+
+def main(incremental: bool = False, workers: int = 1, engine: str = "auto",
+         email: bool = True, force: bool = False, modelos=MODELOS_CURVA,
+         metodo: str = "shrinkage") -> pd.DataFrame:
+    t0 = time.perf_counter()
+    etapas = construir_etapas(incremental=incremental, workers=workers, engine=engine, email=email,
+                              modelos=modelos, metodo=metodo)
+    resumen = run_dag(etapas, force=force)
+
+    print(">>> [RUNNER] Resumen por etapa:")
+    print(resumen.to_string(index=False, float_format="%.1f"))
+    print(f">>> [RUNNER] Total: {time.perf_counter() - t0:.1f} s")
+    return resumen
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--incremental", action="store_true",
+                        help="pricing: reajusta solo los grupos cuyas unidades cambiaron")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="procesos para el forecast con Prophet")
+    parser.add_argument("--engine", default="auto", help="motor de forecast (auto, prophet, baseline)")
+    parser.add_argument("--modelos", default=",".join(MODELOS_CURVA),
+                        help="modelos de curva candidatos por grupo, separados por coma")
+    parser.add_argument("--metodo", choices=METODOS, default="shrinkage",
+                        help="grupo: OLS por grupo; pooled: una sola; shrinkage: por grupo encogida a la pooled")
+    parser.add_argument("--sin-email", action="store_true", help="no envía correos")
+    parser.add_argument("--force", action="store_true", help="ignora huellas y corre todo")
+    parser.add_argument("--perfil", default=None,
+                        help='etapas a perfilar, p. ej. "pricing.modelo,forecast.*" (ver instrumentacion.py)')
+    parser.add_argument("--prometheus", type=Path, default=None, help="ruta del textfile .prom")
+    args = parser.parse_args()
+    instrumentacion.configurar(perfil=args.perfil, prometheus=args.prometheus)
+    resumen = main(incremental=args.incremental, workers=args.workers, engine=args.engine,
+                   email=not args.sin_email, force=args.force, modelos=args.modelos.split(","),
+                   metodo=args.metodo)
+    if (resumen["estado"] == "error").any():
+        raise SystemExit(1)
@@ -0,0 +1,137 @@
+# src/pricing_incremental.py
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from curve_engine import (
+    GROUP_COLS, UMBRAL_PCT, PRICE_COL, RESULT_COLS, ESTADO_DTYPE, MODELO_DTYPE, MODELOS_CURVA,
+    Curvas, ajustar_curvas, codigos_grupo, puntuar_unidades, resultado_vacio,
+)
+
+ROOT = Path(__file__).resolve().parents[1]
+STATE_DIR = ROOT / "data" / "intermediate" / "curvas"
+
+
+def huellas_grupo(df: pd.DataFrame, codes: np.ndarray, price_col: str = PRICE_COL) -> np.ndarray:
+    """
+    Huella uint64 por grupo a partir de (unidad, PISO, precio) de sus unidades y
+    su posición dentro del grupo: cualquier alta, baja, cambio de precio o de
+    orden cambia la huella.
+    """
+    cols = [c for c in ["nombre_unidad", "PISO", price_col] if c in df.columns]
+    h_fila = pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+    pos = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+    h = pd.util.hash_pandas_object(pd.DataFrame({"h": h_fila, "pos": pos}), index=False).to_numpy()
+
+    order = np.argsort(codes, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+    return np.bitwise_xor.reduceat(h[order], starts)
+
+
+def tablas_estado(df: pd.DataFrame, curvas: Curvas, huellas: np.ndarray,
+                  price_col: str, umbral_pct: float,
+                  modelos=MODELOS_CURVA) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Tablas persistibles: una fila por grupo (huella, slope, intercept, n_pisos,
+    modelo elegido) y una fila por (grupo, PISO) con suma, conteo y precio esperado.
+    """
+    _, first = np.unique(curvas.codes, return_index=True)
+    keys = df[GROUP_COLS].iloc[first].reset_index(drop=True)
+
+    grupos = keys.copy()
+    grupos["huella"] = huellas
+    grupos["slope"] = curvas.slope
+    grupos["intercept"] = curvas.intercept
+    grupos["n_pisos"] = curvas.n_pisos
+    grupos["modelo"] = curvas.modelo
+    grupos["price_col"] = price_col
+    grupos["umbral_pct"] = umbral_pct
+    grupos["modelos"] = ",".join(modelos)
+
+    floors = curvas.floors
+    pisos = keys.iloc[floors["grupo"].to_numpy()].reset_index(drop=True)
+    pisos["PISO"] = floors["PISO"].to_numpy()
+    pisos["sum"] = floors["sum"].to_numpy()
+    pisos["count"] = floors["count"].to_numpy()
+    pisos["esperado"] = floors["esperado"].to_numpy()
+    return grupos, pisos
+
+
+def _cargar_estado(state_dir: Path, price_col: str, umbral_pct: float, modelos=MODELOS_CURVA):
+    paths = [state_dir / n for n in ("grupos.parquet", "pisos.parquet", "resultado.parquet")]
+    if not all(p.exists() for p in paths):
+        return None
+    grupos, pisos, result = (pd.read_parquet(p) for p in paths)
+    # Si cambió la métrica, el umbral o los modelos candidatos, nada del estado
+    # previo es reutilizable; tampoco un estado anterior a la selección de modelos
+    if grupos.empty or (grupos["price_col"] != price_col).any() or (grupos["umbral_pct"] != umbral_pct).any():
+        return None
+    if "modelos" not in grupos or (grupos["modelos"] != ",".join(modelos)).any() \
+            or not set(RESULT_COLS) <= set(result.columns):
+        return None
+    return grupos, pisos, result
+
+
+def evaluar_unidades_incremental(df: pd.DataFrame, state_dir: Path = STATE_DIR,
+                                 price_col: str = PRICE_COL,
+                                 umbral_pct: float = UMBRAL_PCT,
+                                 modelos=MODELOS_CURVA) -> tuple[pd.DataFrame, dict]:
+    """
+    Igual que curve_engine.evaluar_unidades, pero solo reajusta y re-puntúa los
+    grupos cuya huella cambió desde la última corrida; el resto se toma del
+    estado persistido en state_dir. Devuelve (resultado, {"reutilizados", "recalculados"}).
+    """
+    if df.empty:
+        return resultado_vacio(), {"reutilizados": 0, "recalculados": 0}
+
+    codes = codigos_grupo(df)
+    huellas = huellas_grupo(df, codes, price_col)
+    _, first = np.unique(codes, return_index=True)
+    actuales = df[GROUP_COLS].iloc[first].reset_index(drop=True)
+    actuales["huella"] = huellas
+
+    modelos = list(modelos)
+    previo = _cargar_estado(state_dir, price_col, umbral_pct, modelos)
+    if previo is None:
+        reuse_mask = np.zeros(len(actuales), dtype=bool)
+    else:
+        cruce = actuales.merge(previo[0][GROUP_COLS + ["huella"]],
+                               on=GROUP_COLS + ["huella"], how="left", indicator=True)
+        reuse_mask = (cruce["_merge"] == "both").to_numpy()
+    cambiados = df[~reuse_mask[codes]]
+
+    partes_res, partes_grp, partes_pis = [], [], []
+    if reuse_mask.any():
+        ok = actuales.loc[reuse_mask, GROUP_COLS]
+        partes_grp.append(previo[0].merge(ok, on=GROUP_COLS))
+        partes_pis.append(previo[1].merge(ok, on=GROUP_COLS))
+        partes_res.append(previo[2].merge(ok, on=GROUP_COLS)[RESULT_COLS])
+
+    if len(cambiados):
+        curvas = ajustar_curvas(cambiados, price_col, modelos)
+        sub_codes = codes[~reuse_mask[codes]]
+        grupos, pisos = tablas_estado(cambiados, curvas, huellas[np.unique(sub_codes)],
+                                      price_col, umbral_pct, modelos)
+        partes_grp.append(grupos)
+        partes_pis.append(pisos)
+        partes_res.append(puntuar_unidades(cambiados, curvas, price_col, umbral_pct))
+
+    # Cada grupo viene completo de una sola fuente y ya ordenado internamente,
+    # así que un sort estable por las llaves reproduce el orden de la corrida completa.
+    # Las partes pueden traer categorías distintas: se vuelve a las del inventario.
+    result = pd.concat(partes_res, ignore_index=True)
+    for c in GROUP_COLS:
+        result[c] = result[c].astype(df[c].dtype if isinstance(df[c].dtype, pd.CategoricalDtype) else "category")
+    result["estado"] = result["estado"].astype(ESTADO_DTYPE)
+    result["modelo_curva"] = result["modelo_curva"].astype(MODELO_DTYPE)
+    result = result.sort_values(GROUP_COLS, kind="stable").reset_index(drop=True)
+    grupos = pd.concat(partes_grp, ignore_index=True)
+    pisos = pd.concat(partes_pis, ignore_index=True)
+
+    state_dir.mkdir(parents=True, exist_ok=True)
+    grupos.to_parquet(state_dir / "grupos.parquet", index=False)
+    pisos.to_parquet(state_dir / "pisos.parquet", index=False)
+    result.to_parquet(state_dir / "resultado.parquet", index=False)
+
+    stats = {"reutilizados": int(reuse_mask.sum()), "recalculados": int((~reuse_mask).sum())}
+    return result, stats
@@ -3,15 +3,23 @@ import numpy as np
 import pandas as pd
 from pathlib import Path
 
-ROOT = Path(__file__).resolve().parents[1]
-
-GROUP_COLS = ["nombre_proyecto", "nombre_subdivision", "nombre_tipologia"]
-UMBRAL_PCT = 0.03          # 3% tolerancia
-PRICE_COL = "precio_lista" # o "precio_m2"
+from curve_engine import (
+    GROUP_COLS, UMBRAL_PCT, PRICE_COL, MODELOS_CURVA, ESTADO_BARATO, ESTADO_CARO, agregar_recomendacion, evaluar_metricas,
+    evaluar_unidades, resumen_sensibilidad,
+)
+from pricing_incremental import evaluar_unidades_incremental
+from etl_unidades import leer_unidades
+from exportar_excel import exportar_xlsx
+from intermediate_store import guardar_tabla
 
-def run_pricing_model(clean_path: Path) -> Path:
-    df = pd.read_parquet(clean_path)
+ROOT = Path(__file__).resolve().parents[1]
+REPORT_PATH = ROOT / "output" / "pricing_curva_y_recomendaciones.xlsx"
 
+def evaluar_unidades_loop(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Implementación original grupo a grupo (iterrows). Se mantiene como
+    referencia para validar y medir curve_engine.evaluar_unidades.
+    """
     registros = []
 
     def analizar_grupo(g: pd.DataFrame):
@@ -87,7 +95,7 @@ def run_pricing_model(clean_path: Path) -> Path:
                 "recomendacion"   : recomendacion,
             })
 
-    for _, g in df.groupby(GROUP_COLS, dropna=False):
+    for _, g in df.groupby(GROUP_COLS, dropna=False, observed=True):
         analizar_grupo(g)
 
     result = pd.DataFrame(registros)
@@ -95,11 +103,67 @@ def run_pricing_model(clean_path: Path) -> Path:
         by=["nombre_proyecto", "nombre_subdivision", "nombre_tipologia", "delta_pct"],
         ascending=[True, True, True, False],
     )
+    return result
+
+def evaluar_inventario(df: pd.DataFrame, incremental: bool = False,
+                       modelos=MODELOS_CURVA) -> pd.DataFrame:
+    if incremental:
+        result, stats = evaluar_unidades_incremental(df, modelos=modelos)
+        print(
+            f">>> [PRICING] Curvas: {stats['reutilizados']} grupos reutilizados, "
+            f"{stats['recalculados']} recalculados"
+        )
+    else:
+        result = evaluar_unidades(df, modelos=modelos)
+    por_modelo = resumen_curvas(result)["modelo_curva"].value_counts()
+    print(f">>> [PRICING] Modelo por grupo: {por_modelo.to_dict()}")
+    return result
+
+def evaluar_inventario_metricas(df: pd.DataFrame, metricas, incremental: bool = False,
+                                modelos=MODELOS_CURVA) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    PRICE_COL más otras métricas (p. ej. precio_m2) en una sola pasada:
+    devuelve (resultado de PRICE_COL, reporte combinado de evaluar_metricas).
+    El estado incremental es solo de PRICE_COL: con incremental, PRICE_COL
+    sale del resultado incremental y solo se ajustan las demás métricas.
+    """
+    metricas = list(dict.fromkeys([PRICE_COL, *metricas]))
+    if incremental:
+        result = evaluar_inventario(df, incremental=True, modelos=modelos)
+        combinado, _ = evaluar_metricas(df, metricas, modelos=modelos, previos={PRICE_COL: result})
+    else:
+        combinado, por_metrica = evaluar_metricas(df, metricas, modelos=modelos)
+        result = por_metrica[PRICE_COL]
+    fuera = {c: int(combinado[f"{c}_estado"].isin([ESTADO_CARO, ESTADO_BARATO]).sum()) for c in metricas}
+    print(f">>> [PRICING] Fuera de curva por métrica: {fuera}; "
+          f"en alguna: {int(combinado['fuera_de_curva'].sum())} de {len(combinado)}")
+    return result, combinado
+
+def resumen_curvas(result: pd.DataFrame) -> pd.DataFrame:
+    # Una fila por grupo con el modelo de curva elegido y sus unidades por estado
+    return (
+        result.groupby(GROUP_COLS + ["modelo_curva", "estado"], observed=True, dropna=False, sort=False)
+        .size().unstack("estado", fill_value=0).reset_index()
+    )
+
+def guardar_resultado(result: pd.DataFrame, sensibilidad: pd.DataFrame | None = None,
+                      combinado: pd.DataFrame | None = None) -> Path:
+    guardar_tabla("pricing_resultado", result)
+
+    # Excel solo como exportación final para el correo; el texto de la
+    # recomendación se genera recién aquí
+    hojas = {"unidades": agregar_recomendacion(result), "curvas": resumen_curvas(result)}
+    if sensibilidad is not None:
+        hojas["sensibilidad"] = resumen_sensibilidad(sensibilidad)
+        hojas["sensibilidad_grupos"] = sensibilidad
+    if combinado is not None:
+        # Solo las unidades fuera de curva en alguna métrica
+        hojas["metricas"] = combinado[combinado["fuera_de_curva"]]
+    return exportar_xlsx(REPORT_PATH, hojas)
 
-    out_path = ROOT / "output" / "pricing_curva_y_recomendaciones.xlsx"
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    result.to_excel(out_path, index=False)
-    return out_path
+def run_pricing_model(clean_path: Path, incremental: bool = False) -> Path:
+    df = leer_unidades(clean_path)
+    return guardar_resultado(evaluar_inventario(df, incremental))
 
 if __name__ == "__main__":
     clean = ROOT / "data" / "intermediate" / "unidades_clean.parquet"
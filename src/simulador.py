@@ -0,0 +1,353 @@
+# src/simulador.py
+"""
+Simulador what-if de la curva por piso. Carga el parquet limpio una vez y
+guarda por grupo (proyecto, subdivisión, tipología) los estadísticos
+suficientes de la recta sobre los promedios por piso (n, Σx, Σy, Σxy, Σx²)
+y la suma y el conteo de cada piso. Cambiar el precio de una unidad solo
+mueve la suma de su piso: la recta nueva sale en O(1) y los precios
+esperados del grupo en O(pisos), sin re-correr run_pricing_model.
+El simulador usa siempre la recta (pricing con --modelos lineal): los
+modelos no lineales de curve_models no tienen una actualización O(1).
+
+    python src/simulador.py --puerto 8765
+    curl 'localhost:8765/simular?proyecto=Modena&unidad=209&precio=440000'
+
+Endpoints (JSON):
+    GET  /simular?proyecto=&subdivision=&unidad=&precio=   no modifica el índice
+    POST /fijar {"proyecto", "subdivision", "unidad", "precio"}
+         deja el precio fijado para las consultas siguientes
+    POST /restablecer                                      vuelve a los precios del parquet
+    GET  /grupo?proyecto=&subdivision=&tipologia=          curva vigente del grupo
+"""
+import json
+import math
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from curve_engine import ESTADOS, GROUP_COLS, PRICE_COL, UMBRAL_PCT, clasificar, codigos_grupo
+from etl_unidades import CLEAN_PATH, leer_unidades
+
+PUERTO = 8765
+
+
+def _clave(*valores) -> tuple:
+    # Subdivisión vacía (NaN en el parquet, ausente en la consulta) -> None
+    return tuple(None if v is None or (isinstance(v, float) and math.isnan(v)) or v == ""
+                 else str(v) for v in valores)
+
+
+def _recta(n: float, sx: float, sy: float, sxy: float, sxx: float) -> tuple[float, float]:
+    """
+    OLS cerrado desde los estadísticos suficientes; NaN con menos de 2 pisos.
+    """
+    den = n * sxx - sx * sx
+    if n < 2 or den <= 0:
+        return math.nan, math.nan
+    slope = (n * sxy - sx * sy) / den
+    return slope, (sy - slope * sx) / n
+
+
+def _nativo(v):
+    # JSON no admite NaN ni tipos numpy
+    if isinstance(v, (np.floating, float)):
+        return None if math.isnan(v) else float(v)
+    if isinstance(v, np.integer):
+        return int(v)
+    return v
+
+
+class IndiceCurvas:
+    """
+    Índice en memoria del inventario para simular cambios de precio. Las
+    unidades y los pisos quedan ordenados por grupo y piso; cada grupo apunta
+    a su rango de pisos y de unidades, y cada unidad a su piso.
+    """
+
+    def __init__(self, df: pd.DataFrame, price_col: str = PRICE_COL,
+                 umbral_pct: float = UMBRAL_PCT):
+        self.price_col = price_col
+        self.umbral_pct = umbral_pct
+        self._df = df
+        self._lock = threading.Lock()
+        self._construir()
+
+    @classmethod
+    def desde_parquet(cls, clean_path: Path = CLEAN_PATH, **kwargs) -> "IndiceCurvas":
+        return cls(leer_unidades(clean_path), **kwargs)
+
+    def _construir(self) -> None:
+        df = self._df
+        codes = codigos_grupo(df)
+        pisos = df["PISO"].to_numpy(dtype=np.int64)
+        order = np.lexsort((pisos, codes))
+        c, p = codes[order], pisos[order]
+        self.u_grupo, self.u_piso = c, p.astype(float)
+        self.u_precio = df[self.price_col].to_numpy(dtype=float)[order].copy()
+        unidad_col = "nombre_unidad" if "nombre_unidad" in df.columns else "nombre"
+        self.u_nombre = df[unidad_col].to_numpy()[order]
+
+        # Un registro por (grupo, piso): suma y conteo de precios conocidos
+        inicio = np.ones(len(c), dtype=bool)
+        inicio[1:] = (c[1:] != c[:-1]) | (p[1:] != p[:-1])
+        f_idx = np.flatnonzero(inicio)
+        self.u_piso_id = np.cumsum(inicio) - 1
+        conocido = np.isfinite(self.u_precio)
+        self.f_sum = np.add.reduceat(np.where(conocido, self.u_precio, 0.0), f_idx) if len(c) else np.zeros(0)
+        self.f_count = np.add.reduceat(conocido.astype(np.int64), f_idx) if len(c) else np.zeros(0, np.int64)
+        self.f_grupo = c[f_idx]
+        self.f_piso = p[f_idx].astype(float)
+
+        n_grupos = int(c.max()) + 1 if len(c) else 0
+        self.f_rango = np.searchsorted(self.f_grupo, np.arange(n_grupos + 1))
+        self.u_rango = np.searchsorted(c, np.arange(n_grupos + 1))
+
+        # Estadísticos suficientes por grupo sobre los pisos con precio
+        valido = self.f_count > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            media = np.where(valido, self.f_sum / self.f_count, 0.0)
+        x = np.where(valido, self.f_piso, 0.0)
+
+        def suma(w):
+            return np.bincount(self.f_grupo, weights=w, minlength=n_grupos)
+        self.g_n = suma(valido.astype(float))
+        self.g_sx, self.g_sy = suma(x), suma(media)
+        self.g_sxy, self.g_sxx = suma(x * media), suma(x * x)
+
+        primeras = order[self.u_rango[:-1]]
+        self.grupos = [_clave(*fila) for fila in df[GROUP_COLS].to_numpy()[primeras]]
+        self._id_grupo = {k: g for g, k in enumerate(self.grupos)}
+        proy, subdiv = df["nombre_proyecto"].to_numpy()[order], df["nombre_subdivision"].to_numpy()[order]
+        self._id_unidad = {_clave(a, b, u): i for i, (a, b, u) in enumerate(zip(proy, subdiv, self.u_nombre))}
+
+    # ---------------- CONSULTAS ---------------- #
+
+    def _unidad(self, proyecto, subdivision, unidad) -> int:
+        i = self._id_unidad.get(_clave(proyecto, subdivision, unidad))
+        if i is None:
+            raise KeyError(f"Unidad no encontrada: {proyecto} / {subdivision} / {unidad}")
+        return i
+
+    def _cambio(self, i: int, precio: float) -> tuple[int, float, int, tuple]:
+        """
+        Piso de la unidad, su suma y conteo con el precio nuevo, y los
+        estadísticos del grupo corregidos solo por la media de ese piso.
+        """
+        g, f = self.u_grupo[i], self.u_piso_id[i]
+        previo = self.u_precio[i]
+        suma = self.f_sum[f] + (precio if math.isfinite(precio) else 0.0) - (previo if math.isfinite(previo) else 0.0)
+        conteo = int(self.f_count[f]) + math.isfinite(precio) - math.isfinite(previo)
+
+        x = self.f_piso[f]
+        antes = self.f_sum[f] / self.f_count[f] if self.f_count[f] > 0 else None
+        despues = suma / conteo if conteo > 0 else None
+        n, sx, sy, sxy, sxx = self.g_n[g], self.g_sx[g], self.g_sy[g], self.g_sxy[g], self.g_sxx[g]
+        if antes is not None:
+            n, sx, sy, sxy, sxx = n - 1, sx - x, sy - antes, sxy - x * antes, sxx - x * x
+        if despues is not None:
+            n, sx, sy, sxy, sxx = n + 1, sx + x, sy + despues, sxy + x * despues, sxx + x * x
+        return f, suma, conteo, (n, sx, sy, sxy, sxx)
+
+    def _curva_grupo(self, g: int, stats: tuple, f: int | None = None,
+                     suma: float = 0.0, conteo: int = 0,
+                     i: int | None = None, precio: float = math.nan) -> dict:
+        slope, intercept = _recta(*stats)
+        sin_curva = math.isnan(slope)
+
+        fi, ff = self.f_rango[g], self.f_rango[g + 1]
+        f_sum, f_count = self.f_sum[fi:ff].copy(), self.f_count[fi:ff].copy()
+        if f is not None:
+            f_sum[f - fi], f_count[f - fi] = suma, conteo
+        with np.errstate(invalid="ignore", divide="ignore"):
+            medias = np.where(f_count > 0, f_sum / f_count, np.nan)
+        pisos = self.f_piso[fi:ff]
+
+        ui, uf = self.u_rango[g], self.u_rango[g + 1]
+        precios = self.u_precio[ui:uf].copy()
+        if i is not None:
+            precios[i - ui] = precio
+        u_pisos = self.u_piso[ui:uf]
+        esperado, _, delta_pct, estado, sugerido = clasificar(
+            precios, slope * u_pisos + intercept, np.full(len(precios), sin_curva), self.umbral_pct)
+
+        return {
+            "grupo": dict(zip(GROUP_COLS, self.grupos[g])),
+            "slope": _nativo(slope),
+            "intercept": _nativo(intercept),
+            "pisos": [
+                {"PISO": int(x), "precio_promedio": _nativo(m),
+                 "precio_esperado": _nativo(slope * x + intercept), "unidades": int(n)}
+                for x, m, n in zip(pisos, medias, f_count)
+            ],
+            "unidades": [
+                {"unidad": _nativo(u), "PISO": int(x), "precio": _nativo(r), "precio_esperado": _nativo(e),
+                 "delta_pct": _nativo(d), "estado": ESTADOS[s], "precio_sugerido": _nativo(ps)}
+                for u, x, r, e, d, s, ps in zip(self.u_nombre[ui:uf], u_pisos, precios,
+                                                esperado, delta_pct, estado, sugerido)
+            ],
+        }
+
+    def _stats(self, g: int) -> tuple:
+        return self.g_n[g], self.g_sx[g], self.g_sy[g], self.g_sxy[g], self.g_sxx[g]
+
+    def grupo(self, proyecto, subdivision, tipologia) -> dict:
+        """
+        Curva vigente del grupo (con los precios fijados hasta ahora).
+        """
+        g = self._id_grupo.get(_clave(proyecto, subdivision, tipologia))
+        if g is None:
+            raise KeyError(f"Grupo no encontrado: {proyecto} / {subdivision} / {tipologia}")
+        with self._lock:
+            return self._curva_grupo(g, self._stats(g))
+
+    def _simular(self, i: int, precio: float) -> tuple[dict, tuple]:
+        g = self.u_grupo[i]
+        f, suma, conteo, stats = self._cambio(i, precio)
+        antes = _recta(*self._stats(g))
+        out = self._curva_grupo(g, stats, f, suma, conteo, i, precio)
+        out["slope_anterior"], out["intercept_anterior"] = _nativo(antes[0]), _nativo(antes[1])
+        out["precio_anterior"] = _nativo(self.u_precio[i])
+        out["unidad"] = out["unidades"][i - self.u_rango[g]]
+        return out, (f, suma, conteo, stats)
+
+    def simular(self, proyecto, subdivision, unidad, precio: float) -> dict:
+        """
+        Recta, precios esperados por piso y estado de cada unidad del grupo si
+        la unidad tuviera `precio`. No modifica el índice.
+        """
+        precio = float(precio)
+        with self._lock:
+            return self._simular(self._unidad(proyecto, subdivision, unidad), precio)[0]
+
+    def fijar(self, proyecto, subdivision, unidad, precio: float) -> dict:
+        """
+        Como simular, pero deja el precio aplicado para las consultas siguientes.
+        """
+        precio = float(precio)
+        with self._lock:
+            i = self._unidad(proyecto, subdivision, unidad)
+            out, (f, suma, conteo, stats) = self._simular(i, precio)
+            g = self.u_grupo[i]
+            self.f_sum[f], self.f_count[f], self.u_precio[i] = suma, conteo, precio
+            self.g_n[g], self.g_sx[g], self.g_sy[g], self.g_sxy[g], self.g_sxx[g] = stats
+        return out
+
+    def restablecer(self) -> None:
+        # Recalcula desde el DataFrame original: descarta lo fijado y el error de redondeo acumulado
+        with self._lock:
+            self._construir()
+
+
+# ---------------- SERVIDOR HTTP ---------------- #
+
+def _handler(indice: IndiceCurvas):
+    class Handler(BaseHTTPRequestHandler):
+        def _responder(self, codigo: int, cuerpo: dict) -> None:
+            data = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+            self.send_response(codigo)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _atender(self, metodo: str, params: dict) -> None:
+            ruta = urlparse(self.path).path
+            if ruta in ("/simular", "/fijar") and "precio" not in params:
+                return self._responder(400, {"error": "Falta el parámetro precio"})
+            t0 = time.perf_counter()
+            try:
+                if metodo == "GET" and ruta == "/simular":
+                    out = indice.simular(params.get("proyecto"), params.get("subdivision"),
+                                         params.get("unidad"), params["precio"])
+                elif metodo == "POST" and ruta == "/fijar":
+                    out = indice.fijar(params.get("proyecto"), params.get("subdivision"),
+                                       params.get("unidad"), params["precio"])
+                elif metodo == "POST" and ruta == "/restablecer":
+                    indice.restablecer()
+                    out = {"ok": True}
+                elif metodo == "GET" and ruta == "/grupo":
+                    out = indice.grupo(params.get("proyecto"), params.get("subdivision"),
+                                       params.get("tipologia"))
+                else:
+                    return self._responder(404, {"error": f"Ruta desconocida: {metodo} {ruta}"})
+            except KeyError as e:
+                return self._responder(404, {"error": str(e.args[0])})
+            except (TypeError, ValueError) as e:
+                return self._responder(400, {"error": str(e)})
+            out["ms"] = round((time.perf_counter() - t0) * 1000, 3)
+            self._responder(200, out)
+
+        def do_GET(self):
+            params = {k: v[-1] for k, v in parse_qs(urlparse(self.path).query).items()}
+            self._atender("GET", params)
+
+        def do_POST(self):
+            largo = int(self.headers.get("Content-Length") or 0)
+            try:
+                params = json.loads(self.rfile.read(largo) or b"{}")
+            except json.JSONDecodeError as e:
+                return self._responder(400, {"error": f"JSON inválido: {e}"})
+            self._atender("POST", params)
+
+        def log_message(self, fmt, *args):
+            pass  # una línea por consulta taparía la consola
+
+    return Handler
+
+
+def servir(indice: IndiceCurvas, host: str = "127.0.0.1", puerto: int = PUERTO) -> None:
+    server = ThreadingHTTPServer((host, puerto), _handler(indice))
+    print(f">>> [SIMULADOR] Escuchando en http://{host}:{server.server_port}  (Ctrl+C para salir)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def medir_latencia(indice: IndiceCurvas, consultas: int = 1000, seed: int = 0) -> float:
+    """
+    Mediana en ms de simular() sobre unidades al azar con ±5% de precio.
+    """
+    rng = np.random.default_rng(seed)
+    claves = list(indice._id_unidad)
+    tiempos = []
+    for k in rng.integers(0, len(claves), consultas):
+        i = indice._id_unidad[claves[k]]
+        precio = indice.u_precio[i] * rng.uniform(0.95, 1.05)
+        t0 = time.perf_counter()
+        indice.simular(*claves[k], precio)
+        tiempos.append(time.perf_counter() - t0)
+    return float(np.median(tiempos) * 1000)
+
+
+def main(host: str = "127.0.0.1", puerto: int = PUERTO, price_col: str = PRICE_COL,
+         umbral_pct: float = UMBRAL_PCT, medir: int = 0) -> None:
+    t0 = time.perf_counter()
+    indice = IndiceCurvas.desde_parquet(CLEAN_PATH, price_col=price_col, umbral_pct=umbral_pct)
+    print(f">>> [SIMULADOR] {len(indice._id_unidad)} unidades, {len(indice.grupos)} grupos "
+          f"indexados en {time.perf_counter() - t0:.2f} s")
+    if medir:
+        print(f">>> [SIMULADOR] simular(): mediana {medir_latencia(indice, medir):.3f} ms "
+              f"en {medir} consultas")
+        return
+    servir(indice, host, puerto)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--col", default=PRICE_COL, help="precio_lista o precio_m2")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_PCT)
+    parser.add_argument("--medir", type=int, default=0,
+                        help="mide la latencia de N simulaciones al azar y sale, sin servidor")
+    args = parser.parse_args()
+    main(args.host, args.puerto, args.col, args.umbral, args.medir)